@@ -0,0 +1,33 @@
+"""cadastre_resolution_cache
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'cadastre_resolutions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('address_key', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('resolved_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index('ix_cadastre_resolutions_address_key', 'cadastre_resolutions', ['address_key'], unique=True)
+    op.create_index('ix_cadastre_resolutions_expires_at', 'cadastre_resolutions', ['expires_at'])
+
+def downgrade() -> None:
+    op.drop_index('ix_cadastre_resolutions_expires_at', table_name='cadastre_resolutions')
+    op.drop_index('ix_cadastre_resolutions_address_key', table_name='cadastre_resolutions')
+    op.drop_table('cadastre_resolutions')
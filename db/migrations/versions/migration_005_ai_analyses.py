@@ -0,0 +1,31 @@
+"""ai_analysis_memo
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'ai_analyses',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('model', sa.String(length=64), nullable=False),
+        sa.Column('prompt_version', sa.String(length=16), nullable=False),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index('ix_ai_analyses_cache_key', 'ai_analyses', ['cache_key'], unique=True)
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_analyses_cache_key', table_name='ai_analyses')
+    op.drop_table('ai_analyses')
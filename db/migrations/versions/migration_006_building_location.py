@@ -0,0 +1,27 @@
+"""building_location_gist
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+    # Generated column: existing rows are backfilled and writers keep setting latitude/longitude only
+    op.execute(
+        "ALTER TABLE buildings ADD COLUMN location geography(Point, 4326) "
+        "GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography) STORED"
+    )
+    op.create_index('idx_buildings_location', 'buildings', ['location'], postgresql_using='gist')
+
+def downgrade() -> None:
+    op.drop_index('idx_buildings_location', table_name='buildings')
+    op.drop_column('buildings', 'location')
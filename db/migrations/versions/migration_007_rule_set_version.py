@@ -0,0 +1,24 @@
+"""report_rule_set_version
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # NULL marks reports scored by the hard-coded engine: the first rescore picks them up
+    op.add_column('reports', sa.Column('rule_set_version', sa.String(length=32), nullable=True))
+    op.create_index('ix_reports_rule_set_version', 'reports', ['rule_set_version'])
+
+def downgrade() -> None:
+    op.drop_index('ix_reports_rule_set_version', table_name='reports')
+    op.drop_column('reports', 'rule_set_version')
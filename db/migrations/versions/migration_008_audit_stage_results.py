@@ -0,0 +1,33 @@
+"""audit_stage_results
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        'audit_stage_results',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('listing_id', sa.Integer(), sa.ForeignKey('listings.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('stage', sa.String(length=32), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('digest', sa.String(length=64), nullable=False),
+        sa.Column('output', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.UniqueConstraint('listing_id', 'stage', name='uq_audit_stage_results_listing_stage'),
+    )
+    op.create_index('ix_audit_stage_results_listing_id', 'audit_stage_results', ['listing_id'])
+
+def downgrade() -> None:
+    op.drop_index('ix_audit_stage_results_listing_id', table_name='audit_stage_results')
+    op.drop_table('audit_stage_results')
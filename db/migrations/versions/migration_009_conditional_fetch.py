@@ -0,0 +1,27 @@
+"""listing_conditional_fetch
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('listings', sa.Column('etag', sa.String(length=255), nullable=True))
+    op.add_column('listings', sa.Column('last_modified', sa.String(length=64), nullable=True))
+    op.add_column('listings', sa.Column('body_hash', sa.String(length=64), nullable=True))
+    op.add_column('listings', sa.Column('checked_at', sa.DateTime(timezone=True), nullable=True))
+
+def downgrade() -> None:
+    op.drop_column('listings', 'checked_at')
+    op.drop_column('listings', 'body_hash')
+    op.drop_column('listings', 'last_modified')
+    op.drop_column('listings', 'etag')
@@ -0,0 +1,25 @@
+"""listing_price_monitoring
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.add_column('listings', sa.Column('recheck_interval', sa.Integer(), nullable=True))
+    op.add_column('listings', sa.Column('next_check_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_listings_next_check_at', 'listings', ['next_check_at'])
+
+def downgrade() -> None:
+    op.drop_index('ix_listings_next_check_at', table_name='listings')
+    op.drop_column('listings', 'next_check_at')
+    op.drop_column('listings', 'recheck_interval')
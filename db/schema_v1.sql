@@ -1,5 +1,5 @@
 -- GLASHAUS REFERENCE SCHEMA (Synced with Production)
--- Includes logic from migrations 001 (workflow), 002 (currency), and 003 (area precision)
+-- Includes logic from migrations 001 (workflow), 002 (currency), 003 (area precision), 004 (cadastre cache), 005 (AI memo), 006 (building location), 007 (rule set version), 008 (audit stage results), 009 (conditional fetch) and 010 (price monitoring)
 
 CREATE EXTENSION IF NOT EXISTS postgis;
 
@@ -11,9 +11,11 @@ CREATE TABLE buildings (
     address_full VARCHAR(255),
     latitude FLOAT,
     longitude FLOAT,
+    location GEOGRAPHY(Point, 4326) GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography) STORED,
     construction_year INT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
+CREATE INDEX idx_buildings_location ON buildings USING GIST (location);
 
 CREATE TABLE listings (
     id SERIAL PRIMARY KEY,
@@ -22,9 +24,16 @@ CREATE TABLE listings (
     price_bgn NUMERIC(12, 2), -- Financial Precision
     advertised_area_sqm NUMERIC(10, 2), -- Area Precision
     description_raw TEXT,
-    scraped_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    scraped_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    etag VARCHAR(255), -- Conditional re-scrape validators
+    last_modified VARCHAR(64),
+    body_hash VARCHAR(64), -- sha256 of the raw page
+    checked_at TIMESTAMP WITH TIME ZONE,
+    recheck_interval INT, -- seconds, adapted to price volatility
+    next_check_at TIMESTAMP WITH TIME ZONE
 );
 CREATE INDEX idx_listings_content_hash ON listings(content_hash);
+CREATE INDEX ix_listings_next_check_at ON listings(next_check_at);
 
 CREATE TABLE reports (
     id SERIAL PRIMARY KEY,
@@ -32,6 +41,7 @@ CREATE TABLE reports (
     building_id INT REFERENCES buildings(id),
     status report_status DEFAULT 'PENDING',
     risk_score INT,
+    rule_set_version VARCHAR(32), -- rules/risk_rules.json version that produced risk_score
     ai_confidence_score INT DEFAULT 0,
     legal_brief TEXT,
     discrepancy_details JSONB,
@@ -41,9 +51,42 @@ CREATE TABLE reports (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+CREATE INDEX ix_reports_rule_set_version ON reports(rule_set_version);
+
 CREATE TABLE price_history (
     id SERIAL PRIMARY KEY,
     listing_id INT REFERENCES listings(id),
     price_bgn NUMERIC(12, 2),
     changed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
+
+CREATE TABLE cadastre_resolutions (
+    id SERIAL PRIMARY KEY,
+    address_key VARCHAR(255) UNIQUE NOT NULL, -- normalize_address_key()
+    status VARCHAR(16) NOT NULL,
+    result JSONB NOT NULL,
+    resolved_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL -- negative results expire sooner
+);
+CREATE INDEX idx_cadastre_resolutions_expires_at ON cadastre_resolutions(expires_at);
+
+CREATE TABLE ai_analyses (
+    id SERIAL PRIMARY KEY,
+    cache_key VARCHAR(64) UNIQUE NOT NULL, -- sha256(text hash, photo hashes, model, prompt version)
+    model VARCHAR(64) NOT NULL,
+    prompt_version VARCHAR(16) NOT NULL,
+    result JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE audit_stage_results (
+    id SERIAL PRIMARY KEY,
+    listing_id INT NOT NULL REFERENCES listings(id) ON DELETE CASCADE,
+    stage VARCHAR(32) NOT NULL,
+    fingerprint VARCHAR(64) NOT NULL, -- sha256(stage, salt, input digests)
+    digest VARCHAR(64) NOT NULL, -- sha256 of the stored output
+    output JSONB NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_audit_stage_results_listing_stage UNIQUE (listing_id, stage)
+);
+CREATE INDEX ix_audit_stage_results_listing_id ON audit_stage_results(listing_id);
@@ -0,0 +1,19 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.services.law_index import build_law_index
+
+def build_all(laws_path: str):
+    """Rebuilds the binary .idx file for every law text in the directory."""
+    if not os.path.isdir(laws_path):
+        print(f"[!] Laws directory not found: {laws_path}")
+        return
+
+    for law_file in sorted(os.listdir(laws_path)):
+        if not law_file.endswith(".txt"): continue
+        idx_path = build_law_index(os.path.join(laws_path, law_file))
+        print(f"[SUCCESS] {law_file} -> {os.path.basename(idx_path)} ({os.path.getsize(idx_path)} bytes)")
+
+if __name__ == "__main__":
+    build_all(sys.argv[1] if len(sys.argv) > 1 else "storage/laws")
@@ -0,0 +1,93 @@
+import httpx
+import json
+import os
+import sys
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+
+# Sofia's 24 районы (admin_level 9) plus mapped квартали / ж.к. polygons inside Столична община
+QUERY = """
+[out:json][timeout:180];
+area["name"="Столична"]["boundary"="administrative"]["admin_level"="6"]->.sofia;
+(
+  relation(area.sofia)["boundary"="administrative"]["admin_level"~"^(9|10)$"];
+  relation(area.sofia)["place"~"^(suburb|quarter|neighbourhood)$"];
+  way(area.sofia)["place"~"^(suburb|quarter|neighbourhood)$"];
+);
+out geom;
+"""
+
+def _key(point):
+    return (round(point[0], 7), round(point[1], 7))
+
+def assemble_rings(ways):
+    """Joins member way geometries end to end into closed rings (OSM multipolygon rules)."""
+    open_ways = [list(w) for w in ways if len(w) >= 2]
+    rings = []
+    while open_ways:
+        ring = open_ways.pop()
+        while _key(ring[0]) != _key(ring[-1]):
+            for i, way in enumerate(open_ways):
+                if _key(way[0]) == _key(ring[-1]):
+                    ring += way[1:]
+                elif _key(way[-1]) == _key(ring[-1]):
+                    ring += way[::-1][1:]
+                else:
+                    continue
+                open_ways.pop(i)
+                break
+            else:
+                ring = None  # Broken boundary in OSM: skip this ring
+                break
+        if ring and len(ring) >= 4:
+            rings.append(ring)
+    return rings
+
+def _contains(ring, point):
+    inside = False
+    x, y = point
+    for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+    return inside
+
+def to_feature(element):
+    tags = element.get("tags", {})
+    if element["type"] == "way":
+        coords = [[p["lon"], p["lat"]] for p in element.get("geometry", [])]
+        outers, inners = assemble_rings([coords]), []
+    else:
+        members = [m for m in element.get("members", []) if m.get("type") == "way" and m.get("geometry")]
+        as_coords = lambda role: [[[p["lon"], p["lat"]] for p in m["geometry"]] for m in members if m.get("role", "outer") == role]
+        outers, inners = assemble_rings(as_coords("outer") + as_coords("")), assemble_rings(as_coords("inner"))
+    if not outers:
+        return None
+
+    # Each inner ring becomes a hole of the outer ring that contains it
+    polygons = [[outer] for outer in outers]
+    for inner in inners:
+        for polygon in polygons:
+            if _contains(polygon[0], inner[0]):
+                polygon.append(inner)
+                break
+
+    props = {k: tags[k] for k in ("name", "name:bg", "name:en", "alt_name", "old_name", "admin_level", "place") if k in tags}
+    props["osm_id"] = f"{element['type']}/{element['id']}"
+    return {"type": "Feature", "properties": props, "geometry": {"type": "MultiPolygon", "coordinates": polygons}}
+
+def fetch(output_path: str):
+    print("[*] Querying Overpass for Sofia neighborhood polygons")
+    with httpx.Client(timeout=240.0) as client:
+        resp = client.post(OVERPASS_URL, data={"data": QUERY})
+        resp.raise_for_status()
+        elements = resp.json().get("elements", [])
+
+    features = [f for f in (to_feature(e) for e in elements if e.get("tags", {}).get("name")) if f]
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+    print(f"[SUCCESS] {len(features)} areas -> {output_path} (data © OpenStreetMap contributors, ODbL)")
+
+if __name__ == "__main__":
+    # Default matches settings.NEIGHBORHOODS_GEOJSON
+    fetch(sys.argv[1] if len(sys.argv) > 1 else "storage/geo/sofia_neighborhoods.geojson")
@@ -4,6 +4,9 @@ import os
 import re
 import sys
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.services.law_index import build_law_index, write_atomic
+
 def scrape_law(url: str, filename: str):
     print(f"[*] Targeting Lex.bg: {url}")
     
@@ -57,13 +60,15 @@ def scrape_law(url: str, filename: str):
         os.makedirs("storage/laws", exist_ok=True)
         path = f"storage/laws/{filename}.txt"
         
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(f"SOURCE: {url}\n")
-            f.write("-" * 30 + "\n\n")
-            f.write(clean_text)
+        # Atomic: running workers may have the previous version memory-mapped
+        write_atomic(path, (f"SOURCE: {url}\n" + "-" * 30 + "\n\n" + clean_text).encode("utf-8"))
             
         print(f"[SUCCESS] {filename}.txt created ({len(clean_text)} characters)")
 
+        # 8. Prebuild the article/term index consumed by LegalKnowledgeBase
+        idx_path = build_law_index(path)
+        print(f"[SUCCESS] {os.path.basename(idx_path)} built ({os.path.getsize(idx_path)} bytes)")
+
     except Exception as e:
         print(f"[FATAL] Error during scraping: {str(e)}")
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from src.db.session import get_db
 from src.db.models import Listing, Report, ReportStatus
@@ -49,6 +49,7 @@ def get_report(listing_id: int, db: Session = Depends(get_db)):
         "report_id": report.id,
         "status": report.status,
         "risk_score": report.risk_score,
+        "rule_set_version": report.rule_set_version,
         "ai_confidence": report.ai_confidence_score,
         "discrepancies": report.discrepancy_details,
         "manual_notes": report.manual_review_notes,
@@ -78,3 +79,63 @@ def update_report_status(report_id: int, update: ReportUpdate, db: Session = Dep
         
     db.commit()
     return {"id": report.id, "new_status": report.status}
+
+# --- PROXIMITY (PostGIS) ---
+
+MAX_RADIUS_M = 5000
+
+def _building_json(building, distance_m=None):
+    data = {
+        "building_id": building.id,
+        "cadastre_id": building.cadastre_id,
+        "address": building.address_full,
+        "lat": building.latitude,
+        "lng": building.longitude,
+    }
+    if distance_m is not None:
+        data["distance_m"] = round(distance_m, 1)
+    return data
+
+@router.get("/buildings/near")
+def buildings_near(lat: float = Query(..., ge=-90, le=90), lng: float = Query(..., ge=-180, le=180),
+                   radius_m: float = Query(300, gt=0, le=MAX_RADIUS_M), audited_only: bool = True,
+                   limit: int = Query(200, ge=1, le=1000), db: Session = Depends(get_db)):
+    """
+    Buildings within `radius_m` metres of a point, nearest first.
+    """
+    hits = RealEstateRepository(db).buildings_within(lat, lng, radius_m, audited_only=audited_only, limit=limit)
+    return {"count": len(hits), "buildings": [_building_json(b, d) for b, d in hits]}
+
+@router.get("/buildings/bbox")
+def buildings_in_bbox(south: float = Query(..., ge=-90, le=90), west: float = Query(..., ge=-180, le=180),
+                      north: float = Query(..., ge=-90, le=90), east: float = Query(..., ge=-180, le=180),
+                      audited_only: bool = True, limit: int = Query(1000, ge=1, le=5000),
+                      db: Session = Depends(get_db)):
+    """
+    Buildings inside a map viewport (WGS84 bounding box).
+    """
+    if south >= north or west >= east:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    hits = RealEstateRepository(db).buildings_in_bbox(south, west, north, east, audited_only=audited_only, limit=limit)
+    return {"count": len(hits), "buildings": [_building_json(b) for b in hits]}
+
+@router.get("/expropriations/near")
+def expropriations_near(lat: float = Query(..., ge=-90, le=90), lng: float = Query(..., ge=-180, le=180),
+                        radius_m: float = Query(300, gt=0, le=MAX_RADIUS_M),
+                        limit: int = Query(200, ge=1, le=1000), db: Session = Depends(get_db)):
+    """
+    Audited properties flagged in the expropriation register near a point.
+    """
+    hits = RealEstateRepository(db).expropriation_hits_within(lat, lng, radius_m, limit=limit)
+    return {
+        "count": len(hits),
+        "hits": [
+            {
+                **_building_json(building, distance_m),
+                "report_id": report.id,
+                "listing_id": report.listing_id,
+                "details": (report.discrepancy_details or {}).get("city_risk", {}).get("details"),
+            }
+            for report, building, distance_m in hits
+        ],
+    }
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Optional, Dict
 from pydantic import Field
 
 class Settings(BaseSettings):
@@ -19,6 +19,17 @@ class Settings(BaseSettings):
     # AI & External APIs
     GEMINI_API_KEY: str
     GEMINI_MODEL: str = "gemini-3.0-flash"
+    # Gallery sent to Gemini: longest edge in px, photo cap, parallel uploads/deletes
+    GEMINI_IMAGE_MAX_EDGE: int = 1024
+    GEMINI_MAX_IMAGES: int = 8
+    GEMINI_UPLOAD_CONCURRENCY: int = 4
+    # "rest" (async httpx, pooled) or "sdk" (google-generativeai in threads)
+    GEMINI_BACKEND: str = "rest"
+    GEMINI_MAX_CONCURRENCY: int = 16
+    GEMINI_MAX_RETRIES: int = 4
+    # Text-only bulk analysis: listings per request and parallel requests
+    GEMINI_BATCH_SIZE: int = 20
+    GEMINI_BATCH_CONCURRENCY: int = 2
     GOOGLE_MAPS_API_KEY: Optional[str] = None
     
     # Security
@@ -28,6 +39,54 @@ class Settings(BaseSettings):
     # Infra
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Registry (NAG) result cache: "memory" (per process) or "redis" (shared)
+    REGISTRY_CACHE_BACKEND: str = "memory"
+    REGISTRY_CACHE_MAX_ENTRIES: int = 10000
+    REGISTRY_CACHE_STALE_SECONDS: int = 86400
+    NAG_SWEEP_PAGE_SIZE: int = 500
+    # Independent cookie sessions per registry (each leased for one Search->Read)
+    NAG_SESSION_POOL_SIZE: int = 6
+    # Warmed KAIS sessions (cookies + CSRF token) shared by cadastre lookups
+    KAIS_SESSION_POOL_SIZE: int = 3
+    KAIS_TOKEN_REFRESH_SECONDS: int = 900
+
+    # Per-host throttling: "memory" (per process) or "redis" (one budget for all workers).
+    # RATE_LIMITS overrides the starting requests/second per host, e.g. {"nag.sofia.bg": 5}
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMITS: Dict[str, float] = {}
+    # Upper bound on a server's Retry-After (seconds or HTTP-date) before a host is retried
+    RATE_LIMIT_MAX_RETRY_AFTER: float = 300.0
+
+    # Geocode responses: "memory" (per process) or "redis" (shared)
+    GEOCODE_CACHE_BACKEND: str = "memory"
+    GEOCODE_CACHE_MAX_ENTRIES: int = 50000
+
+    # Sofia neighborhood polygons (see scripts/fetch_sofia_neighborhoods.py)
+    NEIGHBORHOODS_GEOJSON: str = "storage/geo/sofia_neighborhoods.geojson"
+    # Refuse to start a worker without the polygons instead of degrading to Google's sublocality
+    NEIGHBORHOODS_REQUIRED: bool = False
+
+    # Price monitoring: per-listing re-check interval adapts between these bounds (seconds)
+    RECHECK_MIN_INTERVAL: int = 3600
+    RECHECK_MAX_INTERVAL: int = 7 * 86400
+    RECHECK_DEFAULT_INTERVAL: int = 86400
+    RECHECK_BATCH_SIZE: int = 50
+    RECHECK_CONCURRENCY: int = 8
+    RECHECK_MAX_PER_TICK: int = 5000
+
+    # Declarative scoring rules; the file's version is stored on each Report
+    RISK_RULES_PATH: str = "rules/risk_rules.json"
+
+    # Image archive: parallel downloads per gallery and a per-image size cap
+    ARCHIVE_CONCURRENCY: int = 4
+    ARCHIVE_MAX_IMAGE_BYTES: int = 15 * 1024 * 1024
+
+    # /metrics aggregation: "memory" (this process) or "redis" (API + workers)
+    METRICS_BACKEND: str = "memory"
+    # Gemini list prices in USD per 1M tokens, used for Report.cost_to_generate
+    GEMINI_INPUT_USD_PER_MTOK: float = 0.30
+    GEMINI_OUTPUT_USD_PER_MTOK: float = 2.50
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     # Helper to construct DB URL dynamically if missing
@@ -0,0 +1,130 @@
+import json
+import math
+import threading
+from typing import Dict, Optional, Tuple
+import redis
+from src.core.config import settings
+from src.core.logger import logger
+
+SeriesKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# name -> (type, help). Histograms are stored as their _bucket/_sum/_count counters.
+METRICS = {
+    "glashaus_span_duration_seconds": ("histogram", "Duration of traced operations."),
+    "glashaus_span_errors_total": ("counter", "Traced operations that raised."),
+    "glashaus_span_bytes_total": ("counter", "Response bytes received inside traced operations."),
+    "glashaus_span_retries_total": ("counter", "Retries performed inside traced operations."),
+    "glashaus_http_requests_total": ("counter", "Upstream HTTP responses by host and status class."),
+    "glashaus_gemini_tokens_total": ("counter", "Gemini tokens billed, by direction."),
+    "glashaus_gemini_cost_usd_total": ("counter", "Estimated Gemini spend in USD."),
+    "glashaus_gemini_cache_total": ("counter", "Memoized Gemini analysis lookups, by outcome."),
+    "glashaus_geocode_cache_total": ("counter", "Geocode cache lookups, by outcome."),
+}
+
+class RedisMetricsSink:
+    """Aggregates counters from every API/worker process in one Redis hash."""
+
+    def __init__(self, url: str, key: str = "glashaus:metrics"):
+        self.key = key
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    @staticmethod
+    def _field(series: SeriesKey) -> str:
+        return json.dumps([series[0], series[1]])
+
+    def push(self, deltas: Dict[SeriesKey, float]):
+        pipe = self.client.pipeline(transaction=False)
+        for series, value in deltas.items():
+            pipe.hincrbyfloat(self.key, self._field(series), value)
+        pipe.execute()
+
+    def load(self) -> Dict[SeriesKey, float]:
+        totals = {}
+        for field, value in self.client.hgetall(self.key).items():
+            name, labels = json.loads(field)
+            totals[(name, tuple(tuple(pair) for pair in labels))] = float(value)
+        return totals
+
+class MetricsRegistry:
+    """
+    Counters and histograms rendered in the Prometheus text format. With a sink,
+    deltas are pushed on `flush()` (end of each worker task / each scrape) so the
+    API's /metrics also covers work done in Celery workers.
+    """
+
+    def __init__(self, sink: Optional[RedisMetricsSink] = None):
+        self.sink = sink
+        self._values: Dict[SeriesKey, float] = {}
+        self._pending: Dict[SeriesKey, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, str]) -> SeriesKey:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def _add(self, series: SeriesKey, value: float):
+        self._values[series] = self._values.get(series, 0.0) + value
+        if self.sink:
+            self._pending[series] = self._pending.get(series, 0.0) + value
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        if not value: return
+        with self._lock:
+            self._add(self._key(name, labels), value)
+
+    def observe(self, name: str, value: float, buckets=DURATION_BUCKETS, **labels):
+        with self._lock:
+            for le in (*buckets, math.inf):
+                if value <= le:
+                    le_label = "+Inf" if le == math.inf else repr(le)
+                    self._add(self._key(f"{name}_bucket", {**labels, "le": le_label}), 1)
+            self._add(self._key(f"{name}_sum", labels), value)
+            self._add(self._key(f"{name}_count", labels), 1)
+
+    def flush(self):
+        if not self.sink: return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending: return
+        try:
+            self.sink.push(pending)
+        except Exception as e:
+            logger.warning("metrics_flush_failed", error=str(e))
+            with self._lock:
+                for series, value in pending.items():
+                    self._pending[series] = self._pending.get(series, 0.0) + value
+
+    def collect(self) -> Dict[SeriesKey, float]:
+        if self.sink:
+            self.flush()
+            try:
+                return self.sink.load()
+            except Exception as e:
+                logger.warning("metrics_load_failed", error=str(e))
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> str:
+        by_metric: Dict[str, list] = {}
+        for (name, labels), value in sorted(self.collect().items()):
+            base = next((m for m in METRICS if name == m or name.startswith(m + "_")), name)
+            by_metric.setdefault(base, []).append((name, labels, value))
+
+        lines = []
+        for base, series in by_metric.items():
+            kind, help_text = METRICS.get(base, ("untyped", ""))
+            lines.append(f"# HELP {base} {help_text}")
+            lines.append(f"# TYPE {base} {kind}")
+            for name, labels, value in series:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{name}{{{label_str}}} {value:g}" if label_str else f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+def build_metrics() -> MetricsRegistry:
+    if settings.METRICS_BACKEND == "redis":
+        return MetricsRegistry(RedisMetricsSink(settings.REDIS_URL))
+    return MetricsRegistry()
+
+metrics = build_metrics()
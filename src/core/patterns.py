@@ -1,23 +1,95 @@
 import re
-from typing import List
+from typing import Dict, Iterable, List, Optional, Tuple
+
+Span = Tuple[int, int]
+
+class PatternSet:
+    """
+    Named patterns compiled into one alternation and scanned in a single pass.
+    `scan` returns each name's first match span, identical to running that
+    pattern's own `search` over the text: the alternation stops at the leftmost
+    position where any member matches, the winner is recorded, and the scan
+    resumes from that position with the remaining members (compiled once per
+    subset), so overlapping matches never shadow each other.
+    """
+
+    def __init__(self, patterns: Dict[str, str], flags: int = re.IGNORECASE):
+        self.sources = dict(patterns)
+        self.flags = flags
+        self._compiled: Dict[Tuple[str, ...], re.Pattern] = {}
+
+    def pattern(self, names: Iterable[str]) -> re.Pattern:
+        key = tuple(names)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = re.compile("|".join(f"(?P<{n}>{self.sources[n]})" for n in key), self.flags)
+            self._compiled[key] = compiled
+        return compiled
+
+    def scan(self, text: str) -> Dict[str, Span]:
+        hits: Dict[str, Span] = {}
+        remaining = tuple(self.sources)
+        pos = 0
+        while remaining and text:
+            m = self.pattern(remaining).search(text, pos)
+            if not m: break
+            name = next(n for n in remaining if m.group(n) is not None)
+            hits[name] = m.span(name)
+            remaining = tuple(n for n in remaining if n != name)
+            # No remaining member matched before m.start(), so resume there
+            pos = m.start()
+        return hits
 
 class ForensicPatterns:
     """
     Centralized regex registry for text analysis.
+    Every rule lives in RULES and is matched in one pass by `scan`; the
+    per-rule compiled attributes remain for ad-hoc use.
     """
-    
-    # Financial & Legal Flags
-    VAT_EXCLUDED = re.compile(r"(?i)(цената е без ддс|без ддс|vat excluded|no vat|не се начислява ддс)")
-    SPACE_HACK = re.compile(r"(?i)(преустроена? гарсониера|усвоен.*?балкон|кухня.*?коридор|бивша.*?кухня|маломерен|боксониера|таванско)")
-    ATELIER_STATUTE = re.compile(r"(?i)(статут.*?ателие|статут на ателие|студио|творческо ателие|atelier)")
-    
-    # Valuation Flags
-    GROUND_FLOOR = re.compile(r"(?i)(партер|етаж 1 от|висок партер|кота 0|сутерен|етаж 1 жилищен)")
-    FUTURE_COMPLETION = re.compile(r"(?i)(\d{1,2}%.*?сега|\d{1,2}%.*?предварителен|\d{1,2}%.*?акт 16|въвеждане в експлоатация)")
-    
-    # Ownership Flags
-    DIRECT_OWNER = re.compile(r"(?i)(частно лице|собственик|без комисион|директно от)")
-    BROKER_EXCLUSION = re.compile(r"(?i)(само за частни|частни лица|агенции да не|без брокери|комисионна от купувача)")
+
+    RULES = {
+        # Financial & Legal Flags
+        "VAT_EXCLUDED": r"цената е без ддс|без ддс|vat excluded|no vat|не се начислява ддс",
+        "SPACE_HACK": r"преустроена? гарсониера|усвоен.*?балкон|кухня.*?коридор|бивша.*?кухня|маломерен|боксониера|таванско",
+        "ATELIER_STATUTE": r"статут.*?ателие|статут на ателие|студио|творческо ателие|atelier",
+        "ATELIER_TERM": r"ателие",
+
+        # Valuation Flags
+        "GROUND_FLOOR": r"партер|етаж 1 от|висок партер|кота 0|сутерен|етаж 1 жилищен",
+        "FUTURE_COMPLETION": r"\d{1,2}%.*?сега|\d{1,2}%.*?предварителен|\d{1,2}%.*?акт 16|въвеждане в експлоатация",
+        "CENTRAL_HEATING": r"тец|централно отопление",
+        "AREA_TERM": r"площ",
+
+        # Scraper price/seller decisions: narrower than VAT_EXCLUDED/DIRECT_OWNER, whose
+        # "не се начислява ддс" (no VAT at all) and "директно от" (строител) must not trigger them
+        "PRICE_EXCLUDES_VAT": r"цената е без ддс|без ддс|vat excluded",
+        "PRIVATE_SELLER": r"частно лице|собственик|без комисион",
+
+        # Ownership Flags
+        "DIRECT_OWNER": r"частно лице|собственик|без комисион|директно от",
+        "BROKER_EXCLUSION": r"само за частни|частни лица|агенции да не|без брокери|комисионна от купувача",
+    }
+
+    VAT_EXCLUDED = re.compile(RULES["VAT_EXCLUDED"], re.IGNORECASE)
+    SPACE_HACK = re.compile(RULES["SPACE_HACK"], re.IGNORECASE)
+    ATELIER_STATUTE = re.compile(RULES["ATELIER_STATUTE"], re.IGNORECASE)
+    GROUND_FLOOR = re.compile(RULES["GROUND_FLOOR"], re.IGNORECASE)
+    FUTURE_COMPLETION = re.compile(RULES["FUTURE_COMPLETION"], re.IGNORECASE)
+    DIRECT_OWNER = re.compile(RULES["DIRECT_OWNER"], re.IGNORECASE)
+    PRICE_EXCLUDES_VAT = re.compile(RULES["PRICE_EXCLUDES_VAT"], re.IGNORECASE)
+    PRIVATE_SELLER = re.compile(RULES["PRIVATE_SELLER"], re.IGNORECASE)
+    BROKER_EXCLUSION = re.compile(RULES["BROKER_EXCLUSION"], re.IGNORECASE)
+
+    # Rule -> flag reported by extract_flags. VAT is not flagged: the Scraper handles it mathematically.
+    FLAG_NAMES = {
+        "SPACE_HACK": "CONVERSION_RISK",
+        "ATELIER_STATUTE": "ATELIER_DETECTED",
+        "GROUND_FLOOR": "GROUND_FLOOR_RISK",
+        "DIRECT_OWNER": "DIRECT_OWNER_LISTING",
+        "BROKER_EXCLUSION": "RESTRICTED_ACCESS_BROKER",
+    }
+
+    MATCHER = PatternSet(RULES)
 
     @classmethod
     def normalize_text(cls, text: str) -> str:
@@ -26,20 +98,18 @@ class ForensicPatterns:
         return re.sub(r'\s+', ' ', text).strip().upper()
 
     @classmethod
-    def extract_flags(cls, text: str) -> List[str]:
-        flags = []
-        if not text: return flags
-        
-        # We don't flag VAT here because we handle it mathematically in the Scraper
-        if cls.SPACE_HACK.search(text):
-            flags.append("CONVERSION_RISK")
-        if cls.ATELIER_STATUTE.search(text):
-            flags.append("ATELIER_DETECTED")
-        if cls.GROUND_FLOOR.search(text):
-            flags.append("GROUND_FLOOR_RISK")
-        if cls.DIRECT_OWNER.search(text):
-            flags.append("DIRECT_OWNER_LISTING")
-        if cls.BROKER_EXCLUSION.search(text):
-            flags.append("RESTRICTED_ACCESS_BROKER")
-            
-        return flags
+    def scan(cls, text: str) -> Dict[str, Span]:
+        """Rule name -> span of its first match in the normalized text, in one pass."""
+        return cls.MATCHER.scan(cls.normalize_text(text))
+
+    @classmethod
+    def hits_for(cls, scraped: dict) -> Dict[str, Span]:
+        """The scraper's stored hits, or a fresh scan of raw_text for listings scraped before they existed."""
+        hits = scraped.get("pattern_hits")
+        return hits if hits is not None else cls.scan(scraped.get("raw_text", ""))
+
+    @classmethod
+    def extract_flags(cls, text: str = "", hits: Optional[Dict[str, Span]] = None) -> List[str]:
+        if hits is None:
+            hits = cls.scan(text)
+        return [flag for rule, flag in cls.FLAG_NAMES.items() if rule in hits]
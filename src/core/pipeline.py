@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from src.core.logger import logger
+from src.core.tracing import span
+
+StageFn = Callable[..., Awaitable[Any]]
+
+class StageTimeout(Exception):
+    """A stage exceeded its timeout and has no fallback."""
+
+def _json_default(value):
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    return str(value)
+
+def digest(value: Any) -> str:
+    """Stable content hash of a stage result (pydantic models, dicts, lists, tuples, scalars)."""
+    canonical = json.dumps(value, default=_json_default, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class Codec:
+    """
+    How a stage result is persisted between runs: `dump` to JSON-able data,
+    `load` back, and `reusable(result)` to refuse storing degraded results.
+    """
+
+    def __init__(self, dump: Callable[[Any], Any] = lambda r: r, load: Callable[[Any], Any] = lambda d: d,
+                 reusable: Optional[Callable[[Any], bool]] = None):
+        self.dump = dump
+        self.load = load
+        self.reusable = reusable or (lambda r: True)
+
+    @classmethod
+    def model(cls, model, reusable: Optional[Callable[[Any], bool]] = None) -> "Codec":
+        return cls(lambda r: r.model_dump(mode="json"), model.model_validate, reusable)
+
+class Stage:
+    """
+    One node of a Pipeline. `fn` is called with the results of the stages in
+    `after` as keyword arguments. On timeout, `fallback()` (if given) supplies
+    the result instead of failing the run.
+
+    Stages with a `codec` are incremental: their fingerprint hashes `salt` and
+    the digests of their inputs, and when it equals the one recorded by a
+    previous run the stored output is reused instead of calling `fn`. `uses`
+    maps an input to the part of it the stage actually reads (e.g. a listing's
+    image URLs rather than the whole listing); only that part is fingerprinted.
+    """
+
+    def __init__(self, name: str, fn: StageFn, after: Iterable[str] = (),
+                 timeout: Optional[float] = None, fallback: Optional[Callable[[], Any]] = None,
+                 codec: Optional[Codec] = None, salt: str = "",
+                 uses: Optional[Dict[str, Callable[[Any], Any]]] = None):
+        self.name = name
+        self.fn = fn
+        self.after = tuple(after)
+        self.timeout = timeout
+        self.fallback = fallback
+        self.codec = codec
+        self.salt = salt
+        self.uses = uses or {}
+
+class PipelineRun:
+    def __init__(self):
+        self.results: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+        self.digests: Dict[str, str] = {}
+        # stage -> {"fingerprint", "digest", "output"} for incremental stages worth keeping
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.started = time.perf_counter()
+
+    @property
+    def reused(self) -> List[str]:
+        return [name for name, t in self.timings.items() if t["status"] == "reused"]
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+class Pipeline:
+    """
+    Dependency graph of async stages. Every stage starts as soon as all of its
+    inputs are ready, so a run takes as long as its critical path. If a stage
+    fails, the stages still running are cancelled and the error propagates.
+    """
+
+    def __init__(self, name: str, stages: List[Stage]):
+        self.name = name
+        self.stages = self._ordered(stages)
+
+    @staticmethod
+    def _ordered(stages: List[Stage]) -> List[Stage]:
+        by_name = {s.name: s for s in stages}
+        if len(by_name) != len(stages):
+            raise ValueError("duplicate stage names")
+        ordered, state = [], {}
+
+        def visit(stage: Stage):
+            if state.get(stage.name) == "done": return
+            if state.get(stage.name) == "visiting":
+                raise ValueError(f"cycle at stage '{stage.name}'")
+            state[stage.name] = "visiting"
+            for dep in stage.after:
+                if dep not in by_name:
+                    raise ValueError(f"stage '{stage.name}' depends on unknown stage '{dep}'")
+                visit(by_name[dep])
+            state[stage.name] = "done"
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage)
+        return ordered
+
+    @staticmethod
+    def fingerprint(stage: Stage, digests: Dict[str, str], results: Dict[str, Any]) -> str:
+        inputs = [digest(stage.uses[dep](results[dep])) if dep in stage.uses else digests[dep]
+                  for dep in stage.after]
+        raw = json.dumps([stage.name, stage.salt, inputs])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def _run_stage(self, stage: Stage, tasks: Dict[str, asyncio.Task], run: PipelineRun,
+                         previous: Dict[str, Dict[str, Any]]):
+        inputs = {dep: await tasks[dep] for dep in stage.after}
+        ready = time.perf_counter()
+        status = "ok"
+
+        fingerprint = self.fingerprint(stage, run.digests, run.results) if stage.codec else None
+        record = previous.get(stage.name)
+        if fingerprint and record and record["fingerprint"] == fingerprint:
+            result = stage.codec.load(record["output"])
+            run.digests[stage.name] = record["digest"]
+            run.records[stage.name] = record
+            run.timings[stage.name] = {"start": round(ready - run.started, 4), "duration": 0.0, "status": "reused"}
+            run.results[stage.name] = result
+            return result
+
+        try:
+            with span(f"{self.name}.{stage.name}"):
+                result = await asyncio.wait_for(stage.fn(**inputs), stage.timeout)
+        except asyncio.TimeoutError:
+            if stage.fallback is None:
+                status = "timeout"
+                raise StageTimeout(f"{self.name}.{stage.name} exceeded {stage.timeout}s")
+            status = "fallback"
+            logger.warning("pipeline_stage_timeout", pipeline=self.name, stage=stage.name, timeout=stage.timeout)
+            result = stage.fallback()
+        except BaseException:
+            status = "failed"
+            raise
+        finally:
+            run.timings[stage.name] = {
+                "start": round(ready - run.started, 4),
+                "duration": round(time.perf_counter() - ready, 4),
+                "status": status,
+            }
+        run.results[stage.name] = result
+        if stage.codec and status == "ok" and stage.codec.reusable(result):
+            output = stage.codec.dump(result)
+            run.digests[stage.name] = digest(output)
+            run.records[stage.name] = {"fingerprint": fingerprint, "digest": run.digests[stage.name], "output": output}
+        else:
+            run.digests[stage.name] = digest(result)
+        return result
+
+    async def run(self, previous: Optional[Dict[str, Dict[str, Any]]] = None) -> PipelineRun:
+        """
+        Runs every stage. `previous` (stage -> record, as in PipelineRun.records)
+        lets incremental stages whose fingerprint is unchanged reuse their output.
+        """
+        run = PipelineRun()
+        tasks: Dict[str, asyncio.Task] = {}
+        # Topological order guarantees every dependency's task exists first
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.create_task(self._run_stage(stage, tasks, run, previous or {}))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        finally:
+            logger.info("pipeline_complete", pipeline=self.name, elapsed=round(run.elapsed, 4), stages=run.timings)
+        return run
@@ -0,0 +1,249 @@
+import asyncio
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+import httpx
+import redis.asyncio as aioredis
+from src.core.config import settings
+from src.core.logger import logger
+from src.core.metrics import metrics
+from src.core.tracing import add_bytes
+
+class HostLimit:
+    """Token bucket parameters for one upstream; `rate` adapts between min_rate and max_rate (AIMD)."""
+
+    def __init__(self, rate: float, burst: float, min_rate: float, max_rate: float, step: float):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+
+# Keys match the host or any parent domain ('m.imot.bg' -> 'imot.bg')
+DEFAULT_LIMITS: Dict[str, HostLimit] = {
+    "kais.cadastre.bg": HostLimit(rate=1.5, burst=1, min_rate=0.2, max_rate=5.0, step=0.05),
+    "nag.sofia.bg": HostLimit(rate=3.0, burst=3, min_rate=0.3, max_rate=10.0, step=0.1),
+    "imot.bg": HostLimit(rate=1.0, burst=2, min_rate=0.1, max_rate=4.0, step=0.05),
+    "maps.googleapis.com": HostLimit(rate=20.0, burst=20, min_rate=2.0, max_rate=50.0, step=1.0),
+    # Paid-tier Flash quota (~2000 RPM); a burst of GEMINI_MAX_CONCURRENCY so the fan-out is not throttled
+    "generativelanguage.googleapis.com": HostLimit(rate=30.0, burst=16, min_rate=2.0, max_rate=30.0, step=1.0),
+}
+FALLBACK_LIMIT = HostLimit(rate=10.0, burst=10, min_rate=1.0, max_rate=30.0, step=0.5)
+BACKOFF_FACTOR = 0.5
+
+def limit_for(host: str) -> HostLimit:
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        limit = DEFAULT_LIMITS.get(".".join(parts[i:]))
+        if limit:
+            override = settings.RATE_LIMITS.get(".".join(parts[i:]))
+            if override:
+                return HostLimit(override, limit.burst, limit.min_rate, max(limit.max_rate, override), limit.step)
+            return limit
+    return FALLBACK_LIMIT
+
+class _Bucket:
+    def __init__(self, limit: HostLimit):
+        self.limit = limit
+        self.rate = limit.rate
+        self.tokens = limit.burst
+        self.updated = time.monotonic()
+
+class MemoryRateLimiter:
+    """
+    Per-process token buckets. Acquiring reserves a slot up front (tokens may go
+    negative) and returns the wait, so it is safe across threads and event loops.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> _Bucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets.setdefault(host, _Bucket(limit_for(host)))
+        return bucket
+
+    async def acquire(self, host: str):
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            bucket.tokens = min(bucket.limit.burst, bucket.tokens + (now - bucket.updated) * bucket.rate) - 1
+            bucket.updated = now
+            wait = -bucket.tokens / bucket.rate if bucket.tokens < 0 else 0.0
+        if wait:
+            await asyncio.sleep(wait)
+
+    async def on_success(self, host: str):
+        with self._lock:
+            bucket = self._bucket(host)
+            bucket.rate = min(bucket.limit.max_rate, bucket.rate + bucket.limit.step)
+
+    async def on_throttle(self, host: str, retry_after: Optional[float] = None):
+        with self._lock:
+            bucket = self._bucket(host)
+            bucket.rate = max(bucket.limit.min_rate, bucket.rate * BACKOFF_FACTOR)
+            # Empty the bucket (and honour Retry-After) so the next caller waits
+            bucket.tokens = min(bucket.tokens, -(retry_after or 0) * bucket.rate)
+            rate = bucket.rate
+        logger.warning("rate_limit_backoff", host=host, rate=round(rate, 3), retry_after=retry_after)
+
+# KEYS[1] bucket; ARGV: default_rate, burst. Uses server TIME so all workers share one clock.
+_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate')
+local rate = tonumber(b[3]) or tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local tokens = tonumber(b[1]) or burst
+local ts = tonumber(b[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate) - 1
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now, 'rate', rate)
+redis.call('EXPIRE', KEYS[1], 3600)
+if tokens >= 0 then return '0' end
+return tostring(-tokens / rate)
+"""
+
+# KEYS[1] bucket; ARGV: mode ('up'|'down'), default_rate, min_rate, max_rate, step, factor, retry_after
+_FEEDBACK_LUA = """
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or tonumber(ARGV[2])
+if ARGV[1] == 'down' then
+  rate = math.max(tonumber(ARGV[3]), rate * tonumber(ARGV[6]))
+  local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens')) or 0
+  redis.call('HSET', KEYS[1], 'tokens', math.min(tokens, -tonumber(ARGV[7]) * rate))
+else
+  rate = math.min(tonumber(ARGV[4]), rate + tonumber(ARGV[5]))
+end
+redis.call('HSET', KEYS[1], 'rate', rate)
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(rate)
+"""
+
+class RedisRateLimiter:
+    """Same contract as MemoryRateLimiter, with one budget per host shared by every Celery worker."""
+
+    def __init__(self, url: str, prefix: str = "glashaus:ratelimit"):
+        self.url = url
+        self.prefix = prefix
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = aioredis.from_url(self.url, decode_responses=True)
+            self._clients[loop] = client
+        return client
+
+    async def acquire(self, host: str):
+        limit = limit_for(host)
+        try:
+            wait = float(await self._client().eval(_ACQUIRE_LUA, 1, f"{self.prefix}:{host}", limit.rate, limit.burst))
+        except Exception as e:
+            logger.warning("rate_limiter_unavailable", host=host, error=str(e))
+            wait = 1.0 / limit.rate
+        if wait:
+            await asyncio.sleep(wait)
+
+    async def _feedback(self, host: str, mode: str, retry_after: float = 0.0) -> Optional[float]:
+        limit = limit_for(host)
+        try:
+            return float(await self._client().eval(
+                _FEEDBACK_LUA, 1, f"{self.prefix}:{host}", mode, limit.rate, limit.min_rate,
+                limit.max_rate, limit.step, BACKOFF_FACTOR, retry_after
+            ))
+        except Exception as e:
+            logger.warning("rate_limiter_unavailable", host=host, error=str(e))
+            return None
+
+    async def on_success(self, host: str):
+        await self._feedback(host, "up")
+
+    async def on_throttle(self, host: str, retry_after: Optional[float] = None):
+        rate = await self._feedback(host, "down", retry_after or 0.0)
+        logger.warning("rate_limit_backoff", host=host, rate=rate, retry_after=retry_after)
+
+def is_throttle_response(response: httpx.Response) -> bool:
+    return response.status_code == 429 or response.status_code >= 500
+
+def parse_retry_after(value: Optional[str], limit: float) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header, either delta-seconds or an
+    HTTP-date, clamped to [0, limit]. None if the header is missing or invalid.
+    """
+    if not value: return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = (when - datetime.now(timezone.utc)).total_seconds()
+    if seconds != seconds: return None  # NaN
+    return min(max(seconds, 0.0), limit)
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    return parse_retry_after(response.headers.get("Retry-After"), settings.RATE_LIMIT_MAX_RETRY_AFTER)
+
+class _CountingStream(httpx.AsyncByteStream):
+    """Attributes response bytes to the span that reads the body."""
+
+    def __init__(self, stream: httpx.AsyncByteStream):
+        self.stream = stream
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            add_bytes(len(chunk))
+            yield chunk
+
+    async def aclose(self):
+        await self.stream.aclose()
+
+class RateLimitedTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that spends a token per request, feeds 429/5xx back into AIMD
+    and counts response bytes toward the current trace span. With
+    `adaptive=False` it only paces: for clients that handle throttling
+    themselves (Retry-After backoff), so one 429 is not penalized twice.
+    """
+
+    def __init__(self, limiter=None, transport: Optional[httpx.AsyncBaseTransport] = None, adaptive: bool = True):
+        self.limiter = limiter or rate_limiter
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.adaptive = adaptive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        await self.limiter.acquire(host)
+        response = await self.transport.handle_async_request(request)
+        metrics.inc("glashaus_http_requests_total", host=host, status=f"{response.status_code // 100}xx")
+        if self.adaptive:
+            if is_throttle_response(response):
+                await self.limiter.on_throttle(host, _retry_after(response))
+            else:
+                await self.limiter.on_success(host)
+        return httpx.Response(
+            status_code=response.status_code, headers=response.headers,
+            stream=_CountingStream(response.stream), extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+def limited_client(adaptive: bool = True, **kwargs) -> httpx.AsyncClient:
+    """An httpx.AsyncClient whose every request goes through the shared per-host limiter."""
+    return httpx.AsyncClient(transport=RateLimitedTransport(adaptive=adaptive), **kwargs)
+
+def build_rate_limiter():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimiter(settings.REDIS_URL)
+    return MemoryRateLimiter()
+
+rate_limiter = build_rate_limiter()
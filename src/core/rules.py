@@ -0,0 +1,224 @@
+import datetime
+import json
+import math
+import operator
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.core.patterns import ForensicPatterns
+
+class RuleSetError(ValueError):
+    """The rule file is malformed (unknown field, operator or type)."""
+
+def _year_prefix(value) -> int:
+    """'2027-06-01' -> 2027; 0 when missing or unparsable."""
+    if value and len(value) >= 4:
+        try:
+            return int(value[:4])
+        except ValueError:
+            pass
+    return 0
+
+def _div(a, b):
+    # Scalar twin of NumPy's float division, so guarded and unguarded rules agree in both paths
+    if b == 0:
+        return math.nan if a == 0 else math.copysign(math.inf, a)
+    return a / b
+
+# type -> (coercion, column dtype; None = message-only)
+FIELD_TYPES = {
+    "bool": (bool, bool),
+    "present": (bool, bool),
+    "int": (lambda v: int(v or 0), np.int64),
+    "float": (lambda v: float(v or 0), np.float64),
+    "year": (_year_prefix, np.int64),
+    "count": (lambda v: len(v or []), np.int64),
+    "str": (lambda v: v, None),
+}
+
+COMPARISONS = {">": operator.gt, ">=": operator.ge, "<": operator.lt, "<=": operator.le,
+               "==": operator.eq, "!=": operator.ne}
+ARITHMETIC = {"+": operator.add, "-": operator.sub, "*": operator.mul}
+
+Compiled = Tuple[Callable[[Dict], Any], Callable[[Dict], Any]]
+
+class _Field:
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        self.name = name
+        self.type = spec.get("type", "str")
+        self.path = spec.get("path", "").split(".") if spec.get("path") else []
+        self.pattern = spec.get("pattern")
+        self.key = spec.get("key")
+        self.limit = spec.get("limit")
+        self.default = spec.get("default")
+        if self.type == "pattern":
+            if self.pattern not in ForensicPatterns.RULES:
+                raise RuleSetError(f"field {name}: unknown pattern {self.pattern}")
+            self.dtype = bool
+        elif self.type == "ids":
+            self.dtype = None
+        elif self.type in FIELD_TYPES:
+            self.coerce, self.dtype = FIELD_TYPES[self.type]
+        else:
+            raise RuleSetError(f"field {name}: unknown type {self.type}")
+
+    def extract(self, data: Dict, hits: Callable[[], Dict]) -> Any:
+        if self.type == "pattern":
+            return self.pattern in hits()
+        value = data
+        for part in self.path:
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is None:
+            value = self.default
+        if self.type == "ids":
+            items = (value or [])[:self.limit]
+            return ", ".join(str(item[self.key] if self.key else item) for item in items)
+        return self.coerce(value)
+
+class _Rule:
+    def __init__(self, spec: Dict[str, Any], compile_expr: Callable[[Any], Compiled]):
+        self.id = spec["id"]
+        self.bit = 1 << int(spec["bit"])
+        self.weight = int(spec.get("weight", 0))
+        self.fatal = bool(spec.get("fatal", False))
+        self.message = spec.get("message", self.id)
+        self.lets = [(name, compile_expr(expr)) for name, expr in (spec.get("let") or {}).items()]
+        self.when = compile_expr(spec["when"])
+
+class RuleSet:
+    """
+    Declarative risk rules (see rules/risk_rules.json), compiled once into a
+    scalar evaluator for single audits and a NumPy evaluator for bulk
+    re-scoring. Conditions are JSON expressions over named fields extracted
+    from the forensic bundle: {"op": [args]} with and/or/not, comparisons and
+    + - * /; strings name fields, `let` values or "$current_year".
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.version = str(spec["version"])
+        self.max_score = int(spec.get("max_score", 100))
+        self.fields = {name: _Field(name, f) for name, f in spec["fields"].items()}
+        self.condition_fields: List[str] = []
+        self.rules: List[_Rule] = []
+        for rule_spec in spec["rules"]:
+            self._names = set(self.fields) | set((rule_spec.get("let") or {}))
+            self.rules.append(_Rule(rule_spec, self._compile))
+        bits = [r.bit for r in self.rules]
+        if len(set(bits)) != len(bits):
+            raise RuleSetError("rule bits must be unique")
+
+    @classmethod
+    def load(cls, path: str) -> "RuleSet":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    # --- COMPILER ---
+
+    def _compile(self, node) -> Compiled:
+        if isinstance(node, (bool, int, float)):
+            return (lambda row: node), (lambda cols: node)
+        if isinstance(node, str):
+            if node == "$current_year":
+                return (lambda row: row["$current_year"]), (lambda cols: cols["$current_year"])
+            if node not in self._names:
+                raise RuleSetError(f"unknown field {node}")
+            if node in self.fields:
+                if self.fields[node].dtype is None:
+                    raise RuleSetError(f"field {node} is message-only and cannot be used in a condition")
+                if node not in self.condition_fields:
+                    self.condition_fields.append(node)
+            return (lambda row: row[node]), (lambda cols: cols[node])
+        if not isinstance(node, dict) or len(node) != 1:
+            raise RuleSetError(f"bad expression {node!r}")
+
+        op, args = next(iter(node.items()))
+        args = args if isinstance(args, list) else [args]
+        parts = [self._compile(a) for a in args]
+        scalars, vectors = [p[0] for p in parts], [p[1] for p in parts]
+
+        if op == "and":
+            return (lambda row: all(s(row) for s in scalars)), \
+                   (lambda cols: np.logical_and.reduce([np.asarray(v(cols), dtype=bool) for v in vectors]))
+        if op == "or":
+            return (lambda row: any(s(row) for s in scalars)), \
+                   (lambda cols: np.logical_or.reduce([np.asarray(v(cols), dtype=bool) for v in vectors]))
+        if op == "not":
+            s, v = scalars[0], vectors[0]
+            return (lambda row: not s(row)), (lambda cols: np.logical_not(v(cols)))
+        if len(args) != 2:
+            raise RuleSetError(f"operator {op} takes two arguments")
+        (sa, sb), (va, vb) = scalars, vectors
+        if op in COMPARISONS:
+            fn = COMPARISONS[op]
+        elif op in ARITHMETIC:
+            fn = ARITHMETIC[op]
+        elif op == "/":
+            return (lambda row: _div(sa(row), sb(row))), \
+                   (lambda cols: np.divide(np.asarray(va(cols), dtype=np.float64), vb(cols)))
+        else:
+            raise RuleSetError(f"unknown operator {op}")
+        return (lambda row: fn(sa(row), sb(row))), (lambda cols: fn(va(cols), vb(cols)))
+
+    # --- SCALAR PATH ---
+
+    def extract(self, data: Dict) -> Dict[str, Any]:
+        """Every field of one forensic bundle (the shape stored in Report.discrepancy_details)."""
+        scraped = data.get("scraped") or {}
+        cache = []
+        def hits():
+            if not cache:
+                cache.append(ForensicPatterns.hits_for(scraped))
+            return cache[0]
+        return {name: field.extract(data, hits) for name, field in self.fields.items()}
+
+    def evaluate(self, data: Dict, current_year: Optional[int] = None) -> Dict[str, Any]:
+        row = self.extract(data)
+        row["$current_year"] = current_year or datetime.datetime.now().year
+        score, mask, is_fatal, flags = 0, 0, False, []
+        for rule in self.rules:
+            values = dict(row)
+            for name, (scalar, _) in rule.lets:
+                values[name] = scalar(values)
+            if not rule.when[0](values):
+                continue
+            score += rule.weight
+            mask |= rule.bit
+            is_fatal = is_fatal or rule.fatal
+            flags.append(rule.message.format(**values))
+        final_score = self.max_score if is_fatal else min(score, self.max_score)
+        return {"score": final_score, "flags": flags, "is_fatal": is_fatal,
+                "rule_mask": mask, "rule_set_version": self.version}
+
+    # --- VECTOR PATH ---
+
+    def to_columns(self, records: Sequence[Dict]) -> Dict[str, np.ndarray]:
+        """The fields the conditions read, as arrays (one row per forensic bundle)."""
+        rows = [self.extract(r) for r in records]
+        return {name: np.array([row[name] for row in rows], dtype=self.fields[name].dtype)
+                for name in self.condition_fields}
+
+    def evaluate_batch(self, columns, current_year: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        `evaluate` over columnar input (dict of arrays or a DataFrame holding
+        condition_fields). Returns (scores, rule masks), equal to the scalar path.
+        """
+        cols = {name: np.asarray(columns[name], dtype=self.fields[name].dtype) for name in self.condition_fields}
+        n = len(next(iter(cols.values()))) if cols else 0
+        cols["$current_year"] = current_year or datetime.datetime.now().year
+
+        scores = np.zeros(n, dtype=np.int64)
+        masks = np.zeros(n, dtype=np.int64)
+        fatal = np.zeros(n, dtype=bool)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for rule in self.rules:
+                values = dict(cols)
+                for name, (_, vector) in rule.lets:
+                    values[name] = vector(values)
+                fired = np.broadcast_to(np.asarray(rule.when[1](values), dtype=bool), (n,))
+                scores += np.where(fired, rule.weight, 0)
+                masks |= np.where(fired, rule.bit, 0)
+                if rule.fatal:
+                    fatal |= fired
+        return np.where(fatal, self.max_score, np.minimum(scores, self.max_score)), masks
+
+    def rule_names(self, mask: int) -> List[str]:
+        return [rule.id for rule in self.rules if mask & rule.bit]
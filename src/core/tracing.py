@@ -0,0 +1,91 @@
+import functools
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+import structlog
+from src.core.logger import logger
+from src.core.metrics import metrics
+
+_current: ContextVar[Optional["Span"]] = ContextVar("glashaus_span", default=None)
+
+class Span:
+    """
+    One timed operation. Bytes, retries and cost roll up into the parent span
+    on exit, so the root span of an audit carries the audit's totals.
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.attrs = attrs
+        self.bytes = 0
+        self.retries = 0
+        self.cost = 0.0
+        self.started = time.perf_counter()
+        self.duration = 0.0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def add_bytes(count: int):
+    span = _current.get()
+    if span:
+        span.bytes += count
+
+def add_retry():
+    span = _current.get()
+    if span:
+        span.retries += 1
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Span]:
+    """
+    Traces a block (sync or async code). `attrs` go to the log event only;
+    metrics are labelled by span name, so keep names low-cardinality.
+    """
+    parent = _current.get()
+    current = Span(name, parent, attrs)
+    token = _current.set(current)
+    error = None
+    try:
+        with structlog.contextvars.bound_contextvars(trace_id=current.trace_id, span_id=current.span_id):
+            yield current
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current.reset(token)
+        current.duration = time.perf_counter() - current.started
+        if parent:
+            parent.bytes += current.bytes
+            parent.retries += current.retries
+            parent.cost += current.cost
+
+        metrics.observe("glashaus_span_duration_seconds", current.duration, span=name)
+        metrics.inc("glashaus_span_bytes_total", current.bytes, span=name)
+        metrics.inc("glashaus_span_retries_total", current.retries, span=name)
+        if error is not None:
+            metrics.inc("glashaus_span_errors_total", span=name)
+        logger.info(
+            "span", span=name, trace_id=current.trace_id, span_id=current.span_id,
+            parent_id=parent.span_id if parent else None, duration_ms=round(current.duration * 1000, 1),
+            bytes=current.bytes, retries=current.retries, cost=round(current.cost, 6),
+            error=type(error).__name__ if error else None, **current.attrs
+        )
+
+def traced(name: str):
+    """Decorator form of `span` for coroutine functions."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -15,6 +15,11 @@ def calculate_content_hash(text: str, price: float) -> str:
     raw = f"{clean_text}{price}".encode('utf-8')
     return hashlib.sha256(raw).hexdigest()
 
+def calculate_text_hash(text: str) -> str:
+    """Whitespace- and case-insensitive hash of listing text (price excluded)."""
+    clean_text = re.sub(r'\s+', ' ', text).strip().lower()
+    return hashlib.sha256(clean_text.encode('utf-8')).hexdigest()
+
 def normalize_sofia_street(address: str) -> str:
     """Strips common Sofia prefixes that confuse the Cadastre search."""
     if not address: return ""
@@ -24,3 +29,24 @@ def normalize_sofia_street(address: str) -> str:
     for p in patterns:
         clean = re.sub(p, '', clean)
     return clean.strip()
+
+def normalize_geocode_query(prediction: str, landmarks: list) -> str:
+    """
+    Canonical geocode query: whitespace collapsed, landmarks de-duplicated and
+    sorted, so the same clues in another order hit the same cache entry.
+    """
+    def clean(s: str) -> str:
+        return re.sub(r'\s+', ' ', s or '').strip()
+    unique = {clean(l).lower(): clean(l) for l in landmarks or [] if clean(l)}
+    parts = [clean(prediction), *(unique[k] for k in sorted(unique))]
+    return f"{' '.join(p for p in parts if p)}, Sofia, Bulgaria"
+
+def normalize_address_key(address: str) -> str:
+    """
+    Cache key for address lookups: street prefixes stripped, lower-cased,
+    punctuation dropped and whitespace collapsed, so 'ул. Шипка 6, бл.2' and
+    'шипка 6 бл 2' resolve to the same key.
+    """
+    clean = normalize_sofia_street(address).lower()
+    clean = re.sub(r'[^\w\s]', ' ', clean)
+    return re.sub(r'\s+', ' ', clean).strip()
@@ -1,6 +1,7 @@
 import enum
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, JSON, Text, Enum, Numeric
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, JSON, Text, Enum, Numeric, Computed, UniqueConstraint
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.types import UserDefinedType
 from sqlalchemy.sql import func
 from src.db.session import Base
 
@@ -11,6 +12,17 @@ class ReportStatus(str, enum.Enum):
     MANUAL_REVIEW = "MANUAL_REVIEW"
     REJECTED = "REJECTED"
 
+class Geography(UserDefinedType):
+    """PostGIS geography(<type>, <srid>): distances and radii in metres."""
+    cache_ok = True
+
+    def __init__(self, geometry_type: str = "Point", srid: int = 4326):
+        self.geometry_type = geometry_type
+        self.srid = srid
+
+    def get_col_spec(self, **kw):
+        return f"geography({self.geometry_type}, {self.srid})"
+
 class Listing(Base):
     __tablename__ = "listings"
     id = Column(Integer, primary_key=True, index=True)
@@ -25,6 +37,15 @@ class Listing(Base):
     
     description_raw = Column(Text)
     scraped_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Conditional re-scrape state (ScraperService.fetch_if_changed)
+    etag = Column(String(255))
+    last_modified = Column(String(64))
+    body_hash = Column(String(64))
+    checked_at = Column(DateTime(timezone=True))
+    # Price monitoring: shrinks while the ad keeps changing, grows while it is static
+    recheck_interval = Column(Integer)
+    next_check_at = Column(DateTime(timezone=True), index=True)
     
     reports = relationship("Report", back_populates="listing", cascade="all, delete-orphan")
     price_history = relationship("PriceHistory", back_populates="listing")
@@ -36,6 +57,11 @@ class Building(Base):
     address_full = Column(String)
     latitude = Column(Float)
     longitude = Column(Float)
+    # Derived by PostGIS from latitude/longitude (migration 006), GiST-indexed for radius/bbox queries
+    location = deferred(Column(
+        Geography("Point", 4326),
+        Computed("ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography", persisted=True)
+    ))
     construction_year = Column(Integer)
     reports = relationship("Report", back_populates="building")
 
@@ -47,6 +73,38 @@ class PriceHistory(Base):
     changed_at = Column(DateTime(timezone=True), server_default=func.now())
     listing = relationship("Listing", back_populates="price_history")
 
+class CadastreResolution(Base):
+    """Cached KAIS lookup keyed by the normalized address (see normalize_address_key)."""
+    __tablename__ = "cadastre_resolutions"
+    id = Column(Integer, primary_key=True)
+    address_key = Column(String(255), unique=True, nullable=False, index=True)
+    status = Column(String(16), nullable=False)
+    result = Column(JSON, nullable=False)
+    resolved_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+class AIAnalysis(Base):
+    """Memoized Gemini result keyed by GeminiService.analysis_key (text, photos, model, prompt)."""
+    __tablename__ = "ai_analyses"
+    id = Column(Integer, primary_key=True)
+    cache_key = Column(String(64), unique=True, nullable=False, index=True)
+    model = Column(String(64), nullable=False)
+    prompt_version = Column(String(16), nullable=False)
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class AuditStageResult(Base):
+    """Last fingerprint and output of an incremental audit stage, per listing (see Pipeline)."""
+    __tablename__ = "audit_stage_results"
+    __table_args__ = (UniqueConstraint("listing_id", "stage", name="uq_audit_stage_results_listing_stage"),)
+    id = Column(Integer, primary_key=True)
+    listing_id = Column(Integer, ForeignKey("listings.id", ondelete="CASCADE"), nullable=False, index=True)
+    stage = Column(String(32), nullable=False)
+    fingerprint = Column(String(64), nullable=False)
+    digest = Column(String(64), nullable=False)
+    output = Column(JSON, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class Report(Base):
     __tablename__ = "reports"
     id = Column(Integer, primary_key=True, index=True)
@@ -54,6 +112,7 @@ class Report(Base):
     building_id = Column(Integer, ForeignKey("buildings.id"), nullable=True)
     status = Column(Enum(ReportStatus), default=ReportStatus.PENDING)
     risk_score = Column(Integer)
+    rule_set_version = Column(String(32), index=True)  # rules/risk_rules.json version that produced risk_score
     ai_confidence_score = Column(Integer, default=0)
     legal_brief = Column(Text)
     discrepancy_details = Column(JSON)
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from src.api import routes
+from src.core.metrics import metrics
 
 app = FastAPI(
     title="Glashaus API",
@@ -33,6 +35,11 @@ def health_check():
         "version": "1.0.0-PROD"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Prometheus scrape target: span latencies, bytes, retries and Gemini spend."""
+    return metrics.render()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("src.main:app", host="0.0.0.0", port=8000)
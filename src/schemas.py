@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from decimal import Decimal
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal, Tuple
 
 class ScrapedListing(BaseModel):
     model_config = ConfigDict(from_attributes=True, arbitrary_types_allowed=True)
@@ -14,6 +14,20 @@ class ScrapedListing(BaseModel):
     is_vat_excluded: bool = False
     is_direct_owner: bool = False
     price_correction_note: Optional[str] = None
+    # ForensicPatterns.scan over the page: rule name -> first match span (None: not scanned)
+    pattern_hits: Optional[Dict[str, Tuple[int, int]]] = None
+
+class ConditionalFetch(BaseModel):
+    """Outcome of ScraperService.fetch_if_changed; `listing` is only parsed on CHANGED."""
+    status: Literal["NOT_MODIFIED", "UNCHANGED", "CHANGED"]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+    listing: Optional[ScrapedListing] = None
+
+    @property
+    def changed(self) -> bool:
+        return self.status == "CHANGED"
 
 class HeatingInventory(BaseModel):
     ac_units: int = 0
@@ -0,0 +1,33 @@
+from typing import Callable, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.db.models import AIAnalysis
+from src.db.session import SessionLocal
+from src.schemas import AIAnalysisResult
+from src.core.logger import logger
+
+class AIAnalysisCache:
+    """
+    Persistent memo of Gemini analyses. Keys already encode the model and
+    prompt version, so entries never go stale and need no TTL.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+
+    def get(self, key: str) -> Optional[AIAnalysisResult]:
+        with self.session_factory() as db:
+            row = db.query(AIAnalysis).filter(AIAnalysis.cache_key == key).first()
+            if not row: return None
+            logger.info("ai_analysis_cache_hit", cache_key=key[:12])
+            return AIAnalysisResult(**row.result)
+
+    def put(self, key: str, result: AIAnalysisResult, model: str, prompt_version: str):
+        with self.session_factory() as db:
+            try:
+                db.add(AIAnalysis(cache_key=key, model=model, prompt_version=prompt_version,
+                                  result=result.model_dump()))
+                db.commit()
+            except IntegrityError:
+                # Same inputs analysed concurrently by another worker
+                db.rollback()
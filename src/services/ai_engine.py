@@ -1,43 +1,186 @@
-import google.generativeai as genai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import hashlib
 import json
+import os
 import asyncio
 from src.core.logger import logger
 from src.core.config import settings
+from src.core.metrics import metrics
+from src.core.tracing import span
+from src.core.utils import calculate_text_hash
 from src.schemas import AIAnalysisResult
+from src.services.gemini_client import get_gemini_backend
+
+# Bump whenever the prompt or the expected schema changes: it invalidates memoized analyses
+PROMPT_VERSION = "1"
+# Same for analyze_batch's multi-listing prompt; distinct so batch and single results never share a cache key
+BATCH_PROMPT_VERSION = "batch-1"
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def strip_json(text: str) -> str:
+    return text.replace('```json', '').replace('```', '').strip()
 
 class GeminiService:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(settings.GEMINI_MODEL)
+    def __init__(self, api_key: str, cache=None, backend=None):
+        # `cache` (AIAnalysisCache) memoizes results per text/images/model/prompt version;
+        # the backend is the process-wide client unless one is injected
+        self.backend = backend or get_gemini_backend(api_key)
+        self.cache = cache
+
+    @staticmethod
+    def analysis_key(text_content: str, image_paths: List[str], prompt_version: str = PROMPT_VERSION) -> str:
+        """Identity of an analysis: same text, same photos (any order), same model and prompt."""
+        image_hashes = sorted(file_sha256(p) for p in image_paths)
+        raw = "|".join([calculate_text_hash(text_content), *image_hashes, settings.GEMINI_MODEL, prompt_version])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _record_usage(response, current_span):
+        """Bills the call's token usage to the trace (rolls up into Report.cost_to_generate)."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None: return
+        tokens_in = getattr(usage, "prompt_token_count", 0) or 0
+        tokens_out = getattr(usage, "candidates_token_count", 0) or 0
+        cost = (tokens_in * settings.GEMINI_INPUT_USD_PER_MTOK + tokens_out * settings.GEMINI_OUTPUT_USD_PER_MTOK) / 1_000_000
+        current_span.cost += cost
+        current_span.set(tokens_in=tokens_in, tokens_out=tokens_out)
+        metrics.inc("glashaus_gemini_tokens_total", tokens_in, kind="input")
+        metrics.inc("glashaus_gemini_tokens_total", tokens_out, kind="output")
+        metrics.inc("glashaus_gemini_cost_usd_total", cost)
 
     async def analyze_listing_multimodal(self, text_content: str, image_paths: List[str]) -> AIAnalysisResult:
+        """Returns a memoized analysis when one exists for the same inputs, before any upload."""
+        key = None
+        if self.cache:
+            key = await asyncio.to_thread(self.analysis_key, text_content, image_paths)
+            cached = await asyncio.to_thread(self.cache.get, key)
+            metrics.inc("glashaus_gemini_cache_total", outcome="hit" if cached else "miss")
+            if cached:
+                return cached
+
+        result = await self._analyze(text_content, image_paths)
+        if result is None:
+            # Fallback to empty validated object (never memoized)
+            return AIAnalysisResult(address_prediction="Unknown", landmarks=[])
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, key, result, settings.GEMINI_MODEL, PROMPT_VERSION)
+        return result
+
+    async def _analyze(self, text_content: str, image_paths: List[str]) -> Optional[AIAnalysisResult]:
         log = logger.bind(model=settings.GEMINI_MODEL)
         log.info("starting_multimodal_analysis", image_count=len(image_paths))
         
         prompt = f"Analyze this listing text and images. Return JSON ONLY matching our forensic schema.\nTEXT:\n{text_content}"
         
+        slots = asyncio.Semaphore(settings.GEMINI_UPLOAD_CONCURRENCY)
+
+        async def upload(path):
+            async with slots:
+                with span("gemini.upload") as current:
+                    current.bytes += os.path.getsize(path)
+                    return await self.backend.upload(path)
+
+        async def delete(file_ref):
+            async with slots:
+                await self.backend.delete(file_ref)
+
         uploaded_files = []
         try:
-            for path in image_paths:
-                file_ref = await asyncio.to_thread(genai.upload_file, path=path)
-                uploaded_files.append(file_ref)
+            results = await asyncio.gather(*(upload(p) for p in image_paths), return_exceptions=True)
+            uploaded_files = [r for r in results if not isinstance(r, BaseException)]
+            failed = next((r for r in results if isinstance(r, BaseException)), None)
+            if failed:
+                raise failed
 
             parts = [prompt, *uploaded_files]
-            response = await asyncio.to_thread(self.model.generate_content, parts)
-            
-            # Cleanup remote files
-            for f in uploaded_files:
-                await asyncio.to_thread(genai.delete_file, f.name)
+            with span("gemini.generate", model=settings.GEMINI_MODEL) as generate:
+                response = await self.backend.generate(parts)
+                self._record_usage(response, generate)
 
             # JSON Sanitization
-            raw_json = response.text.replace('```json', '').replace('```', '').strip()
-            data = json.loads(raw_json)
+            data = json.loads(strip_json(response.text))
             
             # STRICT VALIDATION
             return AIAnalysisResult(**data)
             
         except Exception as e:
             log.error("ai_analysis_failed", error=str(e))
-            # Fallback to empty validated object
-            return AIAnalysisResult(address_prediction="Unknown", landmarks=[])
+            return None
+        finally:
+            # Cleanup remote files (also when generation failed)
+            if uploaded_files:
+                await asyncio.gather(*(delete(f) for f in uploaded_files), return_exceptions=True)
+
+    async def analyze_batch(self, texts: Dict[int, str], batch_size: Optional[int] = None) -> Dict[int, AIAnalysisResult]:
+        """
+        Text-only analysis of many listings, `batch_size` per request, for bulk
+        backfills. Memoized items are skipped. A request that fails or returns
+        unparseable JSON is split in half and retried, so one bad listing costs
+        O(log n) extra calls. Listings that still fail are left out of the result.
+        """
+        batch_size = batch_size or settings.GEMINI_BATCH_SIZE
+        results: Dict[int, AIAnalysisResult] = {}
+        keys = {lid: self.analysis_key(texts[lid], [], BATCH_PROMPT_VERSION) for lid in texts} if self.cache else {}
+
+        pending = []
+        for lid in texts:
+            cached = await asyncio.to_thread(self.cache.get, keys[lid]) if self.cache else None
+            if cached:
+                results[lid] = cached
+            else:
+                pending.append(lid)
+
+        slots = asyncio.Semaphore(settings.GEMINI_BATCH_CONCURRENCY)
+
+        async def run_group(ids: List[int]):
+            async with slots:
+                parsed = await self._generate_batch({lid: texts[lid] for lid in ids})
+            done = {lid: parsed[lid] for lid in ids if lid in parsed}
+            for lid, result in done.items():
+                results[lid] = result
+                if self.cache:
+                    await asyncio.to_thread(self.cache.put, keys[lid], result, settings.GEMINI_MODEL, BATCH_PROMPT_VERSION)
+            missing = [lid for lid in ids if lid not in done]
+            if not missing: return
+            if len(ids) == 1:
+                logger.warning("ai_batch_item_failed", listing_id=ids[0])
+                return
+            half = (len(missing) + 1) // 2
+            await asyncio.gather(*(run_group(part) for part in (missing[:half], missing[half:]) if part))
+
+        groups = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        await asyncio.gather(*(run_group(group) for group in groups))
+        logger.info("ai_batch_complete", requested=len(texts), memoized=len(texts) - len(pending),
+                    analysed=len(results) - (len(texts) - len(pending)), failed=len(texts) - len(results))
+        return results
+
+    async def _generate_batch(self, texts: Dict[int, str]) -> Dict[int, AIAnalysisResult]:
+        """One request for several listings; returns the items that parsed and validated."""
+        listings = "\n\n".join(f"### LISTING {lid}\n{text}" for lid, text in texts.items())
+        prompt = (
+            "Analyze each listing text below. Return JSON ONLY: one object whose keys are the "
+            "listing numbers and whose values match our forensic schema.\n" + listings
+        )
+        try:
+            with span("gemini.generate_batch", model=settings.GEMINI_MODEL, items=len(texts)) as generate:
+                response = await self.backend.generate([prompt])
+                self._record_usage(response, generate)
+            data = json.loads(strip_json(response.text))
+        except Exception as e:
+            logger.error("ai_batch_failed", items=len(texts), error=str(e))
+            return {}
+
+        parsed = {}
+        for lid in texts:
+            item = data.get(str(lid)) if isinstance(data, dict) else None
+            try:
+                parsed[lid] = AIAnalysisResult(**item)
+            except Exception:
+                continue  # Missing or invalid item: retried by analyze_batch
+        return parsed
@@ -0,0 +1,59 @@
+import datetime
+from typing import Callable, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.db.models import CadastreResolution
+from src.db.session import SessionLocal
+from src.schemas import CadastreData
+from src.core.logger import logger
+from src.core.utils import normalize_address_key
+
+class CadastreResolutionCache:
+    """
+    Persistent address -> CadastreData cache in front of the KAIS handshake.
+    Negative results are cached too; registry outages only briefly, so a
+    recovered KAIS is retried soon.
+    """
+
+    TTLS = {
+        "LIVE": datetime.timedelta(days=30),
+        "NOT_FOUND": datetime.timedelta(days=3),
+        "ERROR": datetime.timedelta(minutes=15),
+        "OFFLINE": datetime.timedelta(minutes=5),
+    }
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        # Own short-lived sessions: a cached lookup must survive a failed audit transaction
+        self.session_factory = session_factory
+
+    def get(self, address: str) -> Optional[CadastreData]:
+        key = normalize_address_key(address)
+        if not key: return None
+        now = datetime.datetime.now(datetime.timezone.utc)
+        with self.session_factory() as db:
+            row = db.query(CadastreResolution).filter(
+                CadastreResolution.address_key == key,
+                CadastreResolution.expires_at > now
+            ).first()
+            if not row: return None
+            logger.info("cadastre_cache_hit", address_key=key, status=row.status)
+            return CadastreData(**row.result)
+
+    def put(self, address: str, data: CadastreData):
+        key = normalize_address_key(address)
+        if not key: return
+        now = datetime.datetime.now(datetime.timezone.utc)
+        values = {"status": data.status, "result": data.model_dump(), "resolved_at": now,
+                  "expires_at": now + self.TTLS[data.status]}
+        with self.session_factory() as db:
+            try:
+                row = db.query(CadastreResolution).filter(CadastreResolution.address_key == key).first()
+                if row:
+                    for field, value in values.items():
+                        setattr(row, field, value)
+                else:
+                    db.add(CadastreResolution(address_key=key, **values))
+                db.commit()
+            except IntegrityError:
+                # Another worker resolved the same address concurrently; theirs is as good as ours
+                db.rollback()
@@ -1,70 +1,170 @@
 import asyncio
 import re
+import time
 import httpx
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 from bs4 import BeautifulSoup
 from src.schemas import CadastreData
+from src.core.config import settings
 from src.core.logger import logger
+from src.core.rate_limiter import limited_client
+from src.core.tracing import add_retry, span, traced
+from src.services.session_pool import PooledSession, SessionPool, get_session_pool
+
+class KaisTokenError(Exception):
+    """The Map page did not yield a CSRF token (blocked or layout change)."""
 
 class CadastreService:
     """Registry Forensics: human address -> Official registry truth (KAIS)."""
-    
-    def __init__(self, client: httpx.AsyncClient):
+
+    MAP_URL = "https://kais.cadastre.bg/bg/Map"
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'X-Requested-With': 'XMLHttpRequest',
+        'Referer': 'https://kais.cadastre.bg/bg/Map'
+    }
+
+    # Warmed sessions keep their token until a Read fails; refresh ahead of that in the background
+    _background: set = set()
+
+    def __init__(self, client: httpx.AsyncClient = None, pool: Optional[SessionPool] = None, cache=None):
+        # An injected client is a single session (lookups on it are serialized);
+        # otherwise each lookup leases a warmed session from the KAIS pool.
+        # `cache` (CadastreResolutionCache) short-circuits addresses resolved before.
         self.client = client
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'X-Requested-With': 'XMLHttpRequest',
-            'Referer': 'https://kais.cadastre.bg/bg/Map'
-        }
+        self.pool = pool
+        self.cache = cache
+        self.headers = dict(self.HEADERS)
+        self._own_session = PooledSession(client) if client else None
+        self._own_lock = asyncio.Lock()
+
+    @classmethod
+    def new_client(cls) -> httpx.AsyncClient:
+        return limited_client(headers=cls.HEADERS, timeout=30.0, follow_redirects=True)
+
+    def _pool(self) -> SessionPool:
+        return self.pool or get_session_pool("kais", settings.KAIS_SESSION_POOL_SIZE, self.new_client)
+
+    @asynccontextmanager
+    async def _lease(self) -> AsyncIterator[PooledSession]:
+        if self._own_session:
+            async with self._own_lock:
+                yield self._own_session
+        else:
+            async with self._pool().lease() as session:
+                yield session
+
+    async def _refresh_token(self, session: PooledSession) -> str:
+        """Handshake 1: Initialize Session and Grab CSRF Token (cookies land in the session jar)."""
+        with span("kais.map"):
+            resp = await session.client.get(self.MAP_URL, headers=self.headers)
+        soup = BeautifulSoup(resp.text, 'html.parser')
+        token_tag = soup.find('input', {'name': '__RequestVerificationToken'})
+        if not token_tag:
+            session.state.pop("token", None)
+            raise KaisTokenError("kais_csrf_token_missing")
+        session.state["token"] = token_tag.get('value')
+        session.state["token_at"] = time.time()
+        return session.state["token"]
+
+    async def _token(self, session: PooledSession) -> str:
+        return session.state.get("token") or await self._refresh_token(session)
+
+    async def _search(self, session: PooledSession, address: str, token: str) -> Optional[dict]:
+        """Handshakes 2-3. Returns None when the Read is rejected (expired token/cookies)."""
+        # Handshake 2: Execute "FastSearch" (primes the server-side result state).
+        # Pacing between KAIS calls comes from the per-host rate limiter on the client.
+        with span("kais.fast_search"):
+            await session.client.get(
+                f"{self.MAP_URL}/FastSearch", 
+                params={'KeyWords': address}, 
+                headers=self.headers
+            )
+        
+        # Handshake 3: Read the primed search results
+        read_headers = {**self.headers, 'X-CSRF-TOKEN': token}
+        with span("kais.read"):
+            res = await session.client.post(
+                f"{self.MAP_URL}/ReadFoundObjects", 
+                data={'page': 1, 'pageSize': 5}, 
+                headers=read_headers
+            )
+        if res.status_code != 200:
+            return None
+        try:
+            return res.json()
+        except ValueError:
+            return None  # HTML error/login page instead of JSON
+
+    def _schedule_refresh(self):
+        """Re-warms an idle session whose token is close to expiry, off the request path."""
+        if self._own_session: return
+        pool = self._pool()
+        cutoff = time.time() - settings.KAIS_TOKEN_REFRESH_SECONDS
+        if not any(s.state.get("token_at", 0) < cutoff for s in pool.idle_sessions()):
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh_idle(pool, cutoff))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _refresh_idle(self, pool: SessionPool, cutoff: float):
+        async with pool.lease() as session:
+            if session.state.get("token_at", 0) < cutoff:
+                try:
+                    await self._refresh_token(session)
+                except Exception as e:
+                    logger.warning("kais_token_refresh_failed", error=str(e))
+                    session.invalidate()
 
     async def get_official_details(self, address: str) -> CadastreData:
+        """Resolves `address`, answering from the resolution cache when one is configured."""
+        if self.cache:
+            cached = await asyncio.to_thread(self.cache.get, address)
+            if cached:
+                return cached
+        data = await self._resolve(address)
+        if self.cache:
+            await asyncio.to_thread(self.cache.put, address, data)
+        return data
+
+    @traced("kais.resolve")
+    async def _resolve(self, address: str) -> CadastreData:
         """
         Executes a 5-step handshake with the Cadastre registry to bypass CSRF 
-        and extract official area data.
+        and extract official area data. The Map page / CSRF token step is only
+        repeated when the leased session has no valid token.
         """
         log = logger.bind(target_address=address)
         
         try:
-            # Handshake 1: Initialize Session and Grab CSRF Token
-            resp = await self.client.get("https://kais.cadastre.bg/bg/Map", headers=self.headers)
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            token_tag = soup.find('input', {'name': '__RequestVerificationToken'})
-            
-            if not token_tag:
-                log.error("kais_csrf_token_missing")
-                return CadastreData(status="ERROR", official_area=0.0)
-                
-            token = token_tag.get('value')
-            
-            # Handshake 2: Execute "FastSearch" (primes the server-side result state)
-            await self.client.get(
-                "https://kais.cadastre.bg/bg/Map/FastSearch", 
-                params={'KeyWords': address}, 
-                headers=self.headers
-            )
-            # Essential delay to prevent rate-limiting/bot detection
-            await asyncio.sleep(0.6) 
-            
-            # Handshake 3: Read the primed search results
-            read_headers = {**self.headers, 'X-CSRF-TOKEN': token}
-            res = await self.client.post(
-                "https://kais.cadastre.bg/bg/Map/ReadFoundObjects", 
-                data={'page': 1, 'pageSize': 5}, 
-                headers=read_headers
-            )
-            data = res.json()
-            
-            if not data.get('Data') or len(data['Data']) == 0: 
-                log.warning("cadastre_not_found")
-                return CadastreData(status="NOT_FOUND", official_area=0.0)
-
-            # Handshake 4: Fetch detailed info for the first (best) match
-            obj = data['Data'][0]
-            info_resp = await self.client.get(
-                "https://kais.cadastre.bg/bg/Map/GetObjectInfo", 
-                params=obj, 
-                headers=self.headers
-            )
+            async with self._lease() as session:
+                data = await self._search(session, address, await self._token(session))
+                if data is None:
+                    # Token or cookies expired: re-handshake once on the same session
+                    log.info("kais_token_expired", session_uses=session.uses)
+                    add_retry()
+                    data = await self._search(session, address, await self._refresh_token(session))
+                    if data is None:
+                        session.invalidate()
+                        log.error("kais_read_rejected")
+                        return CadastreData(status="ERROR", official_area=0.0)
+
+                if not data.get('Data') or len(data['Data']) == 0: 
+                    log.warning("cadastre_not_found")
+                    return CadastreData(status="NOT_FOUND", official_area=0.0)
+
+                # Handshake 4: Fetch detailed info for the first (best) match
+                obj = data['Data'][0]
+                with span("kais.object_info"):
+                    info_resp = await session.client.get(
+                        f"{self.MAP_URL}/GetObjectInfo", 
+                        params=obj, 
+                        headers=self.headers
+                    )
             
+            self._schedule_refresh()
+
             # Handshake 5: Extract official area using Bulgarian regex
             # Looks for "площ [number] кв.м" or "площ по документ [number] кв.м"
             area_match = re.search(r"площ(?: по документ)?\s*([\d\.]+)\s*кв\.?\s*м", info_resp.text, re.IGNORECASE)
@@ -79,6 +179,9 @@ class CadastreService:
                 status="LIVE"
             )
             
+        except KaisTokenError:
+            log.error("kais_csrf_token_missing")
+            return CadastreData(status="ERROR", official_area=0.0)
         except (httpx.TimeoutException, httpx.ConnectError):
             log.warning("cadastre_registry_timeout")
             return CadastreData(status="OFFLINE", official_area=0.0)
@@ -3,7 +3,15 @@ import uuid
 import time
 import asyncio
 from src.core.logger import logger
-from typing import Optional, Dict, Any
+from src.services.registry_cache import RegistryCache, registry_cache
+from src.services.session_pool import SessionPool, get_session_pool
+from src.core.config import settings
+from src.core.rate_limiter import limited_client
+from src.core.tracing import span
+from typing import Optional, Dict, Any, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from src.services.registry_sweep import RegisterSnapshot
 
 class SofiaMunicipalForensics:
     """
@@ -25,8 +33,55 @@ class SofiaMunicipalForensics:
         'Sec-Fetch-Site': 'same-origin',
     }
 
-    def __init__(self, client: httpx.AsyncClient = None):
+    # Register endpoints and the blank form fields each /Search expects (as captured in curl).
+    # `row_field` is the Read row column holding the cadastre ID that `target_field` filters on;
+    # register sweeps refuse rows without it (see RegisterSnapshot) rather than report no hits.
+    REGISTERS = {
+        "expropriation": {
+            "path": "RegisterExpropriation",
+            "target_field": "CadNumber",
+            "row_field": "CadNumber",
+            "region_field": "RegionName",
+            "fields": ['RegionName', 'RegPlan', 'Quarter', 'Upi', 'CadNumber', 'Area', 'Obj',
+                       'GroupType', 'Typology', 'StructureZone', 'ApprYear'],
+        },
+        "act16": {
+            "path": "RegisterCertificateForExploitationBuildings",
+            "target_field": "Identifier",
+            "row_field": "Identifier",
+            "region_field": "Region",
+            "fields": ['IssuedById', 'FromDate', 'ToDate', 'StatusId', 'DocumentTypeName', 'Number',
+                       'Status', 'Issuer', 'Employer', 'ConstructionalOversightName', 'Object',
+                       'Region', 'Terrain', 'RegulationNeighbourhood', 'Upi', 'Identifier', 'Address',
+                       'RegionId', 'TakeEffectFilter', 'MapOfRestoredProperty',
+                       'AdditionalDescriptionEstate', 'AdditionalDescriptionAdministrativeAddress', 'Scope'],
+        },
+        "permits": {
+            "path": "RegisterBuildingPermitsPortal",
+            "target_field": "Identifier",
+            "row_field": "Identifier",
+            "region_field": "Region",
+            "fields": ['IssuedById', 'FromDate', 'ToDate', 'TakeEffectFrom', 'TakeEffectTo', 'StatusId',
+                       'DocumentTypeName', 'Number', 'Status', 'Issuer', 'Employer',
+                       'ConstructionalOversightName', 'Object', 'Region', 'Terrain',
+                       'RegulationNeighbourhood', 'Upi', 'Identifier', 'Address', 'RegionId',
+                       'TakeEffectFilter', 'MapOfRestoredProperty', 'AdditionalDescriptionEstate',
+                       'AdditionalDescriptionAdministrativeAddress', 'Scope'],
+        },
+    }
+
+    def __init__(self, client: httpx.AsyncClient = None, cache: Optional[RegistryCache] = None,
+                 pool: Optional[SessionPool] = None):
+        # An injected client is used as-is (single session, caller serializes audits);
+        # otherwise every Search->Read pair leases its own session from the pool.
         self.client = client
+        self.cache = cache or registry_cache
+        self.pool = pool
+        self.checks = {
+            "expropriation": self._check_expropriation,
+            "act16": self._check_act16,
+            "permits": self._check_permits,
+        }
 
     async def run_full_audit(self, cadastre_id: str) -> Dict[str, Any]:
         """
@@ -38,15 +93,12 @@ class SofiaMunicipalForensics:
         if not cadastre_id:
             return {"error": "No Cadastre ID provided"}
 
-        # Use injected client or create a new ephemeral one
-        local_client = self.client if self.client else httpx.AsyncClient(headers=self.HEADERS, timeout=20.0, follow_redirects=True)
-
         try:
-            # Run all 3 checks in parallel for speed
+            # Run all 3 checks in parallel for speed; buildings audited recently are served from cache
             expropriation, act16, permits = await asyncio.gather(
-                self._check_expropriation(local_client, cadastre_id),
-                self._check_act16(local_client, cadastre_id),
-                self._check_permits(local_client, cadastre_id)
+                self._cached_check("expropriation", cadastre_id),
+                self._cached_check("act16", cadastre_id),
+                self._cached_check("permits", cadastre_id)
             )
 
             return {
@@ -58,24 +110,77 @@ class SofiaMunicipalForensics:
         except Exception as e:
             logger.error(f"audit_failed_fatal: {e}")
             return {"error": str(e)}
-        finally:
-            if not self.client:
-                await local_client.aclose()
+
+    @classmethod
+    def new_client(cls) -> httpx.AsyncClient:
+        return limited_client(headers=cls.HEADERS, timeout=20.0, follow_redirects=True)
+
+    def _pool(self) -> SessionPool:
+        return self.pool or get_session_pool("nag", settings.NAG_SESSION_POOL_SIZE, self.new_client)
+
+    async def _cached_check(self, register: str, cid: str) -> Dict:
+        fetch = lambda: self._run_check(register, cid)
+        return await self.cache.get_or_fetch(register, cid, fetch=fetch, revalidate=fetch)
+
+    async def _run_check(self, register: str, cid: str) -> Dict:
+        with span(f"nag.{register}"):
+            if self.client:
+                return await self.checks[register](self.client, cid)
+            # The lease spans the whole Search->Read transaction
+            async with self._pool().lease() as session:
+                result = await self.checks[register](session.client, cid)
+                if "error" in result:
+                    session.invalidate()
+                return result
+
+    @classmethod
+    def search_params(cls, register: str, target: str = '', region: str = '') -> Dict[str, Any]:
+        """
+        Query string for a register's /Search call. `target` filters by cadastre ID;
+        leaving it empty (optionally narrowing by `region`) selects the whole register.
+        """
+        spec = cls.REGISTERS[register]
+        params = {'searchQueryId': str(uuid.uuid4())}
+        params.update({field: '' for field in spec["fields"]})
+        params[spec["target_field"]] = target  # <--- TARGET
+        params[spec["region_field"]] = region
+        params['X-Requested-With'] = 'XMLHttpRequest'
+        params['_'] = int(time.time() * 1000)
+        return params
+
+    @staticmethod
+    def summarize_expropriation(hits: List[Dict]) -> Dict:
+        is_fatal = len(hits) > 0
+        return {
+            "is_expropriated": is_fatal,
+            "risk_level": "CRITICAL" if is_fatal else "NONE",
+            "details": hits[0] if is_fatal else None,
+            "found_count": len(hits)
+        }
+
+    @staticmethod
+    def summarize_act16(hits: List[Dict]) -> Dict:
+        has_cert = len(hits) > 0
+        return {
+            "has_act16": has_cert,
+            # Extract description if found
+            "description": hits[0].get("Строеж/Обект", "N/A") if has_cert else None,
+            "raw_hits": len(hits)
+        }
+
+    @staticmethod
+    def summarize_permits(hits: List[Dict], total: int) -> Dict:
+        return {
+            "total_permits": total,
+            "latest_permit": hits[0] if hits else None
+        }
 
     async def _check_expropriation(self, client, cid: str) -> Dict:
         """
         Checks 'RegisterExpropriation' (The Death List).
         """
         # 1. SEARCH: Sets the server-side session state
-        search_id = str(uuid.uuid4())
-        params = {
-            'searchQueryId': search_id,
-            'RegionName': '', 'RegPlan': '', 'Quarter': '', 'Upi': '',
-            'CadNumber': cid,  # <--- TARGET
-            'Area': '', 'Obj': '', 'GroupType': '', 'Typology': '', 'StructureZone': '',
-            'ApprYear': '', 'X-Requested-With': 'XMLHttpRequest',
-            '_': int(time.time() * 1000)
-        }
+        params = self.search_params("expropriation", target=cid)
         
         try:
             # Step A: Prime the search
@@ -87,15 +192,7 @@ class SofiaMunicipalForensics:
             data = res.json()
             
             # SAFEGUARD: Ensure hits is a list, even if API returns null
-            hits = data.get("Data") or []
-            is_fatal = len(hits) > 0
-            
-            return {
-                "is_expropriated": is_fatal,
-                "risk_level": "CRITICAL" if is_fatal else "NONE",
-                "details": hits[0] if is_fatal else None,
-                "found_count": len(hits)
-            }
+            return self.summarize_expropriation(data.get("Data") or [])
         except Exception as e:
             logger.error(f"expropriation_check_failed: {e}")
             return {"error": str(e), "is_expropriated": False}
@@ -104,20 +201,7 @@ class SofiaMunicipalForensics:
         """
         Checks 'RegisterCertificateForExploitationBuildings' (The Green List).
         """
-        search_id = str(uuid.uuid4())
-        params = {
-            'searchQueryId': search_id,
-            'IssuedById': '', 'FromDate': '', 'ToDate': '', 'StatusId': '',
-            'DocumentTypeName': '', 'Number': '', 'Status': '', 'Issuer': '',
-            'Employer': '', 'ConstructionalOversightName': '', 'Object': '',
-            'Region': '', 'Terrain': '', 'RegulationNeighbourhood': '', 'Upi': '',
-            'Identifier': cid, # <--- TARGET
-            'Address': '', 'RegionId': '', 'TakeEffectFilter': '', 
-            'MapOfRestoredProperty': '', 'AdditionalDescriptionEstate': '',
-            'AdditionalDescriptionAdministrativeAddress': '', 'Scope': '',
-            'X-Requested-With': 'XMLHttpRequest',
-            '_': int(time.time() * 1000)
-        }
+        params = self.search_params("act16", target=cid)
 
         try:
             await client.get(f"{self.BASE_URL}/RegisterCertificateForExploitationBuildings/Search", params=params)
@@ -125,17 +209,7 @@ class SofiaMunicipalForensics:
             data = res.json()
             
             # SAFEGUARD: Use 'or []' to handle None
-            hits = data.get("Data") or []
-            has_cert = len(hits) > 0
-            
-            # Extract description if found
-            cert_desc = hits[0].get("Строеж/Обект", "N/A") if has_cert else None
-            
-            return {
-                "has_act16": has_cert,
-                "description": cert_desc,
-                "raw_hits": len(hits)
-            }
+            return self.summarize_act16(data.get("Data") or [])
         except Exception as e:
             logger.error(f"act16_check_failed: {e}")
             return {"error": str(e), "has_act16": False}
@@ -144,30 +218,27 @@ class SofiaMunicipalForensics:
         """
         Checks 'RegisterBuildingPermitsPortal' (Construction History).
         """
-        search_id = str(uuid.uuid4())
-        params = {
-            'searchQueryId': search_id,
-            'IssuedById': '', 'FromDate': '', 'ToDate': '', 'TakeEffectFrom': '',
-            'TakeEffectTo': '', 'StatusId': '', 'DocumentTypeName': '', 'Number': '',
-            'Status': '', 'Issuer': '', 'Employer': '', 'ConstructionalOversightName': '',
-            'Object': '', 'Region': '', 'Terrain': '', 'RegulationNeighbourhood': '',
-            'Upi': '', 
-            'Identifier': cid, # <--- TARGET
-            'Address': '', 'RegionId': '', 'TakeEffectFilter': '', 
-            'MapOfRestoredProperty': '', 'AdditionalDescriptionEstate': '',
-            'AdditionalDescriptionAdministrativeAddress': '', 'Scope': '',
-            'X-Requested-With': 'XMLHttpRequest',
-            '_': int(time.time() * 1000)
-        }
+        params = self.search_params("permits", target=cid)
 
         try:
             await client.get(f"{self.BASE_URL}/RegisterBuildingPermitsPortal/Search", params=params)
             res = await client.post(f"{self.BASE_URL}/RegisterBuildingPermitsPortal/Read", data={'page': 1, 'pageSize': 10})
             data = res.json()
             
-            return {
-                "total_permits": data.get("Total", 0),
-                "latest_permit": data.get("Data", [])[0] if data.get("Data") else None
-            }
+            return self.summarize_permits(data.get("Data") or [], data.get("Total", 0))
         except Exception as e:
             return {"error": str(e), "total_permits": 0}
+
+    def audit_from_snapshots(self, cadastre_id: str, snapshots: Dict[str, "RegisterSnapshot"]) -> Dict[str, Any]:
+        """
+        Same result shape as run_full_audit, answered from locally stored register
+        sweeps (see src/services/registry_sweep.py) without any remote call.
+        """
+        # hits() matches like the live /Search, so its count is the live Read's Total
+        permit_hits = snapshots["permits"].hits(cadastre_id)
+        return {
+            "expropriation": self.summarize_expropriation(snapshots["expropriation"].hits(cadastre_id)),
+            "compliance_act16": self.summarize_act16(snapshots["act16"].hits(cadastre_id)),
+            "building_permits": self.summarize_permits(permit_hits, len(permit_hits)),
+            "audit_timestamp": min(snap.taken_at for snap in snapshots.values())
+        }
@@ -0,0 +1,165 @@
+import asyncio
+import mimetypes
+import random
+import threading
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+import httpx
+from src.core.config import settings
+from src.core.logger import logger
+from src.core.rate_limiter import limited_client, parse_retry_after
+from src.core.tracing import add_retry
+
+API_ROOT = "https://generativelanguage.googleapis.com"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class GeminiAPIError(Exception):
+    """Non-retryable API error, or a retryable one that outlived GEMINI_MAX_RETRIES."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+
+class UsageMetadata:
+    def __init__(self, data: Dict[str, Any]):
+        self.prompt_token_count = data.get("promptTokenCount", 0)
+        self.candidates_token_count = data.get("candidatesTokenCount", 0)
+
+class GenerateResponse:
+    """The subset of the SDK's response that GeminiService reads."""
+
+    def __init__(self, data: Dict[str, Any]):
+        candidates = data.get("candidates") or [{}]
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        self.text = "".join(p.get("text", "") for p in parts)
+        self.usage_metadata = UsageMetadata(data.get("usageMetadata") or {})
+
+class UploadedFile:
+    def __init__(self, data: Dict[str, Any]):
+        self.name = data["name"]
+        self.uri = data["uri"]
+        self.mime_type = data.get("mimeType", "image/jpeg")
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+class GenaiSdkBackend:
+    """
+    The google-generativeai SDK behind the backend interface. Its calls block,
+    so each one occupies a default-executor thread.
+    """
+
+    def __init__(self, api_key: str, model: str):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.genai = genai
+        self.model = genai.GenerativeModel(model)
+
+    async def upload(self, path: str):
+        return await asyncio.to_thread(self.genai.upload_file, path=path)
+
+    async def delete(self, file_ref):
+        await asyncio.to_thread(self.genai.delete_file, file_ref.name)
+
+    async def generate(self, parts: List[Any]):
+        return await asyncio.to_thread(self.model.generate_content, parts)
+
+class GeminiRestBackend:
+    """
+    Async-native Gemini transport over the REST API: one pooled httpx client per
+    event loop, at most GEMINI_MAX_CONCURRENCY calls in flight, and retries with
+    full-jitter exponential back-off on quota/overload errors (honouring
+    Retry-After). Same interface as GenaiSdkBackend, without a thread per call.
+    """
+
+    def __init__(self, api_key: str, model: str, client_factory: Optional[Callable[[], httpx.AsyncClient]] = None,
+                 max_concurrency: Optional[int] = None, max_retries: Optional[int] = None, backoff: float = 1.0):
+        self.api_key = api_key
+        self.model = model
+        # Paced by the shared limiter, but 429s are handled here (Retry-After), not also by AIMD
+        self.client_factory = client_factory or (lambda: limited_client(adaptive=False, base_url=API_ROOT, timeout=120.0))
+        self.max_concurrency = max_concurrency or settings.GEMINI_MAX_CONCURRENCY
+        self.max_retries = settings.GEMINI_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = backoff
+        # httpx clients and semaphores cannot cross event loops
+        self._loops = weakref.WeakKeyDictionary()
+
+    def _resources(self):
+        loop = asyncio.get_running_loop()
+        resources = self._loops.get(loop)
+        if resources is None:
+            resources = (self.client_factory(), asyncio.Semaphore(self.max_concurrency))
+            self._loops[loop] = resources
+        return resources
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        # A server's Retry-After wins, but never beyond the longest backoff we would pick ourselves
+        if response is not None:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"), self.backoff * 2 ** self.max_retries)
+            if retry_after is not None:
+                return retry_after
+        return random.uniform(0, self.backoff * 2 ** attempt)
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        client, slots = self._resources()
+        params = {**kwargs.pop("params", {}), "key": self.api_key}
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                async with slots:
+                    response = await client.request(method, url, params=params, **kwargs)
+                if response.status_code < 400:
+                    return response
+                if response.status_code not in RETRY_STATUSES:
+                    raise GeminiAPIError(response.status_code, response.text[:300])
+                error = GeminiAPIError(response.status_code, response.text[:300])
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                error = e
+            if attempt == self.max_retries:
+                raise error
+            delay = self._delay(attempt, response)
+            add_retry()
+            logger.warning("gemini_retry", url=url, attempt=attempt + 1, delay=round(delay, 2), error=str(error))
+            await asyncio.sleep(delay)
+
+    async def upload(self, path: str) -> UploadedFile:
+        mime_type = mimetypes.guess_type(path)[0] or "image/jpeg"
+        content = await asyncio.to_thread(_read_bytes, path)
+        res = await self._request(
+            "POST", "/upload/v1beta/files", content=content,
+            headers={"X-Goog-Upload-Protocol": "raw", "Content-Type": mime_type}
+        )
+        return UploadedFile(res.json()["file"])
+
+    async def delete(self, file_ref: UploadedFile):
+        await self._request("DELETE", f"/v1beta/{file_ref.name}")
+
+    async def generate(self, parts: List[Any]) -> GenerateResponse:
+        body_parts = []
+        for part in parts:
+            if isinstance(part, str):
+                body_parts.append({"text": part})
+            else:
+                body_parts.append({"file_data": {"mime_type": part.mime_type, "file_uri": part.uri}})
+        res = await self._request(
+            "POST", f"/v1beta/models/{self.model}:generateContent",
+            json={"contents": [{"role": "user", "parts": body_parts}]}
+        )
+        return GenerateResponse(res.json())
+
+_backends: Dict[tuple, Any] = {}
+_backends_lock = threading.Lock()
+
+def get_gemini_backend(api_key: str, model: Optional[str] = None):
+    """Process-wide backend per (key, model): no per-task configure/model construction."""
+    model = model or settings.GEMINI_MODEL
+    with _backends_lock:
+        backend = _backends.get((api_key, model))
+        if backend is None:
+            if settings.GEMINI_BACKEND == "sdk":
+                backend = GenaiSdkBackend(api_key, model)
+            else:
+                backend = GeminiRestBackend(api_key, model)
+            _backends[(api_key, model)] = backend
+        return backend
@@ -0,0 +1,56 @@
+import time
+from typing import Any, Dict, Optional
+from src.core.config import settings
+from src.core.logger import logger
+from src.core.metrics import metrics
+from src.services.registry_cache import MemoryCacheBackend, RedisCacheBackend
+
+class GeocodeCache:
+    """
+    Google geocode responses keyed by the normalized query. Street/landmark
+    combinations repeat constantly, so hits are kept for months; ZERO_RESULTS
+    is cached for a week; quota/denied errors are never stored.
+    """
+
+    TTLS = {
+        "OK": 180 * 86400,
+        "ZERO_RESULTS": 7 * 86400,
+    }
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats = {"hit": 0, "miss": 0}
+
+    def _count(self, outcome: str):
+        self.stats[outcome] += 1
+        metrics.inc("glashaus_geocode_cache_total", outcome=outcome)
+
+    async def get(self, query_key: str) -> Optional[Dict[str, Any]]:
+        try:
+            entry = await self.backend.get(query_key)
+        except Exception as e:
+            logger.warning("geocode_cache_read_failed", error=str(e))
+            entry = None
+        if entry:
+            payload, fetched_at = entry
+            if time.time() - fetched_at < self.TTLS.get(payload.get("status"), 0):
+                self._count("hit")
+                return payload
+        self._count("miss")
+        return None
+
+    async def put(self, query_key: str, payload: Dict[str, Any]):
+        ttl = self.TTLS.get(payload.get("status"))
+        if not ttl: return
+        try:
+            await self.backend.set(query_key, payload, time.time(), ttl)
+        except Exception as e:
+            logger.warning("geocode_cache_write_failed", error=str(e))
+
+def build_geocode_cache() -> GeocodeCache:
+    if settings.GEOCODE_CACHE_BACKEND == "redis":
+        return GeocodeCache(RedisCacheBackend(settings.REDIS_URL, prefix="glashaus:geocode"))
+    return GeocodeCache(MemoryCacheBackend(settings.GEOCODE_CACHE_MAX_ENTRIES))
+
+# Process-wide cache shared by every GeospatialService instance
+geocode_cache = build_geocode_cache()
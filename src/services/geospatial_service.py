@@ -1,31 +1,67 @@
 import httpx
 from src.core.logger import logger
+from src.core.rate_limiter import limited_client
+from src.core.tracing import span
+from src.core.utils import normalize_geocode_query
 from src.schemas import GeoVerification
-from typing import Optional
+from src.services.geocode_cache import GeocodeCache, geocode_cache
+from src.services.neighborhood_index import NeighborhoodIndex, get_neighborhood_index
+from typing import Any, Dict, Optional
 
 class GeospatialService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, client: Optional[httpx.AsyncClient] = None, cache: Optional[GeocodeCache] = None,
+                 neighborhoods: Optional[NeighborhoodIndex] = None):
+        # `client` is the caller's pooled client; without one a short-lived client is used per call
         self.api_key = api_key
         self.base_url = "https://maps.googleapis.com/maps/api/geocode/json"
+        self.client = client
+        self.cache = cache or geocode_cache
+        self.neighborhoods = neighborhoods or get_neighborhood_index()
+
+    async def _request(self, client: httpx.AsyncClient, query: str) -> Dict[str, Any]:
+        with span("geocode"):
+            resp = await client.get(self.base_url, params={"address": query, "key": self.api_key})
+            data = resp.json()
+        return {"status": data.get("status"), "result": (data.get("results") or [None])[0]}
+
+    async def geocode(self, query: str) -> Dict[str, Any]:
+        """{"status", "result"} for `query`, answered from the geocode cache when possible."""
+        key = " ".join(query.lower().split())
+        cached = await self.cache.get(key)
+        if cached:
+            return cached
+        if self.client:
+            payload = await self._request(self.client, query)
+        else:
+            async with limited_client() as client:
+                payload = await self._request(client, query)
+        await self.cache.put(key, payload)
+        return payload
 
     async def verify_neighborhood(self, ai_prediction: str, ai_landmarks: list, claimed_kvartal: str) -> GeoVerification:
         if self.api_key == "mock-key":
             return GeoVerification(match=True, detected_neighborhood="Mock", confidence=100)
 
         # Build a search query prioritizing specific clues from Gemini
-        search_query = f"{ai_prediction} {' '.join(ai_landmarks)}, Sofia, Bulgaria"
-        
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(self.base_url, params={"address": search_query, "key": self.api_key})
-            data = resp.json()
+        search_query = normalize_geocode_query(ai_prediction, ai_landmarks)
+        data = await self.geocode(search_query)
+        if data["status"] != "OK" or not data["result"]:
+            return GeoVerification(match=True, detected_neighborhood="Not Found", confidence=0)
 
-            if data["status"] != "OK" or not data["results"]:
-                return GeoVerification(match=True, detected_neighborhood="Not Found", confidence=0)
+        result = data["result"]
+        lat_lng = result["geometry"]["location"]
+        formatted_address = result.get("formatted_address", "")
+        
+        # Offline polygon lookup first: the true neighborhood of the geocoded point
+        is_match, confidence = None, 90
+        if self.neighborhoods:
+            detected = self.neighborhoods.locate(lat_lng["lat"], lat_lng["lng"]) or ""
+            is_match = self.neighborhoods.matches(claimed_kvartal, lat_lng["lat"], lat_lng["lng"])
+            if not is_match and self.neighborhoods.rayon_matches(claimed_kvartal, lat_lng["lat"], lat_lng["lng"]):
+                # The ad names only the район: consistent, but it does not pin down the квартал
+                is_match, confidence = True, 60
 
-            result = data["results"][0]
-            lat_lng = result["geometry"]["location"]
-            formatted_address = result.get("formatted_address", "")
-            
+        if is_match is None:
             # Extract neighborhood from Google components
             detected = ""
             for comp in result["address_components"]:
@@ -39,13 +75,13 @@ class GeospatialService:
             
             # Match if strings overlap (e.g., "Krastova Vada" vs "Manastirski Livadi - East")
             is_match = claimed_norm in detected_norm or detected_norm in claimed_norm
-            
-            return GeoVerification(
-                match=is_match,
-                detected_neighborhood=detected,
-                confidence=90,
-                lat=lat_lng["lat"],
-                lng=lat_lng["lng"],
-                warning=None if is_match else f"LOCATION FRAUD: Ad claims {claimed_kvartal}, but Vision/Maps identifies {detected}.",
-                best_address=formatted_address
-            )
+        
+        return GeoVerification(
+            match=is_match,
+            detected_neighborhood=detected,
+            confidence=confidence,
+            lat=lat_lng["lat"],
+            lng=lat_lng["lng"],
+            warning=None if is_match else f"LOCATION FRAUD: Ad claims {claimed_kvartal}, but Vision/Maps identifies {detected}.",
+            best_address=formatted_address
+        )
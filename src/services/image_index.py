@@ -0,0 +1,108 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from PIL import Image
+from src.core.logger import logger
+
+RECORD = np.dtype([("hash", "<u8"), ("listing_id", "<i8")])
+
+# Popcount per byte, for NumPy builds without np.bitwise_count
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def dhash(path: str) -> int:
+    """64-bit difference hash; stable under re-encoding, resizing and small brightness changes."""
+    with Image.open(path) as img:
+        pixels = np.asarray(img.convert("L").resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+def hamming(hashes: np.ndarray, query: int) -> np.ndarray:
+    diff = np.bitwise_xor(hashes, np.uint64(query))
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(diff)
+    return _POPCOUNT8[diff.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+class PerceptualIndex:
+    """
+    dHash of every archived listing photo, searched by a vectorized Hamming scan
+    (a few ms per photo at a million stored hashes). Backed by an append-only
+    file of (hash, listing_id) records shared by all workers on the host.
+    """
+
+    def __init__(self, storage_dir: str = "storage/archive", max_distance: int = 6, stock_threshold: int = 5):
+        self.path = os.path.join(storage_dir, "phash.bin")
+        self.max_distance = max_distance
+        self.stock_threshold = stock_threshold
+        self._records = np.empty(0, dtype=RECORD)
+        self._loaded_bytes = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        """Picks up records appended by other processes since the last read."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        size -= size % RECORD.itemsize
+        if size <= self._loaded_bytes: return
+        with open(self.path, "rb") as f:
+            f.seek(self._loaded_bytes)
+            fresh = np.frombuffer(f.read(size - self._loaded_bytes), dtype=RECORD)
+        self._records = np.concatenate([self._records, fresh])
+        self._loaded_bytes = size
+
+    def add(self, listing_id: int, hashes: Iterable[int]):
+        records = np.array([(h, listing_id) for h in hashes], dtype=RECORD)
+        if not len(records): return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock, open(self.path, "ab") as f:
+            # One O_APPEND write per listing keeps concurrent writers' records whole
+            f.write(records.tobytes())
+
+    def search(self, hashes: Iterable[int], exclude_listing: Optional[int] = None) -> Dict[str, object]:
+        """
+        Prior listings sharing near-duplicate photos with `hashes`:
+        {"duplicate_listings": [{"listing_id", "photos"}, ...], "stock_photos": n}.
+        A photo seen in `stock_threshold`+ other listings counts as a stock image.
+        """
+        with self._lock:
+            self._refresh()
+            records = self._records
+        matches: Dict[int, int] = {}
+        stock_photos = 0
+        if len(records):
+            for query in hashes:
+                close = records["listing_id"][hamming(records["hash"], query) <= self.max_distance]
+                owners = set(np.unique(close).tolist()) - {exclude_listing}
+                if len(owners) >= self.stock_threshold:
+                    stock_photos += 1
+                    continue
+                for owner in owners:
+                    matches[owner] = matches.get(owner, 0) + 1
+        duplicates = [{"listing_id": lid, "photos": n} for lid, n in sorted(matches.items(), key=lambda m: -m[1])]
+        return {"duplicate_listings": duplicates, "stock_photos": stock_photos}
+
+    def hash_files(self, paths: List[str]) -> List[int]:
+        hashes = []
+        for path in paths:
+            try:
+                hashes.append(dhash(path))
+            except Exception as e:
+                logger.warning("phash_failed", path=path, error=str(e))
+        return hashes
+
+    def check_listing(self, listing_id: int, paths: List[str]) -> Dict[str, object]:
+        """Hashes a listing's archived photos, searches prior listings, then indexes the photos."""
+        hashes = self.hash_files(paths)
+        result = self.search(hashes, exclude_listing=listing_id)
+        with self._lock:
+            known = set(self._records["hash"][self._records["listing_id"] == listing_id].tolist())
+        # Re-audits index only photos added since, so the listing never counts twice
+        self.add(listing_id, [h for h in dict.fromkeys(hashes) if h not in known])
+        if result["duplicate_listings"] or result["stock_photos"]:
+            logger.info("photo_reuse_detected", listing_id=listing_id, **result)
+        return result
+
+# Process-wide index (loaded lazily, refreshed on each search)
+image_index = PerceptualIndex()
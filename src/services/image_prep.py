@@ -0,0 +1,63 @@
+import os
+import uuid
+from typing import List, Optional, Tuple
+from PIL import Image, ImageOps
+from src.core.config import settings
+from src.core.logger import logger
+from src.services.image_index import dhash
+
+class GalleryPreprocessor:
+    """
+    Shrinks a listing gallery before it is sent to Gemini: EXIF-rotated, resized
+    to `max_edge`, re-encoded as metadata-free JPEG, near-duplicates dropped and
+    the `max_images` most informative photos kept (in gallery order).
+    Prepared files are cached next to the archive, keyed by the source blob name.
+    """
+
+    def __init__(self, output_dir: str = "storage/archive/gemini", max_edge: Optional[int] = None,
+                 max_images: Optional[int] = None, quality: int = 85, dedup_distance: int = 4):
+        self.output_dir = output_dir
+        self.max_edge = max_edge or settings.GEMINI_IMAGE_MAX_EDGE
+        self.max_images = max_images or settings.GEMINI_MAX_IMAGES
+        self.quality = quality
+        self.dedup_distance = dedup_distance
+
+    def _prepare_one(self, path: str) -> Tuple[str, float]:
+        """Returns (prepared path, informativeness score)."""
+        stem = os.path.splitext(os.path.basename(path))[0]
+        out_path = os.path.join(self.output_dir, f"{stem}_{self.max_edge}q{self.quality}.jpg")
+        if not os.path.exists(out_path):
+            with Image.open(path) as img:
+                img = ImageOps.exif_transpose(img).convert("RGB")
+                img.thumbnail((self.max_edge, self.max_edge), Image.Resampling.LANCZOS)
+                tmp_path = f"{out_path}.tmp.{uuid.uuid4().hex}"
+                # No exif= argument: metadata (GPS, camera serials) is dropped on re-encode
+                img.save(tmp_path, "JPEG", quality=self.quality, optimize=True)
+            os.replace(tmp_path, out_path)
+        with Image.open(out_path) as img:
+            # Greyscale entropy: floor plans and detailed rooms beat blank walls and logos
+            score = img.convert("L").entropy()
+        return out_path, score
+
+    def prepare(self, paths: List[str]) -> List[str]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        candidates = []  # (gallery position, path, score, hash)
+        for position, path in enumerate(paths):
+            try:
+                prepared, score = self._prepare_one(path)
+                candidates.append((position, prepared, score, dhash(prepared)))
+            except Exception as e:
+                logger.warning("image_prep_failed", path=path, error=str(e))
+
+        # Keep the most informative shot of each near-duplicate group, then the top N overall
+        kept = []
+        for candidate in sorted(candidates, key=lambda c: -c[2]):
+            if any(bin(candidate[3] ^ other[3]).count("1") <= self.dedup_distance for other in kept):
+                continue
+            kept.append(candidate)
+        kept = sorted(kept[:self.max_images], key=lambda c: c[0])
+
+        logger.info("gallery_prepared", received=len(paths), kept=len(kept),
+                    bytes_in=sum(os.path.getsize(p) for p in paths if os.path.exists(p)),
+                    bytes_out=sum(os.path.getsize(c[1]) for c in kept))
+        return [c[1] for c in kept]
@@ -0,0 +1,336 @@
+import mmap
+import os
+import re
+import struct
+from bisect import bisect_left
+from typing import Optional, List, Dict, Tuple
+
+# Article headers ('Чл. 110.', 'Чл. 2а.') and the boundary that ends an article body
+ARTICLE_HEADER = re.compile(r"Чл\. (\d+[а-я]?)\.")
+ARTICLE_BOUNDARY = re.compile(r"\nЧл\. \d")
+# A 'sentence' is any run of text between full stops / line breaks
+SENTENCE = re.compile(r"[^.\n]+")
+TERM = re.compile(r"\w+")
+
+# --- Binary index layout (little-endian, all offsets in bytes) ---
+# Header: magic, format version, source mtime_ns + size (staleness check),
+#         section counts, section offsets.
+# Articles:  (label_off, label_len, text_start, text_end)      sorted by label bytes
+# Sentences: (text_start, text_end)                            in file order
+# Terms:     (term_off, term_len, postings_off, postings_count) sorted by term bytes
+# Suffixes:  (term_index, byte_offset) for every suffix of every term, sorted by suffix bytes
+# Postings:  uint32 sentence ids
+# Strings:   utf-8 blob holding article labels and terms
+INDEX_MAGIC = b"GLXLAW01"
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".idx"
+HEADER = struct.Struct("<8sIQQIIIIQQQQQQ")
+ARTICLE_ENTRY = struct.Struct("<IIII")
+SENTENCE_ENTRY = struct.Struct("<II")
+TERM_ENTRY = struct.Struct("<IIII")
+SUFFIX_ENTRY = struct.Struct("<II")
+POSTING = struct.Struct("<I")
+
+def tokenize(text: str) -> List[str]:
+    return TERM.findall(text.lower())
+
+def source_version(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+def index_path_for(law_path: str) -> str:
+    return os.path.splitext(law_path)[0] + INDEX_SUFFIX
+
+def parse_law(content: str):
+    """
+    Splits a law text into article spans, sentence spans and term postings.
+    Spans are character offsets into `content`.
+    """
+    articles: Dict[str, Tuple[int, int]] = {}
+    boundaries = [m.start() for m in ARTICLE_BOUNDARY.finditer(content)]
+    for m in ARTICLE_HEADER.finditer(content):
+        label = m.group(1)
+        if label in articles:
+            continue  # First occurrence wins (same as re.search)
+        i = bisect_left(boundaries, m.end())
+        end = boundaries[i] if i < len(boundaries) else len(content)
+        articles[label] = (m.start(), end)
+
+    sentences: List[Tuple[int, int]] = []
+    postings: Dict[str, List[int]] = {}
+    for sid, m in enumerate(SENTENCE.finditer(content)):
+        sentences.append(m.span())
+        for term in set(tokenize(m.group(0))):
+            postings.setdefault(term, []).append(sid)
+    return articles, sentences, postings
+
+class LawIndex:
+    """
+    Parsed view of a single law file: article spans plus an inverted term index.
+    Built once per file version (mtime + size) and kept in process memory.
+    """
+    def __init__(self, law_file: str, content: str, version: Tuple[int, int]):
+        self.law_file = law_file
+        self.content = content
+        self.version = version
+        self.articles, self.sentences, self.postings = parse_law(content)
+        self.terms = sorted(self.postings)
+        # Suffix table: infix/word-ending lookups bisect it instead of scanning the terms
+        self.suffixes = sorted((term[k:], i) for i, term in enumerate(self.terms) for k in range(len(term)))
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentences)
+
+    def article(self, label: str) -> Optional[str]:
+        span = self.articles.get(label)
+        return self.content[span[0]:span[1]].strip() if span else None
+
+    def sentence(self, sid: int) -> str:
+        start, end = self.sentences[sid]
+        return self.content[start:end]
+
+    def _matching(self, token: str, mode: str) -> set:
+        """Sentence ids of every term that has `token` as a prefix, suffix or infix."""
+        result = set()
+        if mode == "prefix":
+            i = bisect_left(self.terms, token)
+            while i < len(self.terms) and self.terms[i].startswith(token):
+                result.update(self.postings[self.terms[i]])
+                i += 1
+            return result
+        # Infix: suffixes starting with the token; word ending: suffixes equal to it
+        i, seen = bisect_left(self.suffixes, (token,)), set()
+        while i < len(self.suffixes) and self.suffixes[i][0].startswith(token):
+            suffix, term = self.suffixes[i]
+            if term not in seen and (mode == "infix" or suffix == token):
+                seen.add(term)
+                result.update(self.postings[self.terms[term]])
+            i += 1
+        return result
+
+    def _exact(self, term: str):
+        return self.postings.get(term, ())
+
+    def candidates(self, tokens: List[str]) -> List[int]:
+        return candidate_sentences(self, tokens)
+
+def candidate_sentences(index, tokens: List[str]) -> List[int]:
+    """
+    Sentence ids that may contain the query as a substring: a single token
+    anywhere inside a word ('строен' -> 'застроена'); for phrases the first
+    token ends a word, the last starts one ('площ' -> 'площта') and the ones
+    between are whole words. Prefix lookups bisect the term table, infix and
+    word-ending ones the suffix table. A query without word characters has
+    nothing to look up, so every sentence is a candidate.
+    """
+    if not tokens: return list(range(index.sentence_count))
+    if len(tokens) == 1:
+        return sorted(index._matching(tokens[0], "infix"))
+    first, *middle, last = tokens
+    result = index._matching(last, "prefix")
+    for term in middle:
+        if not result: break
+        result = result.intersection(index._exact(term))
+    if result:
+        result &= index._matching(first, "suffix")
+    return sorted(result)
+
+def write_atomic(path: str, data: bytes):
+    """
+    Replaces `path` with `data` via a temp file and os.replace. Files that may
+    be memory-mapped (law texts, indexes) must never be rewritten in place:
+    truncating a mapped file makes readers fault (SIGBUS) on the lost pages.
+    """
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _byte_offsets(content: str, char_offsets) -> Dict[int, int]:
+    """Maps character offsets to utf-8 byte offsets in one forward pass."""
+    mapping, pos, byte_pos = {}, 0, 0
+    for off in sorted(set(char_offsets)):
+        byte_pos += len(content[pos:off].encode("utf-8"))
+        mapping[off] = byte_pos
+        pos = off
+    return mapping
+
+def build_law_index(law_path: str) -> str:
+    """
+    Writes the prebuilt `.idx` file next to a law text and returns its path.
+    The file is written atomically, so processes holding the old mapping keep
+    a consistent view until they reopen.
+    """
+    with open(law_path, "rb") as f:
+        content = f.read().decode("utf-8")
+    mtime_ns, size = source_version(law_path)
+    articles, sentences, postings = parse_law(content)
+
+    offsets = [o for span in articles.values() for o in span]
+    offsets += [o for span in sentences for o in span]
+    to_byte = _byte_offsets(content, offsets)
+
+    strings = bytearray()
+    def intern(text: str) -> Tuple[int, int]:
+        raw = text.encode("utf-8")
+        off = len(strings)
+        strings.extend(raw)
+        return off, len(raw)
+
+    article_table = bytearray()
+    for label in sorted(articles, key=lambda l: l.encode("utf-8")):
+        start, end = articles[label]
+        article_table += ARTICLE_ENTRY.pack(*intern(label), to_byte[start], to_byte[end])
+
+    sentence_table = bytearray()
+    for start, end in sentences:
+        sentence_table += SENTENCE_ENTRY.pack(to_byte[start], to_byte[end])
+
+    term_table, posting_table, suffixes = bytearray(), bytearray(), []
+    for index, term in enumerate(sorted(postings, key=lambda t: t.encode("utf-8"))):
+        ids = postings[term]
+        term_table += TERM_ENTRY.pack(*intern(term), len(posting_table) // POSTING.size, len(ids))
+        posting_table += struct.pack(f"<{len(ids)}I", *ids)
+        raw = term.encode("utf-8")
+        # Suffixes start on character boundaries only
+        suffixes += [(raw[k:], index, k) for k in range(len(raw)) if raw[k] & 0xC0 != 0x80]
+    suffix_table = bytearray()
+    for _, index, k in sorted(suffixes):
+        suffix_table += SUFFIX_ENTRY.pack(index, k)
+
+    off_articles = HEADER.size
+    off_sentences = off_articles + len(article_table)
+    off_terms = off_sentences + len(sentence_table)
+    off_suffixes = off_terms + len(term_table)
+    off_postings = off_suffixes + len(suffix_table)
+    off_strings = off_postings + len(posting_table)
+    header = HEADER.pack(
+        INDEX_MAGIC, INDEX_VERSION, mtime_ns, size,
+        len(articles), len(sentences), len(postings), len(suffixes),
+        off_articles, off_sentences, off_terms, off_suffixes, off_postings, off_strings
+    )
+
+    idx_path = index_path_for(law_path)
+    write_atomic(idx_path, b"".join((header, article_table, sentence_table, term_table, suffix_table,
+                                     posting_table, strings)))
+    return idx_path
+
+class MappedLawIndex:
+    """
+    Read-only view over a prebuilt `.idx` file and its law text, both opened
+    via mmap. Nothing is decoded until a lookup touches it, so every worker
+    shares the same page-cache copy of the corpus.
+    """
+    def __init__(self, law_file: str, law_path: str, idx_path: str, version: Tuple[int, int]):
+        self.law_file = law_file
+        self.version = version
+        # A mapping holds its own descriptor, so the files are closed right away and the pages are
+        # unmapped when the last reader drops this object (never under a reader's feet)
+        with open(idx_path, "rb") as f:
+            self._idx = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(law_path, "rb") as f:
+            # mmap cannot map an empty file
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if version[1] else b""
+        (_, _, _, _, self.n_articles, self.n_sentences, self.n_terms, self.n_suffixes,
+         self._off_articles, self._off_sentences, self._off_terms, self._off_suffixes,
+         self._off_postings, self._off_strings) = HEADER.unpack_from(self._idx, 0)
+
+    @property
+    def sentence_count(self) -> int:
+        return self.n_sentences
+
+    @classmethod
+    def open(cls, law_file: str, law_path: str) -> Optional["MappedLawIndex"]:
+        """Returns a mapped index if a prebuilt file exists and matches the law text."""
+        idx_path = index_path_for(law_path)
+        try:
+            version = source_version(law_path)
+            with open(idx_path, "rb") as f:
+                header = f.read(HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(header) < HEADER.size:
+            return None
+        magic, fmt, mtime_ns, size = HEADER.unpack(header)[:4]
+        if magic != INDEX_MAGIC or fmt != INDEX_VERSION or (mtime_ns, size) != version:
+            return None  # Stale or foreign file; caller falls back to parsing the text
+        return cls(law_file, law_path, idx_path, version)
+
+    def close(self):
+        """Unmaps both files now; only for owners that know no reader still holds the index."""
+        for mapping in (self._idx, self._text):
+            if isinstance(mapping, mmap.mmap):
+                mapping.close()
+
+    def _string(self, off: int, length: int) -> bytes:
+        start = self._off_strings + off
+        return self._idx[start:start + length]
+
+    def _article_entry(self, i: int):
+        return ARTICLE_ENTRY.unpack_from(self._idx, self._off_articles + i * ARTICLE_ENTRY.size)
+
+    def _term_entry(self, i: int):
+        return TERM_ENTRY.unpack_from(self._idx, self._off_terms + i * TERM_ENTRY.size)
+
+    def _term_at(self, i: int) -> bytes:
+        return self._string(*self._term_entry(i)[:2])
+
+    def _postings(self, i: int) -> Tuple[int, ...]:
+        _, _, off, count = self._term_entry(i)
+        return struct.unpack_from(f"<{count}I", self._idx, self._off_postings + off * POSTING.size)
+
+    def _bisect(self, count: int, key_at, key: bytes) -> int:
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key_at(mid) < key: lo = mid + 1
+            else: hi = mid
+        return lo
+
+    def article(self, label: str) -> Optional[str]:
+        key = label.encode("utf-8")
+        i = self._bisect(self.n_articles, lambda j: self._string(*self._article_entry(j)[:2]), key)
+        if i >= self.n_articles: return None
+        label_off, label_len, start, end = self._article_entry(i)
+        if self._string(label_off, label_len) != key: return None
+        return self._text[start:end].decode("utf-8").strip()
+
+    def sentence(self, sid: int) -> str:
+        start, end = SENTENCE_ENTRY.unpack_from(self._idx, self._off_sentences + sid * SENTENCE_ENTRY.size)
+        return self._text[start:end].decode("utf-8")
+
+    def _exact(self, term: str) -> Tuple[int, ...]:
+        key = term.encode("utf-8")
+        i = self._bisect(self.n_terms, self._term_at, key)
+        if i < self.n_terms and self._term_at(i) == key:
+            return self._postings(i)
+        return ()
+
+    def _matching(self, token: str, mode: str) -> set:
+        key = token.encode("utf-8")
+        result = set()
+        if mode == "prefix":
+            i = self._bisect(self.n_terms, self._term_at, key)
+            while i < self.n_terms and self._term_at(i).startswith(key):
+                result.update(self._postings(i))
+                i += 1
+            return result
+        i, seen = self._bisect(self.n_suffixes, lambda j: self._suffix_at(j)[0], key), set()
+        while i < self.n_suffixes:
+            suffix, term = self._suffix_at(i)
+            if not suffix.startswith(key): break
+            if term not in seen and (mode == "infix" or suffix == key):
+                seen.add(term)
+                result.update(self._postings(term))
+            i += 1
+        return result
+
+    def _suffix_at(self, i: int) -> Tuple[bytes, int]:
+        term, k = SUFFIX_ENTRY.unpack_from(self._idx, self._off_suffixes + i * SUFFIX_ENTRY.size)
+        off, length = self._term_entry(term)[:2]
+        return self._string(off + k, length - k), term
+
+    def candidates(self, tokens: List[str]) -> List[int]:
+        """Same contract as LawIndex.candidates, resolved against the mapped term table."""
+        return candidate_sentences(self, tokens)
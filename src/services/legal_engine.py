@@ -1,37 +1,75 @@
 import os
-import re
-from typing import Optional, List
+import threading
+from typing import Optional, List, Dict, Union
 from src.core.patterns import ForensicPatterns
+from src.services.law_index import LawIndex, MappedLawIndex, tokenize, source_version
 
 class LegalKnowledgeBase:
     """Search engine for the local law database."""
     def __init__(self, laws_path: str = "storage/laws"):
         self.laws_path = laws_path
+        self._indexes: Dict[str, Union[LawIndex, MappedLawIndex]] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, law_file: str) -> Optional[Union[LawIndex, MappedLawIndex]]:
+        """
+        Returns the index for a law file, reloading it only if the file changed.
+        A fresh prebuilt `.idx` (see scripts/build_law_index.py) is memory-mapped;
+        otherwise the text is parsed into an in-process index.
+        """
+        file_path = os.path.join(self.laws_path, law_file)
+        try:
+            version = source_version(file_path)
+        except FileNotFoundError:
+            self._indexes.pop(law_file, None)
+            return None
+
+        index = self._indexes.get(law_file)
+        if index and index.version == version:
+            return index
+        with self._lock:
+            index = self._indexes.get(law_file)
+            if index and index.version == version:
+                return index
+            index = MappedLawIndex.open(law_file, file_path)
+            if not index:
+                with open(file_path, "rb") as f:
+                    index = LawIndex(law_file, f.read().decode("utf-8"), version)
+            # The stale index is only dropped: readers that fetched it before the swap may still
+            # be searching it, and it is unmapped once the last of them lets go
+            self._indexes[law_file] = index
+            return index
+
+    def warm(self):
+        """Loads every law index up front (e.g. while an audit is still waiting on registries)."""
+        if not os.path.exists(self.laws_path): return
+        for law_file in sorted(os.listdir(self.laws_path)):
+            if law_file.endswith(".txt"):
+                self._load(law_file)
 
     def get_article(self, law_name: str, article_num: int) -> Optional[str]:
         """Extracts a specific Article text from the law file."""
-        file_path = os.path.join(self.laws_path, f"{law_name}.txt")
-        if not os.path.exists(file_path):
-            return None
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        
-        # Matches 'Чл. [num].' until the next Article or end of file
-        pattern = rf"(Чл\. {article_num}\..*?)(?=\nЧл\. \d+|\Z)"
-        match = re.search(pattern, content, re.DOTALL)
-        return match.group(1).strip() if match else None
+        index = self._load(f"{law_name}.txt")
+        return index.article(str(article_num)) if index else None
 
     def search_context(self, keyword: str, limit: int = 1) -> List[str]:
         """Finds sentences containing specific legal terms."""
         results = []
         if not os.path.exists(self.laws_path): return results
-        for law_file in os.listdir(self.laws_path):
+        needle = keyword.lower()
+        tokens = tokenize(keyword)
+        for law_file in sorted(os.listdir(self.laws_path)):
             if not law_file.endswith(".txt"): continue
-            with open(os.path.join(self.laws_path, law_file), "r", encoding="utf-8") as f:
-                content = f.read()
-                matches = re.findall(rf"([^.\n]*{keyword}[^.\n]*)", content, re.IGNORECASE)
-                for m in matches[:limit]:
-                    results.append(f"{m.strip()} (Ref: {law_file})")
+            index = self._load(law_file)
+            if not index: continue
+            found = 0
+            for sid in index.candidates(tokens):
+                sentence = index.sentence(sid)
+                # Postings narrow the search; the substring check keeps the original semantics
+                if needle not in sentence.lower(): continue
+                results.append(f"{sentence.strip()} (Ref: {law_file})")
+                found += 1
+                if found >= limit: break
         return results
 
 # Initialize the Knowledge Base Instance
@@ -45,12 +83,12 @@ class LegalEngine:
             "gatekeeper_verdict": "CLEAR",
             "flags": []
         }
-        raw_text = scraped_data.get("raw_text", "").upper()
-        regex_flags = ForensicPatterns.extract_flags(raw_text)
+        hits = ForensicPatterns.hits_for(scraped_data)
+        regex_flags = ForensicPatterns.extract_flags(hits=hits)
         risk_report["flags"].extend(regex_flags)
         
         p1_score = 0
-        if ai_data.get("is_atelier") or "АТЕЛИЕ" in raw_text:
+        if ai_data.get("is_atelier") or "ATELIER_TERM" in hits:
             p1_score = 35
             risk_report["flags"].append("LEGAL: Non-residential status (Atelier).")
         
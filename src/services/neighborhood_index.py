@@ -0,0 +1,162 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from src.core.config import settings
+from src.core.logger import logger
+
+def normalize_kvartal(name: str) -> str:
+    """'ж.к. Младост 1', 'кв. Младост-1' and 'Mladost 1' style variants reduced for comparison."""
+    clean = (name or "").lower()
+    clean = re.sub(r'\b(гр|ж\.?\s?к|кв|р-н|район|град)\b\.?', ' ', clean)
+    clean = re.sub(r'[^\w]+', ' ', clean)
+    return re.sub(r'\s+', ' ', clean).strip()
+
+class _Area:
+    def __init__(self, name: str, aliases: List[str], polygons: List[List[np.ndarray]], is_rayon: bool = False):
+        self.name = name
+        self.is_rayon = is_rayon
+        self.keys = {normalize_kvartal(a) for a in [name, *aliases] if normalize_kvartal(a)}
+        self.rings = [ring for polygon in polygons for ring in polygon]
+        stacked = np.vstack(self.rings)
+        self.bbox = (stacked[:, 0].min(), stacked[:, 1].min(), stacked[:, 0].max(), stacked[:, 1].max())
+        # Per polygon: outer ring minus its holes, whatever their winding, so nested
+        # districts sort before the район around them
+        self.size = sum(abs(self._signed_area(polygon[0])) - sum(abs(self._signed_area(h)) for h in polygon[1:])
+                        for polygon in polygons)
+
+    @staticmethod
+    def _signed_area(ring: np.ndarray) -> float:
+        x, y = ring[:, 0], ring[:, 1]
+        return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+    def contains(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Vectorized even-odd ray casting over every ring (holes included) for points (x, y)."""
+        inside = np.zeros(len(x), dtype=bool)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for ring in self.rings:
+                x1, y1 = ring[:, 0][:, None], ring[:, 1][:, None]
+                x2, y2 = np.roll(ring[:, 0], -1)[:, None], np.roll(ring[:, 1], -1)[:, None]
+                straddles = (y1 > y) != (y2 > y)
+                x_cross = (x2 - x1) * (y - y1) / (y2 - y1) + x1
+                inside ^= (np.count_nonzero(straddles & (x < x_cross), axis=0) % 2).astype(bool)
+        return inside
+
+class NeighborhoodIndex:
+    """
+    Sofia neighborhood / район polygons (GeoJSON, lng/lat) for offline
+    point-in-polygon lookups. A bounding-box table prunes candidates; exact
+    tests are NumPy ray casts, one pass per polygon for bulk classification.
+    Areas are ordered smallest first, so the most specific match wins.
+    """
+
+    BATCH = 4096
+
+    def __init__(self, features: Sequence[Dict[str, Any]]):
+        areas = []
+        for feature in features:
+            props = feature.get("properties") or {}
+            geometry = feature.get("geometry") or {}
+            polygons = geometry.get("coordinates") or []
+            if geometry.get("type") == "Polygon":
+                polygons = [polygons]
+            elif geometry.get("type") != "MultiPolygon":
+                continue
+            rings = [[np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon if len(ring) >= 3]
+                     for polygon in polygons]
+            rings = [polygon for polygon in rings if polygon]
+            name = props.get("name") or props.get("name:bg")
+            if not rings or not name: continue
+            aliases = [props[k] for k in ("name:en", "name:bg", "alt_name", "old_name") if props.get(k)]
+            # Районы are admin_level 9; квартали / ж.к. are admin_level 10 or place=* polygons
+            areas.append(_Area(name, aliases, rings, is_rayon=str(props.get("admin_level")) == "9"))
+        self.areas = sorted(areas, key=lambda a: a.size)
+        self._bboxes = np.array([a.bbox for a in self.areas], dtype=np.float64).reshape(-1, 4)
+
+    @classmethod
+    def load(cls, path: str) -> "NeighborhoodIndex":
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f).get("features", []))
+
+    def _candidates(self, lng: float, lat: float) -> np.ndarray:
+        b = self._bboxes
+        return np.flatnonzero((b[:, 0] <= lng) & (lng <= b[:, 2]) & (b[:, 1] <= lat) & (lat <= b[:, 3]))
+
+    def locate_all(self, lat: float, lng: float) -> List[str]:
+        """Names of every area containing the point, most specific first."""
+        x, y = np.array([lng]), np.array([lat])
+        return [self.areas[i].name for i in self._candidates(lng, lat) if self.areas[i].contains(x, y)[0]]
+
+    def locate(self, lat: float, lng: float) -> Optional[str]:
+        x, y = np.array([lng]), np.array([lat])
+        for i in self._candidates(lng, lat):
+            if self.areas[i].contains(x, y)[0]:
+                return self.areas[i].name
+        return None
+
+    def locate_many(self, lats: Sequence[float], lngs: Sequence[float]) -> List[Optional[str]]:
+        """Bulk mode for backfills: the most specific area name per coordinate (None outside all)."""
+        x, y = np.asarray(lngs, dtype=np.float64), np.asarray(lats, dtype=np.float64)
+        found = np.full(len(x), -1, dtype=np.int64)
+        for i, area in enumerate(self.areas):
+            min_x, min_y, max_x, max_y = area.bbox
+            todo = np.flatnonzero((found < 0) & (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y))
+            for start in range(0, len(todo), self.BATCH):
+                chunk = todo[start:start + self.BATCH]
+                found[chunk[area.contains(x[chunk], y[chunk])]] = i
+        return [self.areas[i].name if i >= 0 else None for i in found]
+
+    def _containing(self, lat: float, lng: float, rayon: bool) -> List[_Area]:
+        x, y = np.array([lng]), np.array([lat])
+        return [self.areas[i] for i in self._candidates(lng, lat)
+                if self.areas[i].is_rayon == rayon and self.areas[i].contains(x, y)[0]]
+
+    def matches(self, claimed: str, lat: float, lng: float) -> Optional[bool]:
+        """
+        Whether the ad's claimed квартал is the one containing the point: the
+        normalized claim must equal the name or an alias of a квартал-level
+        polygon. None if no квартал polygon covers the point.
+        """
+        containing = self._containing(lat, lng, rayon=False)
+        if not containing: return None
+        claim = normalize_kvartal(claimed)
+        return any(claim in area.keys for area in containing)
+
+    def rayon_matches(self, claimed: str, lat: float, lng: float) -> Optional[bool]:
+        """
+        Weaker signal: whether the claim names the район containing the point
+        (ads that give only the район). None if no район polygon covers it.
+        """
+        containing = self._containing(lat, lng, rayon=True)
+        if not containing: return None
+        claim = normalize_kvartal(claimed)
+        return any(claim in area.keys for area in containing)
+
+_index: Optional[NeighborhoodIndex] = None
+_index_lock = threading.Lock()
+_index_missing = False
+
+def get_neighborhood_index() -> Optional[NeighborhoodIndex]:
+    """
+    Process-wide index from settings.NEIGHBORHOODS_GEOJSON. A missing file is
+    logged as an error (verification falls back to Google's sublocality) and
+    raises FileNotFoundError when settings.NEIGHBORHOODS_REQUIRED is set.
+    """
+    global _index, _index_missing
+    if _index is not None or _index_missing:
+        return _index
+    with _index_lock:
+        if _index is None and not _index_missing:
+            path = settings.NEIGHBORHOODS_GEOJSON
+            if os.path.exists(path):
+                _index = NeighborhoodIndex.load(path)
+                logger.info("neighborhood_index_loaded", areas=len(_index.areas))
+            elif settings.NEIGHBORHOODS_REQUIRED:
+                raise FileNotFoundError(f"{path} missing: run scripts/fetch_sofia_neighborhoods.py")
+            else:
+                _index_missing = True
+                logger.error("neighborhood_index_missing", path=path,
+                             hint="run scripts/fetch_sofia_neighborhoods.py; matching falls back to Google")
+    return _index
@@ -0,0 +1,50 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+import httpx
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from src.core.config import settings
+from src.core.logger import logger
+from src.db.models import Listing
+from src.schemas import ConditionalFetch
+from src.services.scraper_service import ScraperService
+
+def next_interval(current: Optional[int], changed: Optional[bool]) -> int:
+    """
+    Re-check cadence for one listing: halve it after a change, grow it by half
+    after a quiet check, keep it after a failed or baseline one, within the configured bounds.
+    """
+    interval = current or settings.RECHECK_DEFAULT_INTERVAL
+    if changed is True:
+        interval = interval // 2
+    elif changed is False:
+        interval = int(interval * 1.5)
+    return max(settings.RECHECK_MIN_INTERVAL, min(settings.RECHECK_MAX_INTERVAL, interval))
+
+def due_listing_ids(db: Session, limit: Optional[int] = None, now: Optional[datetime] = None) -> List[int]:
+    """Listings whose next check is due (never-checked ones first), oldest due first."""
+    now = now or datetime.now(timezone.utc)
+    rows = (db.query(Listing.id)
+            .filter(or_(Listing.next_check_at.is_(None), Listing.next_check_at <= now))
+            .order_by(Listing.next_check_at.isnot(None), Listing.next_check_at, Listing.id)
+            .limit(limit or settings.RECHECK_MAX_PER_TICK))
+    return [lid for (lid,) in rows]
+
+async def fetch_many(listings: List[Listing], client: httpx.AsyncClient,
+                     concurrency: Optional[int] = None) -> Dict[int, Optional[ConditionalFetch]]:
+    """Conditional re-scrapes for a batch, at most `concurrency` in flight (the host limiter still applies)."""
+    scraper = ScraperService(client=client)
+    slots = asyncio.Semaphore(concurrency or settings.RECHECK_CONCURRENCY)
+
+    async def one(listing: Listing) -> Optional[ConditionalFetch]:
+        async with slots:
+            try:
+                return await scraper.fetch_if_changed(listing.source_url, listing.etag,
+                                                      listing.last_modified, listing.body_hash)
+            except Exception as e:
+                logger.warning("recheck_failed", listing_id=listing.id, error=str(e))
+                return None
+
+    results = await asyncio.gather(*(one(l) for l in listings))
+    return {l.id: r for l, r in zip(listings, results)}
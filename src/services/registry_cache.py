@@ -0,0 +1,171 @@
+import asyncio
+import copy
+import functools
+import json
+import time
+import weakref
+import redis.asyncio as aioredis
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from src.core.config import settings
+from src.core.logger import logger
+
+Fetcher = Callable[[], Awaitable[Dict[str, Any]]]
+
+class MemoryCacheBackend:
+    """In-process LRU store. Entries are (value, fetched_at) tuples."""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        entry = self._data.get(key)
+        if entry is None: return None
+        self._data.move_to_end(key)
+        return copy.deepcopy(entry[0]), entry[1]
+
+    async def set(self, key: str, value: Dict[str, Any], fetched_at: float, expire_seconds: int):
+        self._data[key] = (copy.deepcopy(value), fetched_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+class RedisCacheBackend:
+    """
+    Shared store for all API/worker processes. One connection pool per event
+    loop, since redis.asyncio connections cannot be shared across loops.
+    """
+
+    def __init__(self, url: str, prefix: str = "glashaus:registry"):
+        self.url = url
+        self.prefix = prefix
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = aioredis.from_url(self.url, decode_responses=True)
+            self._clients[loop] = client
+        return client
+
+    async def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        raw = await self._client().get(f"{self.prefix}:{key}")
+        if not raw: return None
+        entry = json.loads(raw)
+        return entry["value"], entry["fetched_at"]
+
+    async def set(self, key: str, value: Dict[str, Any], fetched_at: float, expire_seconds: int):
+        raw = json.dumps({"value": value, "fetched_at": fetched_at}, default=str)
+        await self._client().set(f"{self.prefix}:{key}", raw, ex=expire_seconds)
+
+class RegistryCache:
+    """
+    Read-through cache for registry lookups keyed by (register, cadastre_id).
+
+    - fresh (age < ttl):                  served from cache
+    - stale (age < ttl + stale_seconds):  served from cache, refreshed in the background
+    - expired / missing:                  fetched; concurrent misses share one fetch
+    Results carrying an "error" key are never stored.
+    """
+
+    DEFAULT_TTLS = {
+        "expropriation": 24 * 3600,
+        "act16": 6 * 3600,
+        "permits": 6 * 3600,
+    }
+
+    def __init__(self, backend, ttls: Optional[Dict[str, int]] = None, stale_seconds: int = 24 * 3600):
+        self.backend = backend
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.stale_seconds = stale_seconds
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._background: set = set()
+
+    def _count(self, register: str, outcome: str):
+        counters = self.stats.setdefault(register, {"hit": 0, "stale": 0, "miss": 0, "refresh": 0})
+        counters[outcome] += 1
+
+    def ttl_for(self, register: str) -> int:
+        return self.ttls.get(register, 3600)
+
+    async def _read(self, key: str):
+        try:
+            return await self.backend.get(key)
+        except Exception as e:
+            logger.warning("registry_cache_read_failed", key=key, error=str(e))
+            return None
+
+    async def _fetch_and_store(self, register: str, key: str, fetch: Fetcher) -> Dict[str, Any]:
+        value = await fetch()
+        if "error" not in value:
+            try:
+                await self.backend.set(key, value, time.time(), self.ttl_for(register) + self.stale_seconds)
+            except Exception as e:
+                logger.warning("registry_cache_write_failed", key=key, error=str(e))
+        return value
+
+    def _release(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def _shared_fetch(self, register: str, key: str, fetch: Fetcher) -> asyncio.Task:
+        """Single-flight: one upstream call per key and event loop."""
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(self._fetch_and_store(register, key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._release, key))
+        return task
+
+    async def get_or_fetch(self, register: str, cadastre_id: str, fetch: Fetcher,
+                           revalidate: Optional[Fetcher] = None) -> Dict[str, Any]:
+        """
+        `fetch` runs inline on a miss. `revalidate` (defaults to `fetch`) runs in
+        the background for stale entries and must not depend on resources the
+        caller is about to close.
+        """
+        key = f"{register}:{cadastre_id}"
+        entry = await self._read(key)
+        if entry:
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.ttl_for(register):
+                self._count(register, "hit")
+                return value
+            if age < self.ttl_for(register) + self.stale_seconds:
+                self._count(register, "stale")
+                if key not in self._inflight:
+                    self._count(register, "refresh")
+                    task = self._shared_fetch(register, key, revalidate or fetch)
+                    self._background.add(task)
+                    task.add_done_callback(self._background.discard)
+                return value
+
+        self._count(register, "miss")
+        return await asyncio.shield(self._shared_fetch(register, key, fetch))
+
+    async def put(self, register: str, cadastre_id: str, value: Dict[str, Any], fetched_at: Optional[float] = None):
+        """Stores a result obtained out of band (e.g. from a bulk register sweep)."""
+        await self.backend.set(f"{register}:{cadastre_id}", value, fetched_at or time.time(),
+                               self.ttl_for(register) + self.stale_seconds)
+
+    async def drain(self):
+        """Waits for background revalidations (call before the event loop ends)."""
+        loop = asyncio.get_running_loop()
+        pending = [t for t in self._background if t.get_loop() is loop]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+def build_registry_cache() -> RegistryCache:
+    if settings.REGISTRY_CACHE_BACKEND == "redis":
+        backend = RedisCacheBackend(settings.REDIS_URL)
+    else:
+        backend = MemoryCacheBackend(settings.REGISTRY_CACHE_MAX_ENTRIES)
+    return RegistryCache(backend, stale_seconds=settings.REGISTRY_CACHE_STALE_SECONDS)
+
+# Process-wide cache shared by every SofiaMunicipalForensics instance
+registry_cache = build_registry_cache()
@@ -0,0 +1,154 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+from src.core.config import settings
+from src.core.logger import logger
+from src.core.rate_limiter import limited_client
+from src.core.tracing import span
+from src.services.forensics_service import SofiaMunicipalForensics
+
+# Sofia cadastre identifiers: EKATTE.map.parcel[.building[.unit]]
+CADASTRE_ID = re.compile(r"\b\d{5}\.\d{1,5}\.\d{1,5}(?:\.\d{1,5}){0,2}\b")
+
+class RegisterSchemaError(ValueError):
+    """Read rows lack the column the live search matches on; the snapshot cannot answer lookups."""
+
+class RegisterSnapshot:
+    """
+    Local copy of a whole NAG register (or a region slice of it) with an index
+    from every cadastre ID in a row's search column (the register's
+    `row_field`) to that row. Rows without that column raise
+    RegisterSchemaError: an unmatched snapshot would answer "no hits" for
+    every building.
+    """
+
+    def __init__(self, register: str, rows: List[Dict[str, Any]], taken_at: float, region: str = ""):
+        self.register = register
+        self.field = SofiaMunicipalForensics.REGISTERS[register]["row_field"]
+        missing = sum(1 for row in rows if self.field not in row)
+        if missing:
+            sample = sorted(next(row for row in rows if self.field not in row))
+            raise RegisterSchemaError(f"{register}: {missing}/{len(rows)} rows have no '{self.field}' column "
+                                      f"(columns: {sample})")
+        self.rows = rows
+        self.taken_at = taken_at
+        self.region = region
+        self._index: Dict[str, List[int]] = {}
+        for i, row in enumerate(rows):
+            for cid in self.row_ids(row, self.field):
+                self._index.setdefault(cid, []).append(i)
+        self._ids = sorted(self._index)
+
+    @staticmethod
+    def row_ids(row: Dict[str, Any], field: str) -> set:
+        value = row.get(field)
+        return set(CADASTRE_ID.findall(value)) if isinstance(value, str) else set()
+
+    def hits(self, cadastre_id: str) -> List[Dict[str, Any]]:
+        """
+        Rows the live /Search would return for `cadastre_id`: those whose
+        target field contains it (so sub-objects match, parcel ancestors and
+        mentions in other fields do not). Candidates are the indexed IDs that
+        start with `cadastre_id`. Row order is preserved.
+        """
+        matched = set()
+        i = bisect_left(self._ids, cadastre_id)
+        while i < len(self._ids) and self._ids[i].startswith(cadastre_id):
+            matched.update(self._index[self._ids[i]])
+            i += 1
+        return [self.rows[i] for i in sorted(matched) if cadastre_id in self.rows[i][self.field]]
+
+    @staticmethod
+    def path_for(storage_dir: str, register: str, region: str = "") -> str:
+        slug = re.sub(r"[^\w-]+", "_", region)
+        name = f"{register}__{slug}" if region else register
+        return os.path.join(storage_dir, f"{name}.json.gz")
+
+    def save(self, storage_dir: str) -> str:
+        os.makedirs(storage_dir, exist_ok=True)
+        path = self.path_for(storage_dir, self.register, self.region)
+        tmp_path = f"{path}.tmp.{os.getpid()}"
+        payload = {"register": self.register, "region": self.region, "taken_at": self.taken_at, "rows": self.rows}
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "RegisterSnapshot":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls(payload["register"], payload["rows"], payload["taken_at"], payload.get("region", ""))
+
+class NagRegisterSweeper:
+    """
+    Bulk mode for the NAG registers: one Search with an empty target, then Read
+    page by page with a large page size. Cost is O(register pages) instead of
+    O(buildings) Search/Read pairs.
+    """
+
+    def __init__(self, storage_dir: str = "storage/registers", page_size: Optional[int] = None):
+        self.storage_dir = storage_dir
+        self.page_size = page_size or settings.NAG_SWEEP_PAGE_SIZE
+
+    async def sweep(self, register: str, region: str = "") -> RegisterSnapshot:
+        log = logger.bind(register=register, region=region)
+        path = SofiaMunicipalForensics.REGISTERS[register]["path"]
+        base = f"{SofiaMunicipalForensics.BASE_URL}/{path}"
+        rows: List[Dict[str, Any]] = []
+        started = time.time()
+
+        # Each register gets its own cookie session: Search state lives server-side per session
+        with span(f"nag.sweep.{register}", region=region):
+            async with limited_client(headers=SofiaMunicipalForensics.HEADERS, timeout=60.0, follow_redirects=True) as client:
+                params = SofiaMunicipalForensics.search_params(register, region=region)
+                res = await client.get(f"{base}/Search", params=params)
+                res.raise_for_status()
+                page, total = 1, None
+                while total is None or len(rows) < total:
+                    res = await client.post(f"{base}/Read", data={'page': page, 'pageSize': self.page_size})
+                    res.raise_for_status()
+                    data = res.json()
+                    batch = data.get("Data") or []
+                    total = data.get("Total", 0) if total is None else total
+                    if not batch:
+                        break
+                    rows.extend(batch)
+                    page += 1
+
+        log.info("register_sweep_complete", rows=len(rows), total=total, pages=page - 1)
+        try:
+            snapshot = RegisterSnapshot(register, rows, started, region)
+        except RegisterSchemaError as e:
+            # Not stored, and the exception aborts the sweep before any cache priming
+            log.error("register_sweep_unmatched", error=str(e))
+            raise
+        snapshot.save(self.storage_dir)
+        return snapshot
+
+    async def sweep_all(self, region: str = "") -> Dict[str, RegisterSnapshot]:
+        registers = list(SofiaMunicipalForensics.REGISTERS)
+        snapshots = await asyncio.gather(*(self.sweep(r, region) for r in registers))
+        return dict(zip(registers, snapshots))
+
+    def load_all(self, region: str = "", max_age: Optional[float] = None) -> Optional[Dict[str, RegisterSnapshot]]:
+        """Returns the stored snapshots, or None if any is missing or older than `max_age` seconds."""
+        snapshots = {}
+        for register in SofiaMunicipalForensics.REGISTERS:
+            path = RegisterSnapshot.path_for(self.storage_dir, register, region)
+            if not os.path.exists(path):
+                return None
+            try:
+                snapshot = RegisterSnapshot.load(path)
+            except RegisterSchemaError as e:
+                logger.error("register_snapshot_invalid", register=register, error=str(e))
+                return None
+            if max_age is not None and time.time() - snapshot.taken_at > max_age:
+                return None
+            snapshots[register] = snapshot
+        return snapshots
@@ -1,4 +1,5 @@
 import datetime
+from src.core.patterns import ForensicPatterns
 from src.services.legal_engine import kb
 
 class AttorneyReportGenerator:
@@ -45,7 +46,7 @@ class AttorneyReportGenerator:
             citations.append(f"**Classification: Atelier detected.**")
             if text: citations.append(f"Citing Ordinance No. 7: {text[:250]}...")
         
-        if "площ" in scraped.get("raw_text", "").lower():
+        if "AREA_TERM" in ForensicPatterns.hits_for(scraped):
             ref = kb.search_context("Застроена площ")
             if ref: citations.append(f"**Area Standard:** {ref[0]}")
             
@@ -1,7 +1,12 @@
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import cast, func, insert
 from sqlalchemy.orm import Session
-from src.db.models import Listing, PriceHistory
-from src.core.utils import normalize_url
+from src.db.models import Building, Geography, Listing, PriceHistory, Report
+from src.schemas import ConditionalFetch
+from src.services.price_monitor import next_interval
+from src.core.utils import calculate_content_hash, normalize_url
 
 class RealEstateRepository:
     def __init__(self, db: Session):
@@ -17,17 +22,139 @@ class RealEstateRepository:
         self.db.refresh(new_l)
         return new_l
 
+    @staticmethod
+    def _apply_listing_data(listing: Listing, price: Decimal, area: float, desc: str, chash: str) -> Optional[dict]:
+        """Updates the listing in place; returns the PriceHistory row to write if the price moved."""
+        history = None
+        # SQLAlchemy handles Decimal comparison correctly here
+        if listing.price_bgn is not None and listing.price_bgn != price:
+            history = {"listing_id": listing.id, "price_bgn": listing.price_bgn}
+        listing.price_bgn = price
+        listing.advertised_area_sqm = area
+        listing.description_raw = desc
+        listing.content_hash = chash
+        return history
+
     # TYPE SAFETY FIX: price is now Decimal
     def update_listing_data(self, listing_id: int, price: Decimal, area: float, desc: str, chash: str):
         listing = self.db.query(Listing).get(listing_id)
         if listing:
-            # SQLAlchemy handles Decimal comparison correctly here
-            if listing.price_bgn is not None and listing.price_bgn != price:
-                history = PriceHistory(listing_id=listing_id, price_bgn=listing.price_bgn)
-                self.db.add(history)
-            
-            listing.price_bgn = price
-            listing.advertised_area_sqm = area
-            listing.description_raw = desc
-            listing.content_hash = chash
+            history = self._apply_listing_data(listing, price, area, desc, chash)
+            if history:
+                self.db.add(PriceHistory(**history))
             self.db.commit()
+
+    def seed_from_audit(self, listing: Listing, fetch: ConditionalFetch):
+        """
+        Records the audit's own scrape as the re-check baseline: validators,
+        listing data and content hash, and the first check scheduled at the
+        current cadence. Not committed: the caller commits it with the report.
+        """
+        now = datetime.now(timezone.utc)
+        listing.etag, listing.last_modified, listing.body_hash = fetch.etag, fetch.last_modified, fetch.body_hash
+        listing.checked_at = now
+        scraped = fetch.listing
+        if scraped is not None:
+            chash = calculate_content_hash(scraped.raw_text, scraped.price_predicted)
+            history = self._apply_listing_data(listing, scraped.price_predicted, scraped.area_sqm, scraped.raw_text, chash)
+            if history:
+                self.db.add(PriceHistory(**history))
+        listing.recheck_interval = next_interval(listing.recheck_interval, None)
+        listing.next_check_at = now + timedelta(seconds=listing.recheck_interval)
+
+    def apply_rechecks(self, fetches: Dict[int, Optional[ConditionalFetch]]) -> List[int]:
+        """
+        Applies a batch of conditional re-scrapes in one transaction: validators
+        stored, listing data updated only on a real change (content hash of
+        text + price), price history bulk-inserted, next check scheduled from
+        each listing's volatility. A listing without a content hash yet only
+        records the fetched data as its baseline. A None fetch (failed) just
+        keeps the cadence. Returns the ids of listings whose data changed.
+        """
+        now = datetime.now(timezone.utc)
+        listings = self.db.query(Listing).filter(Listing.id.in_(list(fetches))).all()
+        history, updated = [], []
+        for listing in listings:
+            fetch = fetches[listing.id]
+            changed: Optional[bool] = False
+            if fetch is not None:
+                listing.etag, listing.last_modified, listing.body_hash = fetch.etag, fetch.last_modified, fetch.body_hash
+                listing.checked_at = now
+                scraped = fetch.listing
+                if fetch.changed and scraped is not None:
+                    chash = calculate_content_hash(scraped.raw_text, scraped.price_predicted)
+                    if listing.content_hash is None:
+                        # Never audited (no seed_from_audit): record the baseline, nothing to compare
+                        # against, so the cadence is kept rather than tightened or relaxed
+                        changed = None
+                        row = self._apply_listing_data(listing, scraped.price_predicted, scraped.area_sqm,
+                                                       scraped.raw_text, chash)
+                        if row: history.append(row)
+                    elif chash != listing.content_hash:
+                        changed = True
+                        row = self._apply_listing_data(listing, scraped.price_predicted, scraped.area_sqm,
+                                                       scraped.raw_text, chash)
+                        if row: history.append(row)
+                        updated.append(listing.id)
+            else:
+                changed = None
+            listing.recheck_interval = next_interval(listing.recheck_interval, changed)
+            listing.next_check_at = now + timedelta(seconds=listing.recheck_interval)
+
+        if history:
+            self.db.execute(insert(PriceHistory), history)
+        self.db.commit()
+        return updated
+
+    def apply_recheck(self, listing_id: int, fetch: ConditionalFetch) -> bool:
+        """Single-listing apply_rechecks; True if listing data was updated."""
+        return bool(self.apply_rechecks({listing_id: fetch}))
+
+    # --- SPATIAL (PostGIS; Building.location is GiST-indexed) ---
+
+    @staticmethod
+    def _point(lat: float, lng: float):
+        return cast(func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326), Geography())
+
+    def buildings_within(self, lat: float, lng: float, radius_m: float,
+                         audited_only: bool = True, limit: int = 200) -> List[Tuple[Building, float]]:
+        """Buildings within `radius_m` metres of the point, nearest first, with their distance."""
+        point = self._point(lat, lng)
+        distance = func.ST_Distance(Building.location, point).label("distance_m")
+        query = self.db.query(Building, distance).filter(func.ST_DWithin(Building.location, point, radius_m))
+        if audited_only:
+            query = query.filter(Building.reports.any())
+        return query.order_by(distance).limit(limit).all()
+
+    def buildings_in_bbox(self, south: float, west: float, north: float, east: float,
+                          audited_only: bool = True, limit: int = 1000) -> List[Building]:
+        envelope = cast(func.ST_MakeEnvelope(west, south, east, north, 4326), Geography())
+        query = self.db.query(Building).filter(Building.location.op("&&")(envelope))
+        if audited_only:
+            query = query.filter(Building.reports.any())
+        return query.order_by(Building.id).limit(limit).all()
+
+    def _latest_reports(self):
+        """Subquery of the newest report id per building; re-audits supersede earlier reports."""
+        rank = func.row_number().over(partition_by=Report.building_id,
+                                      order_by=(Report.created_at.desc(), Report.id.desc()))
+        ranked = (self.db.query(Report.id.label("id"), rank.label("rank"))
+                  .filter(Report.building_id.isnot(None)).subquery())
+        return self.db.query(ranked.c.id).filter(ranked.c.rank == 1).subquery()
+
+    def expropriation_hits_within(self, lat: float, lng: float, radius_m: float,
+                                  limit: int = 200) -> List[Tuple[Report, Building, float]]:
+        """Buildings near the point whose latest report found them in the expropriation register."""
+        point = self._point(lat, lng)
+        distance = func.ST_Distance(Building.location, point).label("distance_m")
+        latest = self._latest_reports()
+        return (
+            self.db.query(Report, Building, distance)
+            .join(latest, Report.id == latest.c.id)
+            .join(Building, Report.building_id == Building.id)
+            .filter(func.ST_DWithin(Building.location, point, radius_m))
+            .filter(Report.discrepancy_details[("city_risk", "is_expropriated")].as_boolean().is_(True))
+            .order_by(distance)
+            .limit(limit)
+            .all()
+        )
@@ -1,10 +1,14 @@
 import httpx
 import re
 import asyncio
+import hashlib
 from decimal import Decimal
 from typing import List, Optional
-from src.schemas import ScrapedListing
+from src.schemas import ConditionalFetch, ScrapedListing
+from src.core.patterns import ForensicPatterns
 from src.core.logger import logger
+from src.core.rate_limiter import rate_limiter
+from src.core.tracing import span
 
 class ScraperService:
     def __init__(self, client: httpx.AsyncClient, simulation_mode=False):
@@ -16,29 +20,76 @@ class ScraperService:
             "Referer": "https://www.imot.bg/"
         }
 
-    async def scrape_url(self, url: str) -> ScrapedListing:
-        # 1. Конвертиране на Mobile URL към Desktop URL (ако е необходимо)
+    @staticmethod
+    def _desktop_url(url: str) -> str:
+        # Конвертиране на Mobile URL към Desktop URL (ако е необходимо)
         # Mobile: https://m.imot.bg/pcgi/imot.cgi?act=5&adv=1c176587956641453
         # Desktop: https://www.imot.bg/pcgi/imot.cgi?act=5&adv=1c176587956641453
-        target_url = url.replace("m.imot.bg", "www.imot.bg")
-        
+        return url.replace("m.imot.bg", "www.imot.bg")
+
+    async def _decode(self, resp: httpx.Response) -> str:
+        # Декодиране (Критично за imot.bg)
+        try:
+            content = resp.content.decode('windows-1251')
+        except UnicodeDecodeError:
+            content = resp.content.decode('utf-8', errors='ignore')
+
+        # Проверка за WAF / Captcha
+        if "captcha" in content.lower() or "security check" in content.lower():
+            # A WAF challenge is a throttle signal even with HTTP 200: back off this host
+            await rate_limiter.on_throttle(resp.url.host)
+            raise Exception("BLOCKED: Cloudflare Captcha detected")
+        return content
+
+    async def scrape_url(self, url: str) -> ScrapedListing:
+        target_url = self._desktop_url(url)
         log = logger.bind(url=target_url)
         
         try:
-            resp = await self.client.get(target_url, headers=self.headers, follow_redirects=True)
+            with span("scraper.fetch"):
+                resp = await self.client.get(target_url, headers=self.headers, follow_redirects=True)
+            content = await self._decode(resp)
+            return await asyncio.to_thread(self._parse_html, content, target_url)
             
-            # 2. Декодиране (Критично за imot.bg)
-            try:
-                content = resp.content.decode('windows-1251')
-            except UnicodeDecodeError:
-                content = resp.content.decode('utf-8', errors='ignore')
+        except Exception as e:
+            log.error("scrape_failed", error=str(e))
+            raise e
 
-            # 3. Проверка за WAF / Captcha
-            if "captcha" in content.lower() or "security check" in content.lower():
-                raise Exception("BLOCKED: Cloudflare Captcha detected")
+    async def fetch_if_changed(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                               body_hash: Optional[str] = None) -> ConditionalFetch:
+        """
+        Re-check of a known listing. Sends If-None-Match / If-Modified-Since from
+        the stored validators and only parses the page when the server returns a
+        new body whose hash differs from `body_hash`.
+        """
+        target_url = self._desktop_url(url)
+        log = logger.bind(url=target_url)
+        headers = dict(self.headers)
+        if etag: headers["If-None-Match"] = etag
+        if last_modified: headers["If-Modified-Since"] = last_modified
+
+        try:
+            with span("scraper.conditional_fetch"):
+                resp = await self.client.get(target_url, headers=headers, follow_redirects=True)
+
+            if resp.status_code == 304:
+                log.info("scrape_not_modified")
+                return ConditionalFetch(status="NOT_MODIFIED", etag=etag, last_modified=last_modified, body_hash=body_hash)
+            resp.raise_for_status()
+
+            # Validators may be absent on this response: keep the ones we had
+            new_etag = resp.headers.get("ETag") or etag
+            new_last_modified = resp.headers.get("Last-Modified") or last_modified
+            new_hash = hashlib.sha256(resp.content).hexdigest()
+            if new_hash == body_hash:
+                log.info("scrape_body_unchanged")
+                return ConditionalFetch(status="UNCHANGED", etag=new_etag, last_modified=new_last_modified, body_hash=new_hash)
+
+            content = await self._decode(resp)
+            listing = await asyncio.to_thread(self._parse_html, content, target_url)
+            return ConditionalFetch(status="CHANGED", etag=new_etag, last_modified=new_last_modified,
+                                    body_hash=new_hash, listing=listing)
 
-            return await asyncio.to_thread(self._parse_html, content, target_url)
-            
         except Exception as e:
             log.error("scrape_failed", error=str(e))
             raise e
@@ -68,24 +119,31 @@ class ScraperService:
         # 4. Снимки (HD)
         # Търсим src=".../photosimotbg/..."
         raw_imgs = re.findall(r'(?:src|data-src|data-src-gallery)=["\'](https?://[^"\']*/photosimotbg/[^"\']+)["\']', content)
-        images = list(set([i for i in raw_imgs if "nophoto" not in i]))
+        # Deduplicated in page order: a set would reorder per process (hash seed) and change stage fingerprints
+        images = list(dict.fromkeys(i for i in raw_imgs if "nophoto" not in i))
+
+        # 5. Text Forensics: every ForensicPatterns rule in one pass over the text we store,
+        # so the risk/legal engines reuse hits that match a rescan of raw_text
+        raw_text = content[:5000] # Пазим само началото за дебъг
+        hits = ForensicPatterns.scan(raw_text)
 
-        # 5. VAT Logic (Forensics)
-        is_vat_excluded = bool(re.search(r"(?i)(цената е без ддс|без ддс|vat excluded)", content))
+        # 6. VAT Logic (whole page, the price note may sit below the stored excerpt)
+        is_vat_excluded = bool(ForensicPatterns.PRICE_EXCLUDES_VAT.search(content))
         if is_vat_excluded:
             price_decimal = price_decimal * Decimal("1.20")
 
-        # 6. Direct Owner Logic
-        is_direct = bool(re.search(r"(?i)(частно лице|собственик|без комисион)", content))
+        # 7. Direct Owner Logic
+        is_direct = bool(ForensicPatterns.PRIVATE_SELLER.search(content))
 
         return ScrapedListing(
             source_url=url,
-            raw_text=content[:5000], # Пазим само началото за дебъг
+            raw_text=raw_text,
             price_predicted=price_decimal,
             area_sqm=area,
             neighborhood=neighborhood,
             image_urls=images,
             is_vat_excluded=is_vat_excluded,
             is_direct_owner=is_direct,
-            price_correction_note="VAT Adjusted" if is_vat_excluded else None
+            price_correction_note="VAT Adjusted" if is_vat_excluded else None,
+            pattern_hits=hits
         )
@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List
+import httpx
+from src.core.logger import logger
+
+ClientFactory = Callable[[], httpx.AsyncClient]
+
+class PooledSession:
+    """One cookie jar (httpx client) plus per-session state such as CSRF tokens."""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.state: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.uses = 0
+        self.broken = False
+
+    def invalidate(self):
+        """Drop this session on release (e.g. the server lost our search state)."""
+        self.broken = True
+
+class SessionPool:
+    """
+    N independent sessions for a stateful upstream (NAG Search->Read, KAIS
+    FastSearch->Read). A session is leased exclusively for a whole transaction,
+    so concurrent audits can never read each other's server-side results.
+    Sessions are created lazily and are bound to the event loop that made them.
+    """
+
+    def __init__(self, name: str, size: int, client_factory: ClientFactory):
+        self.name = name
+        self.size = size
+        self.client_factory = client_factory
+        self._idle: List[PooledSession] = []
+        self._slots = asyncio.Semaphore(size)
+        self._closed = False
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[PooledSession]:
+        await self._slots.acquire()
+        session = self._idle.pop() if self._idle else PooledSession(self.client_factory())
+        session.uses += 1
+        try:
+            yield session
+        except BaseException:
+            session.invalidate()
+            raise
+        finally:
+            if session.broken or self._closed:
+                await session.client.aclose()
+                logger.info("session_discarded", pool=self.name, uses=session.uses)
+            else:
+                self._idle.append(session)
+            self._slots.release()
+
+    def idle_sessions(self) -> List[PooledSession]:
+        return list(self._idle)
+
+    async def aclose(self):
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for session in idle:
+            await session.client.aclose()
+
+# Pools are per event loop: httpx clients and asyncio primitives cannot cross loops
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, SessionPool]]" = weakref.WeakKeyDictionary()
+_pools_lock = threading.Lock()
+
+def get_session_pool(name: str, size: int, client_factory: ClientFactory) -> SessionPool:
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        pools = _pools.setdefault(loop, {})
+        if name not in pools:
+            pools[name] = SessionPool(name, size, client_factory)
+        return pools[name]
+
+async def close_session_pools():
+    """Closes every pool created on the running loop."""
+    with _pools_lock:
+        pools = _pools.pop(asyncio.get_running_loop(), {})
+    for pool in pools.values():
+        await pool.aclose()
@@ -0,0 +1,38 @@
+from typing import Any, Callable, Dict
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from src.db.models import AuditStageResult
+from src.db.session import SessionLocal
+from src.core.logger import logger
+
+class AuditStageStore:
+    """
+    Per-listing record of each incremental audit stage (fingerprint, output
+    digest, output), so a re-audit only re-runs stages whose inputs changed.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+
+    def load(self, listing_id: int) -> Dict[str, Dict[str, Any]]:
+        with self.session_factory() as db:
+            rows = db.query(AuditStageResult).filter(AuditStageResult.listing_id == listing_id).all()
+            return {r.stage: {"fingerprint": r.fingerprint, "digest": r.digest, "output": r.output} for r in rows}
+
+    def save(self, listing_id: int, records: Dict[str, Dict[str, Any]]):
+        if not records: return
+        with self.session_factory() as db:
+            existing = {r.stage: r for r in
+                        db.query(AuditStageResult).filter(AuditStageResult.listing_id == listing_id)}
+            for stage, record in records.items():
+                row = existing.get(stage)
+                if row is None:
+                    db.add(AuditStageResult(listing_id=listing_id, stage=stage, **record))
+                elif row.fingerprint != record["fingerprint"] or row.digest != record["digest"]:
+                    row.fingerprint, row.digest, row.output = record["fingerprint"], record["digest"], record["output"]
+            try:
+                db.commit()
+            except IntegrityError:
+                # A concurrent audit of the same listing stored its stages first
+                db.rollback()
+                logger.warning("audit_stage_save_conflict", listing_id=listing_id)
@@ -1,31 +1,122 @@
 import os
+import uuid
+import hashlib
+import mimetypes
 import httpx
 import asyncio
-from typing import List
+from typing import List, Optional
+from src.core.config import settings
+from src.core.logger import logger
+from src.core.rate_limiter import limited_client
+from src.core.tracing import span
+
+CHUNK_SIZE = 64 * 1024
+
+class ImageTooLarge(Exception):
+    """The response exceeded ARCHIVE_MAX_IMAGE_BYTES (not a listing photo)."""
 
 class StorageService:
-    def __init__(self, upload_dir="storage/archive"):
+    """
+    Content-addressed image archive. Blobs live at blobs/<aa>/<sha256><ext>;
+    urls/<aa>/<sha256(url)> records which blob a URL resolved to, so a photo
+    reposted by several agencies is downloaded and stored once. Downloads are
+    streamed to disk, keeping memory flat regardless of gallery size.
+    """
+
+    def __init__(self, upload_dir="storage/archive", client: Optional[httpx.AsyncClient] = None,
+                 concurrency: Optional[int] = None):
         self.upload_dir = upload_dir
-        os.makedirs(upload_dir, exist_ok=True)
+        self.client = client
+        self.concurrency = concurrency or settings.ARCHIVE_CONCURRENCY
+        os.makedirs(os.path.join(upload_dir, "tmp"), exist_ok=True)
+
+    def blob_path(self, digest: str, ext: str = ".jpg") -> str:
+        return os.path.join(self.upload_dir, "blobs", digest[:2], f"{digest}{ext}")
+
+    def _index_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.upload_dir, "urls", key[:2], key)
+
+    def lookup(self, url: str) -> Optional[str]:
+        """Archived blob path for `url`, if it was downloaded before and the blob still exists."""
+        try:
+            with open(self._index_path(url), encoding="utf-8") as f:
+                digest, ext = f.read().split()
+        except (FileNotFoundError, ValueError):
+            return None
+        path = self.blob_path(digest, ext)
+        return path if os.path.exists(path) else None
 
-    async def _download_single(self, client: httpx.AsyncClient, url: str, filename: str) -> str:
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp.{uuid.uuid4().hex}"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _commit(self, tmp_path: str, url: str, digest: str, ext: str) -> str:
+        path = self.blob_path(digest, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(tmp_path)  # Same photo under another URL: keep the existing blob
+        else:
+            os.replace(tmp_path, path)
+        self._write_atomic(self._index_path(url), f"{digest} {ext}".encode("utf-8"))
+        return path
+
+    @staticmethod
+    def _extension(resp: httpx.Response) -> str:
+        content_type = resp.headers.get("content-type", "").split(";")[0].strip()
+        ext = mimetypes.guess_extension(content_type) if content_type.startswith("image/") else None
+        return {".jpe": ".jpg", ".jpeg": ".jpg"}.get(ext, ext) or ".jpg"
+
+    async def _download_single(self, client: httpx.AsyncClient, url: str) -> Optional[str]:
+        cached = await asyncio.to_thread(self.lookup, url)
+        if cached:
+            return cached
+
+        tmp_path = os.path.join(self.upload_dir, "tmp", uuid.uuid4().hex)
         try:
-            resp = await client.get(url, timeout=7.0)
-            if resp.status_code == 200:
-                path = os.path.join(self.upload_dir, filename)
-                with open(path, "wb") as f:
-                    f.write(resp.content)
-                return path
+            with span("storage.download"):
+                async with client.stream("GET", url, timeout=7.0) as resp:
+                    if resp.status_code != 200:
+                        return None
+                    hasher, size = hashlib.sha256(), 0
+                    f = await asyncio.to_thread(open, tmp_path, "wb")
+                    try:
+                        async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                            size += len(chunk)
+                            if size > settings.ARCHIVE_MAX_IMAGE_BYTES:
+                                raise ImageTooLarge(f"{size} bytes")
+                            hasher.update(chunk)
+                            await asyncio.to_thread(f.write, chunk)
+                    finally:
+                        await asyncio.to_thread(f.close)
+                    ext = self._extension(resp)
+            return await asyncio.to_thread(self._commit, tmp_path, url, hasher.hexdigest(), ext)
         except Exception as e:
-            print(f"Archive Fail: {url} -> {e}")
+            logger.warning("archive_download_failed", url=url, error=str(e))
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
         return None
 
     async def archive_images(self, listing_id: int, urls: List[str]) -> List[str]:
+        """Archives a gallery; returns the distinct blob paths in gallery order."""
         if not urls: return []
-        async with httpx.AsyncClient() as client:
-            tasks = []
-            for i, url in enumerate(urls):
-                filename = f"listing_{listing_id}_{i}.jpg"
-                tasks.append(self._download_single(client, url, filename))
-            results = await asyncio.gather(*tasks)
-            return [r for r in results if r is not None]
+        urls = list(dict.fromkeys(urls))
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(client, url):
+            async with slots:
+                return await self._download_single(client, url)
+
+        if self.client:
+            results = await asyncio.gather(*(bounded(self.client, url) for url in urls))
+        else:
+            async with limited_client() as client:
+                results = await asyncio.gather(*(bounded(client, url) for url in urls))
+
+        paths = list(dict.fromkeys(r for r in results if r is not None))
+        logger.info("images_archived", listing_id=listing_id, requested=len(urls), stored=len(paths))
+        return paths
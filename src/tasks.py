@@ -1,108 +1,331 @@
-from asgiref.sync import async_to_sync
 import asyncio
-import httpx
-from src.worker import celery_app
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from src.worker import celery_app, run_async
 from src.db.session import SessionLocal
 from src.db.models import Listing, Report, ReportStatus, Building
 from src.services.scraper_service import ScraperService
-from src.services.ai_engine import GeminiService
+from src.services.ai_engine import GeminiService, PROMPT_VERSION
+from src.services.ai_cache import AIAnalysisCache
 from src.services.storage_service import StorageService
+from src.services.image_index import image_index
+from src.services.image_prep import GalleryPreprocessor
 from src.services.geospatial_service import GeospatialService
 from src.services.cadastre_service import CadastreService
+from src.services.cadastre_cache import CadastreResolutionCache
 from src.services.forensics_service import SofiaMunicipalForensics
+from src.services.registry_cache import registry_cache
+from src.services.registry_sweep import NagRegisterSweeper
 from src.services.risk_engine import RiskEngine
+from src.services.stage_store import AuditStageStore
+from src.services.repository import RealEstateRepository
+from src.services.price_monitor import due_listing_ids, fetch_many
 from src.services.report_generator import AttorneyReportGenerator
+from src.services.legal_engine import kb
+from src.schemas import AIAnalysisResult, GeoVerification, CadastreData
 from src.core.config import settings
 from src.core.logger import logger
+from src.core.pipeline import Codec, Pipeline, Stage
+from src.core.tracing import span
+from src.core.rate_limiter import limited_client
 from src.core.utils import normalize_sofia_street
 
+EMPTY_MUNICIPAL_REPORT = {"expropriation": {}, "compliance_act16": {}}
+
 @celery_app.task(name="src.tasks.audit_listing")
 def audit_listing_task(listing_id: int):
-    return async_to_sync(run_audit_pipeline)(listing_id)
+    return run_async(run_audit_pipeline(listing_id))
+
+@celery_app.task(name="src.tasks.reaudit_listing")
+def reaudit_listing_task(listing_id: int):
+    """Periodic re-audit: only stages whose input fingerprint changed are recomputed."""
+    return run_async(run_audit_pipeline(listing_id, incremental=True))
+
+def _find_or_create_building(cad_data, geo_report, session_factory=SessionLocal):
+    # Own short-lived session: runs in a worker thread, off the audit's session
+    with session_factory() as db:
+        existing_building = db.query(Building).filter(Building.cadastre_id == cad_data.cadastre_id).first()
+        if existing_building:
+            return existing_building.id
+        new_building = Building(
+            cadastre_id=cad_data.cadastre_id,
+            address_full=cad_data.address_found or geo_report.best_address,
+            latitude=geo_report.lat,
+            longitude=geo_report.lng,
+            construction_year=0 # AI data would go here
+        )
+        try:
+            db.add(new_building)
+            db.commit()
+            return new_building.id
+        except IntegrityError:
+            # Same building created concurrently by another audit
+            db.rollback()
+            return db.query(Building.id).filter(Building.cadastre_id == cad_data.cadastre_id).scalar()
+
+def build_audit_pipeline(listing: Listing, db, http_client) -> Pipeline:
+    """
+    The audit as a stage graph. Stages run as soon as their inputs are ready:
+    the law indexes load while the registries are queried, and the Building
+    lookup overlaps the NAG audit. Slow external stages time out into the same
+    degraded results the services return when an upstream is down.
+
+    Stages with a codec are incremental: on a re-audit they reuse their stored
+    output while their inputs are unchanged. Scraping, the registries (NAG,
+    photo reuse) and scoring always run, since they are what changes over time.
+    """
+    listing_id = listing.id
+
+    # 1. SCRAPE (Returns ScrapedListing; the fetch's validators seed the re-checks)
+    async def fetch():
+        return await ScraperService(client=http_client).fetch_if_changed(listing.source_url)
+
+    async def scrape(fetch):
+        return fetch.listing
+
+    # 2. VISION (Returns AIAnalysisResult)
+    async def archive(scrape):
+        return await StorageService(client=http_client).archive_images(listing_id, scrape.image_urls)
+
+    async def photos(archive):
+        return await asyncio.to_thread(image_index.check_listing, listing_id, archive)
+
+    async def prep(archive):
+        return await asyncio.to_thread(GalleryPreprocessor().prepare, archive)
+
+    async def ai(scrape, prep):
+        ai_service = GeminiService(api_key=settings.GEMINI_API_KEY, cache=AIAnalysisCache())
+        return await ai_service.analyze_listing_multimodal(scrape.raw_text, prep)
 
-async def run_audit_pipeline(listing_id: int):
+    # 3. GEO TRIANGULATION (Returns GeoVerification)
+    async def geo(scrape, ai):
+        geo_service = GeospatialService(api_key=settings.GOOGLE_MAPS_API_KEY, client=http_client)
+        return await geo_service.verify_neighborhood(ai.address_prediction, ai.landmarks, scrape.neighborhood)
+
+    # 4. REGISTRY (Returns CadastreData)
+    async def cadastre(ai, geo):
+        best_address = normalize_sofia_street(geo.best_address or ai.address_prediction)
+        return await CadastreService(cache=CadastreResolutionCache()).get_official_details(best_address)
+
+    async def nag(cadastre):
+        if not cadastre.cadastre_id:
+            return dict(EMPTY_MUNICIPAL_REPORT)
+        return await SofiaMunicipalForensics().run_full_audit(cadastre.cadastre_id)
+
+    async def building(cadastre, geo):
+        if not cadastre.cadastre_id:
+            return None
+        return await asyncio.to_thread(_find_or_create_building, cadastre, geo)
+
+    async def laws():
+        await asyncio.to_thread(kb.warm)
+
+    # 5. SCORING (Bundle Pydantic objects converted to dicts)
+    async def score(scrape, ai, geo, cadastre, nag, photos):
+        forensic_data = {
+            "scraped": scrape.model_dump(),
+            "ai": ai.model_dump(),
+            "geo": geo.model_dump(),
+            "cadastre": cadastre.model_dump(),
+            "compliance": nag.get("compliance_act16", {}),
+            "city_risk": nag.get("expropriation", {}),
+            "images": photos
+        }
+        return forensic_data, RiskEngine().calculate_score_v2(forensic_data)
+
+    # 6. REPORTING
+    async def report(scrape, ai, score, laws):
+        forensic_data, score_res = score
+        return AttorneyReportGenerator().generate_legal_brief(
+            scrape.model_dump(), 
+            {**score_res, "forensics": forensic_data}, 
+            ai.model_dump()
+        )
+
+    return Pipeline("audit", [
+        Stage("fetch", fetch, timeout=60),
+        Stage("scrape", scrape, after=["fetch"]),
+        Stage("archive", archive, after=["scrape"], timeout=60, fallback=list, codec=Codec(),
+              uses={"scrape": lambda s: s.image_urls}),
+        Stage("photos", photos, after=["archive"], timeout=30, fallback=dict),
+        Stage("prep", prep, after=["archive"], timeout=60, fallback=list, codec=Codec(),
+              salt=f"{settings.GEMINI_IMAGE_MAX_EDGE}:{settings.GEMINI_MAX_IMAGES}"),
+        Stage("ai", ai, after=["scrape", "prep"], timeout=120,
+              fallback=lambda: AIAnalysisResult(address_prediction="Unknown", landmarks=[]),
+              codec=Codec.model(AIAnalysisResult, reusable=lambda r: r.address_prediction != "Unknown"),
+              salt=f"{settings.GEMINI_MODEL}:{PROMPT_VERSION}", uses={"scrape": lambda s: s.raw_text}),
+        Stage("geo", geo, after=["scrape", "ai"], timeout=20,
+              fallback=lambda: GeoVerification(match=True, detected_neighborhood="Not Found", confidence=0),
+              codec=Codec.model(GeoVerification, reusable=lambda r: r.confidence > 0),
+              uses={"scrape": lambda s: s.neighborhood, "ai": lambda a: (a.address_prediction, a.landmarks)}),
+        Stage("cadastre", cadastre, after=["ai", "geo"], timeout=60,
+              fallback=lambda: CadastreData(status="OFFLINE", official_area=0.0),
+              codec=Codec.model(CadastreData, reusable=lambda r: r.status == "LIVE"),
+              uses={"ai": lambda a: a.address_prediction, "geo": lambda g: g.best_address}),
+        Stage("nag", nag, after=["cadastre"], timeout=90, fallback=lambda: dict(EMPTY_MUNICIPAL_REPORT)),
+        Stage("building", building, after=["cadastre", "geo"], timeout=15, fallback=lambda: None),
+        Stage("laws", laws, timeout=30, fallback=lambda: None),
+        Stage("score", score, after=["scrape", "ai", "geo", "cadastre", "nag", "photos"]),
+        Stage("report", report, after=["scrape", "ai", "score", "laws"]),
+    ])
+
+async def run_audit_pipeline(listing_id: int, incremental: bool = False):
     log = logger.bind(listing_id=listing_id)
+    stage_store = AuditStageStore()
     
-    async with httpx.AsyncClient(timeout=30.0) as http_client:
+    async with limited_client(timeout=30.0) as http_client:
         with SessionLocal() as db:
             listing = db.query(Listing).get(listing_id)
             if not listing: return "Error: Listing not found"
 
-            # 1. SCRAPE (Returns ScrapedListing)
-            scraper = ScraperService(client=http_client)
-            scraped_data = await scraper.scrape_url(listing.source_url)
-            
-            # 2. VISION (Returns AIAnalysisResult)
-            storage = StorageService()
-            img_paths = await storage.archive_images(listing_id, scraped_data.image_urls)
-            ai_service = GeminiService(api_key=settings.GEMINI_API_KEY)
-            ai_data = await ai_service.analyze_listing_multimodal(scraped_data.raw_text, img_paths)
-            
-            # 3. GEO TRIANGULATION (Returns GeoVerification)
-            geo_service = GeospatialService(api_key=settings.GOOGLE_MAPS_API_KEY)
-            geo_report = await geo_service.verify_neighborhood(
-                ai_data.address_prediction, 
-                ai_data.landmarks, 
-                scraped_data.neighborhood
-            )
-            
-            # 4. REGISTRY (Returns CadastreData)
-            cadastre = CadastreService(client=http_client)
-            best_address = normalize_sofia_street(geo_report.best_address or ai_data.address_prediction)
-            cad_data = await cadastre.get_official_details(best_address)
-            
-            mun_report = {"expropriation": {}, "compliance_act16": {}}
-            building_id = None
-            
-            if cad_data.cadastre_id:
-                forensics = SofiaMunicipalForensics(client=http_client)
-                mun_report = await forensics.run_full_audit(cad_data.cadastre_id)
-                
-                existing_building = db.query(Building).filter(Building.cadastre_id == cad_data.cadastre_id).first()
-                if not existing_building:
-                    new_building = Building(
-                        cadastre_id=cad_data.cadastre_id,
-                        address_full=cad_data.address_found or geo_report.best_address,
-                        latitude=geo_report.lat,
-                        longitude=geo_report.lng,
-                        construction_year=0 # AI data would go here
-                    )
-                    db.add(new_building)
-                    db.flush()
-                    building_id = new_building.id
-                else:
-                    building_id = existing_building.id
-
-            # 5. SCORING (Bundle Pydantic objects converted to dicts)
-            forensic_data = {
-                "scraped": scraped_data.model_dump(),
-                "ai": ai_data.model_dump(),
-                "geo": geo_report.model_dump(),
-                "cadastre": cad_data.model_dump(),
-                "compliance": mun_report.get("compliance_act16", {}),
-                "city_risk": mun_report.get("expropriation", {})
-            }
-            
-            risk_engine = RiskEngine()
-            score_res = risk_engine.calculate_score_v2(forensic_data)
-            
-            # 6. REPORTING
-            report_gen = AttorneyReportGenerator()
-            report_text = report_gen.generate_legal_brief(
-                scraped_data.model_dump(), 
-                {**score_res, "forensics": forensic_data}, 
-                ai_data.model_dump()
-            )
+            previous = await asyncio.to_thread(stage_store.load, listing_id) if incremental else None
+            with span("audit", listing_id=listing_id) as trace:
+                run = await build_audit_pipeline(listing, db, http_client).run(previous)
+            forensic_data, score_res = run.results["score"]
+            # Fresh audits record their stages too, so the next re-audit can build on them
+            await asyncio.to_thread(stage_store.save, listing_id, run.records)
             
+            # The audit's scrape is the baseline, so the first re-check already compares against it
+            RealEstateRepository(db).seed_from_audit(listing, run.results["fetch"])
             new_report = Report(
                 listing_id=listing_id,
-                building_id=building_id,
+                building_id=run.results["building"],
                 risk_score=score_res["score"],
-                legal_brief=report_text,
+                rule_set_version=score_res["rule_set_version"],
+                legal_brief=run.results["report"],
                 discrepancy_details=forensic_data,
+                cost_to_generate=round(trace.cost, 4),
                 status=ReportStatus.VERIFIED if score_res["score"] < 40 else ReportStatus.MANUAL_REVIEW
             )
             db.add(new_report)
             db.commit()
+            log.info("audit_complete", elapsed=round(run.elapsed, 3), stages=run.timings, reused=run.reused,
+                     trace_id=trace.trace_id, bytes=trace.bytes, retries=trace.retries, cost=trace.cost)
+
+            # Let stale-while-revalidate refreshes finish before the task returns
+            await registry_cache.drain()
             
             return f"Audit Done: {score_res['score']}"
+
+@celery_app.task(name="src.tasks.schedule_rechecks")
+def schedule_rechecks_task():
+    """
+    Beat tick: hands listings whose re-check is due to the background queue in
+    batches. Their next check is pushed out first, so a slow batch is not
+    dispatched twice; the batch then sets the real, volatility-based time.
+    """
+    now = datetime.now(timezone.utc)
+    with SessionLocal() as db:
+        due = due_listing_ids(db, now=now)
+        if due:
+            lease = now + timedelta(seconds=settings.RECHECK_MIN_INTERVAL)
+            db.query(Listing).filter(Listing.id.in_(due)).update({Listing.next_check_at: lease}, synchronize_session=False)
+            db.commit()
+    for start in range(0, len(due), settings.RECHECK_BATCH_SIZE):
+        recheck_listings_task.delay(due[start:start + settings.RECHECK_BATCH_SIZE])
+    logger.info("rechecks_scheduled", listings=len(due))
+    return f"Rechecks Queued: {len(due)}"
+
+@celery_app.task(name="src.tasks.recheck_listings")
+def recheck_listings_task(listing_ids: List[int]):
+    return run_async(run_listing_rechecks(listing_ids))
+
+@celery_app.task(name="src.tasks.recheck_listing")
+def recheck_listing_task(listing_id: int):
+    return run_async(run_listing_rechecks([listing_id]))
+
+async def run_listing_rechecks(listing_ids: List[int]):
+    """
+    Price monitoring: conditional re-scrapes of known listings. A 304 or an
+    identical body stops there; only real changes update listings (price
+    history bulk-inserted) and queue an incremental re-audit.
+    """
+    with SessionLocal() as db:
+        listings = db.query(Listing).filter(Listing.id.in_(listing_ids)).all()
+        if not listings: return "Error: Listing not found"
+
+        async with limited_client(timeout=30.0) as http_client:
+            fetches = await fetch_many(listings, http_client)
+        updated = RealEstateRepository(db).apply_rechecks(fetches)
+
+    statuses = Counter(f.status if f else "FAILED" for f in fetches.values())
+    logger.info("listings_rechecked", listings=len(fetches), updated=len(updated), **statuses)
+    for listing_id in updated:
+        reaudit_listing_task.delay(listing_id)
+    return f"Rechecked: {len(fetches)} ({len(updated)} updated)"
+
+@celery_app.task(name="src.tasks.sweep_nag_registers")
+def sweep_nag_registers_task(region: str = ""):
+    return run_async(run_register_sweep(region))
+
+async def run_register_sweep(region: str = ""):
+    """
+    Nightly bulk re-check: pulls each NAG register page by page and answers every
+    known Building from the local snapshot instead of N x 6 Search/Read calls.
+    """
+    log = logger.bind(region=region)
+    # Raises (RegisterSchemaError, HTTP errors) before anything is primed: a snapshot that cannot
+    # match rows would write "not expropriated" for every building into registry_cache
+    snapshots = await NagRegisterSweeper().sweep_all(region)
+
+    with SessionLocal() as db:
+        cadastre_ids = [cid for (cid,) in db.query(Building.cadastre_id).filter(Building.cadastre_id.isnot(None))]
+
+    # A region slice says nothing about buildings outside it, so only full sweeps prime the cache
+    if region:
+        log.info("register_sweep_stored", buildings=len(cadastre_ids))
+        return f"Sweep Stored: {region}"
+
+    forensics = SofiaMunicipalForensics()
+    expropriated = 0
+    for cid in cadastre_ids:
+        result = forensics.audit_from_snapshots(cid, snapshots)
+        await registry_cache.put("expropriation", cid, result["expropriation"], snapshots["expropriation"].taken_at)
+        await registry_cache.put("act16", cid, result["compliance_act16"], snapshots["act16"].taken_at)
+        await registry_cache.put("permits", cid, result["building_permits"], snapshots["permits"].taken_at)
+        expropriated += result["expropriation"]["is_expropriated"]
+
+    log.info("register_sweep_applied", buildings=len(cadastre_ids), expropriated=expropriated)
+    return f"Sweep Done: {len(cadastre_ids)} buildings"
+
+@celery_app.task(name="src.tasks.rescore_reports")
+def rescore_reports_task(batch_size: int = 5000):
+    """
+    Re-applies the current rule set to every Report scored under another
+    version, via the vectorized batch scorer. Only risk_score and
+    rule_set_version change: statuses may carry manual review.
+    """
+    engine = RiskEngine()
+    changed = total = 0
+    with SessionLocal() as db:
+        last_id = 0
+        while True:
+            rows = (db.query(Report.id, Report.risk_score, Report.discrepancy_details)
+                    .filter(Report.id > last_id, Report.discrepancy_details.isnot(None))
+                    .filter(or_(Report.rule_set_version.is_(None), Report.rule_set_version != engine.version))
+                    .order_by(Report.id).limit(batch_size).all())
+            if not rows: break
+            last_id = rows[-1].id
+            scores, _ = engine.score_batch(engine.to_columns([r.discrepancy_details for r in rows]))
+            db.execute(update(Report), [
+                {"id": r.id, "risk_score": int(s), "rule_set_version": engine.version} for r, s in zip(rows, scores)
+            ])
+            db.commit()
+            changed += sum(r.risk_score != s for r, s in zip(rows, scores))
+            total += len(rows)
+
+    logger.info("reports_rescored", version=engine.version, reports=total, changed=changed)
+    return f"Rescored: {changed}/{total}"
+
+@celery_app.task(name="src.tasks.reaudit_all_listings")
+def reaudit_all_listings_task():
+    """Fans out an incremental re-audit for every listing that already has a report."""
+    with SessionLocal() as db:
+        listing_ids = [lid for (lid,) in db.query(Report.listing_id).distinct()]
+    for listing_id in listing_ids:
+        reaudit_listing_task.delay(listing_id)
+    logger.info("reaudit_enqueued", listings=len(listing_ids))
+    return f"Re-audits Queued: {len(listing_ids)}"
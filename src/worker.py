@@ -1,6 +1,11 @@
 import os
+import asyncio
+import threading
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import worker_init
 from src.core.config import settings
+from src.core.metrics import metrics
 
 celery_app = Celery(
     "glashaus_worker",
@@ -14,7 +19,40 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="Europe/Sofia",
     enable_utc=True,
+    # User-facing audits get their own queue (and workers): background backlog never delays them
+    task_default_queue="background",
+    task_routes={"src.tasks.audit_listing": {"queue": "interactive"}},
+    # Long tasks: don't let one worker reserve a queue's backlog
+    worker_prefetch_multiplier=1,
+    beat_schedule={
+        "schedule-rechecks": {"task": "src.tasks.schedule_rechecks", "schedule": crontab(minute="*/5")},
+        "sweep-nag-registers": {"task": "src.tasks.sweep_nag_registers", "schedule": crontab(hour=2, minute=0)},
+        "reaudit-all-listings": {"task": "src.tasks.reaudit_all_listings", "schedule": crontab(hour=3, minute=30)},
+    },
 )
 
 # Auto-discover tasks in src/tasks.py
 celery_app.autodiscover_tasks(['src.tasks'])
+
+@worker_init.connect
+def _load_neighborhoods(**kwargs):
+    # Loaded once before the pool forks; a missing polygon file is reported at startup, not mid-audit
+    from src.services.neighborhood_index import get_neighborhood_index
+    get_neighborhood_index()
+
+_worker_loops = threading.local()
+
+def run_async(coro):
+    """
+    Runs a coroutine on this worker thread's long-lived event loop. Unlike a fresh
+    loop per task, pooled registry sessions, warmed tokens and in-flight caches
+    survive from one task to the next.
+    """
+    loop = getattr(_worker_loops, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _worker_loops.loop = loop
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        metrics.flush()
@@ -0,0 +1,16 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.db.models import Listing, PriceHistory
+
+@pytest.fixture
+def listing_db():
+    """In-memory session with the listing tables (the full schema needs PostGIS)."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Listing.__table__.create(engine)
+    PriceHistory.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+    engine.dispose()
@@ -0,0 +1,93 @@
+import asyncio
+import json
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.db.models import AIAnalysis
+from src.schemas import AIAnalysisResult
+from src.services.ai_cache import AIAnalysisCache
+from src.services.ai_engine import GeminiService
+
+def _cache():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    AIAnalysis.__table__.create(engine)
+    return AIAnalysisCache(sessionmaker(bind=engine))
+
+def test_unchanged_listing_reuses_memoized_analysis(tmp_path):
+    photos = []
+    for name, content in [("a.jpg", b"photo-a"), ("b.jpg", b"photo-b")]:
+        (tmp_path / name).write_bytes(content)
+        photos.append(str(tmp_path / name))
+
+    service = GeminiService(api_key="test", cache=_cache())
+    calls = []
+
+    async def fake_analyze(text, paths):
+        calls.append(paths)
+        return AIAnalysisResult(address_prediction="ул. Шипка 6", confidence_score=80) if len(calls) != 2 else None
+
+    service._analyze = fake_analyze
+
+    async def run():
+        first = await service.analyze_listing_multimodal("Тристаен  апартамент", photos)
+        # Relisted: same text modulo whitespace/case, photos in another order
+        again = await service.analyze_listing_multimodal("тристаен апартамент", list(reversed(photos)))
+        # New photo set: miss, and a failed analysis is not memoized
+        failed = await service.analyze_listing_multimodal("тристаен апартамент", photos[:1])
+        retry = await service.analyze_listing_multimodal("тристаен апартамент", photos[:1])
+        return first, again, failed, retry
+
+    first, again, failed, retry = asyncio.run(run())
+    assert again == first and again.address_prediction == "ул. Шипка 6"
+    assert failed.address_prediction == "Unknown" and retry.address_prediction == "ул. Шипка 6"
+    assert len(calls) == 3  # first, failed, retry
+
+class StubBackend:
+    """Answers multi-listing prompts locally; listing 13 always comes back as garbage."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def generate(self, parts):
+        prompt = parts[0]
+        ids = [int(line.split()[-1]) for line in prompt.splitlines() if line.startswith("### LISTING")]
+        self.requests.append(ids)
+        if 13 in ids and len(ids) > 1 and len(self.requests) == 1:
+            return type("Response", (), {"text": "not json"})()
+        items = {str(i): {"address_prediction": f"addr {i}"} for i in ids if i != 13}
+        if 13 in ids:
+            items["13"] = {"landmarks": "wrong"}
+        return type("Response", (), {"text": "```json\n" + json.dumps(items) + "\n```"})()
+
+def test_batch_mode_fans_out_and_isolates_failures():
+    backend = StubBackend()
+    service = GeminiService(api_key="test", backend=backend)
+    texts = {i: f"listing text {i}" for i in range(10, 16)}
+
+    results = asyncio.run(service.analyze_batch(texts, batch_size=6))
+
+    assert sorted(results) == [10, 11, 12, 14, 15]
+    assert results[14].address_prediction == "addr 14"
+    # One failed 6-item request, then bisection down to the single bad listing
+    assert backend.requests[0] == [10, 11, 12, 13, 14, 15]
+    assert [13] in backend.requests and len(backend.requests) <= 6
+
+def test_batch_and_single_analyses_do_not_share_cache_entries():
+    service = GeminiService(api_key="test", cache=_cache(), backend=StubBackend())
+    calls = []
+
+    async def fake_analyze(text, paths):
+        calls.append(text)
+        return AIAnalysisResult(address_prediction="single")
+
+    service._analyze = fake_analyze
+
+    async def run():
+        batch = await service.analyze_batch({10: "listing text 10"})
+        single = await service.analyze_listing_multimodal("listing text 10", [])
+        return batch, single
+
+    batch, single = asyncio.run(run())
+    # Different prompt and response shape: the batch answer is not reused for the single prompt
+    assert batch[10].address_prediction == "addr 10" and single.address_prediction == "single"
+    assert calls == ["listing text 10"]
@@ -0,0 +1,84 @@
+import asyncio
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.db.models import CadastreResolution
+from src.services.cadastre_cache import CadastreResolutionCache
+from src.services.cadastre_service import CadastreService
+from src.services.session_pool import SessionPool
+
+MAP_HTML = '<form><input name="__RequestVerificationToken" value="tok-{n}"/></form>'
+
+class FakeKais:
+    """Minimal KAIS: tokens expire when `expire()` is called."""
+
+    def __init__(self):
+        self.map_hits = 0
+        self.searches = 0
+        self.valid_token = None
+
+    def expire(self):
+        self.valid_token = None
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        if path == "/bg/Map":
+            self.map_hits += 1
+            self.valid_token = f"tok-{self.map_hits}"
+            return httpx.Response(200, text=MAP_HTML.format(n=self.map_hits))
+        if path == "/bg/Map/FastSearch":
+            self.searches += 1
+            return httpx.Response(200, json={})
+        if path == "/bg/Map/ReadFoundObjects":
+            if request.headers.get("X-CSRF-TOKEN") != self.valid_token:
+                return httpx.Response(400, text="<html>Bad Request</html>")
+            return httpx.Response(200, json={"Data": [{"Number": "68134.4083.295.1.5", "Address": "ул. Тест 1"}]})
+        if path == "/bg/Map/GetObjectInfo":
+            return httpx.Response(200, text="Самостоятелен обект, площ 72.5 кв.м")
+        return httpx.Response(404)
+
+def _service(fake):
+    pool = SessionPool("kais", size=1, client_factory=lambda: httpx.AsyncClient(transport=httpx.MockTransport(fake)))
+    return CadastreService(pool=pool)
+
+def test_token_is_reused_across_lookups():
+    fake = FakeKais()
+    service = _service(fake)
+
+    async def run():
+        return [await service.get_official_details("Тест 1") for _ in range(3)]
+
+    results = asyncio.run(run())
+    assert [r.status for r in results] == ["LIVE"] * 3
+    assert results[0].official_area == 72.5
+    assert fake.map_hits == 1
+
+def test_expired_token_is_refreshed_after_failed_read():
+    fake = FakeKais()
+    service = _service(fake)
+
+    async def run():
+        await service.get_official_details("Тест 1")
+        fake.expire()
+        return await service.get_official_details("Тест 1")
+
+    result = asyncio.run(run())
+    assert result.status == "LIVE"
+    assert fake.map_hits == 2
+
+def test_resolutions_are_cached_by_normalized_address():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    CadastreResolution.__table__.create(engine)
+    fake = FakeKais()
+    service = _service(fake)
+    service.cache = CadastreResolutionCache(sessionmaker(bind=engine))
+
+    async def run():
+        first = await service.get_official_details("ул. Тест 1, бл.2")
+        second = await service.get_official_details("тест 1 бл 2")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second and first.status == "LIVE"
+    assert fake.searches == 1
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import httpx
+import pytest
+from src.services.ai_engine import GeminiService
+from src.services.gemini_client import GeminiAPIError, GeminiRestBackend
+
+class FakeGemini:
+    """Local stand-in for the Gemini REST API; the first `quota_errors` calls get a 429."""
+
+    def __init__(self, quota_errors=0, latency=0.0):
+        self.quota_errors = quota_errors
+        self.latency = latency
+        self.files = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.quota_errors:
+                self.quota_errors -= 1
+                return httpx.Response(429, json={"error": {"status": "RESOURCE_EXHAUSTED"}})
+            assert request.url.params["key"] == "test-key"
+            path = request.url.path
+            if path == "/upload/v1beta/files":
+                name = f"files/f{len(self.files)}"
+                self.files[name] = request.content
+                return httpx.Response(200, json={"file": {"name": name, "uri": f"https://fake/{name}", "mimeType": "image/jpeg"}})
+            if request.method == "DELETE":
+                self.files.pop(path.removeprefix("/v1beta/"))
+                return httpx.Response(200, json={})
+            if path.endswith(":generateContent"):
+                parts = json.loads(request.content)["contents"][0]["parts"]
+                answer = {"address_prediction": "ул. Шипка 6", "confidence_score": len(parts) - 1}
+                return httpx.Response(200, json={
+                    "candidates": [{"content": {"parts": [{"text": "```json\n" + json.dumps(answer) + "\n```"}]}}],
+                    "usageMetadata": {"promptTokenCount": 1000, "candidatesTokenCount": 100},
+                })
+            return httpx.Response(404)
+        finally:
+            self.in_flight -= 1
+
+def _backend(fake, **kwargs):
+    factory = lambda: httpx.AsyncClient(base_url="https://fake.googleapis.com", transport=httpx.MockTransport(fake))
+    return GeminiRestBackend("test-key", "gemini-test", client_factory=factory, backoff=0.01, **kwargs)
+
+def test_multimodal_analysis_against_fake_server(tmp_path):
+    photo = tmp_path / "a.jpg"
+    photo.write_bytes(b"jpeg")
+    fake = FakeGemini(quota_errors=2)
+    service = GeminiService(api_key="test-key", backend=_backend(fake))
+
+    result = asyncio.run(service.analyze_listing_multimodal("Тристаен", [str(photo)]))
+
+    assert result.address_prediction == "ул. Шипка 6"
+    assert result.confidence_score == 1  # prompt + one uploaded photo
+    assert fake.files == {}  # uploaded photo was deleted again
+
+def test_concurrency_is_bounded_and_retries_give_up():
+    fake = FakeGemini(latency=0.02)
+    backend = _backend(fake, max_concurrency=3)
+
+    async def run():
+        await asyncio.gather(*(backend.generate([f"listing {i}"]) for i in range(12)))
+
+    asyncio.run(run())
+    assert fake.max_in_flight == 3
+
+    with pytest.raises(GeminiAPIError):
+        asyncio.run(_backend(FakeGemini(quota_errors=10), max_retries=2).generate(["x"]))
+
+def test_retry_after_is_honoured_within_the_backoff_cap():
+    backend = GeminiRestBackend("test-key", "gemini-test", max_retries=3, backoff=0.5)
+    cap = 0.5 * 2 ** 3
+    assert backend._delay(0, httpx.Response(429, headers={"Retry-After": "2"})) == 2.0
+    assert backend._delay(0, httpx.Response(429, headers={"Retry-After": "3600"})) == cap
+    assert backend._delay(0, httpx.Response(429, headers={"Retry-After": "-1"})) == 0.0
+    assert backend._delay(0, httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert 0 <= backend._delay(1, httpx.Response(503)) <= 0.5 * 2
@@ -0,0 +1,40 @@
+import asyncio
+import httpx
+from src.services.geocode_cache import GeocodeCache
+from src.services.geospatial_service import GeospatialService
+from src.services.registry_cache import MemoryCacheBackend
+
+GEOCODE_OK = {
+    "status": "OK",
+    "results": [{
+        "formatted_address": "ul. Shipka 6, Sofia",
+        "geometry": {"location": {"lat": 42.69, "lng": 23.34}},
+        "address_components": [{"long_name": "Oborishte", "types": ["sublocality", "political"]}],
+    }],
+}
+
+def test_identical_clues_are_geocoded_once():
+    calls = []
+
+    def maps(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.params["address"])
+        if "nowhere" in request.url.params["address"]:
+            return httpx.Response(200, json={"status": "OVER_QUERY_LIMIT", "results": []})
+        return httpx.Response(200, json=GEOCODE_OK)
+
+    cache = GeocodeCache(MemoryCacheBackend())
+    client = httpx.AsyncClient(transport=httpx.MockTransport(maps))
+    service = GeospatialService(api_key="key", client=client, cache=cache)
+
+    async def run():
+        first = await service.verify_neighborhood("ул. Шипка 6", ["Парк", "Църква"], "Оборище")
+        second = await service.verify_neighborhood("ул.  Шипка 6", ["църква", "Парк"], "Лозенец")
+        await service.verify_neighborhood("nowhere", [], "Лозенец")
+        await service.verify_neighborhood("nowhere", [], "Лозенец")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.best_address == second.best_address == "ul. Shipka 6, Sofia"
+    # Reordered clues hit the cache; the quota error is not cached, so it is asked twice
+    assert len(calls) == 3
+    assert cache.stats == {"hit": 1, "miss": 3}
@@ -0,0 +1,48 @@
+import numpy as np
+from PIL import Image
+from src.services.image_index import PerceptualIndex, dhash, hamming
+from src.services.risk_engine import RiskEngine
+
+def _photo(path, seed, size=(320, 240), quality=90):
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 255, (24, 32, 3), dtype=np.uint8)
+    Image.fromarray(pixels).resize(size, Image.Resampling.BILINEAR).save(path, quality=quality)
+    return str(path)
+
+def test_reposted_photo_is_matched_across_listings(tmp_path):
+    index = PerceptualIndex(storage_dir=str(tmp_path))
+    original = _photo(tmp_path / "a.jpg", seed=1)
+    unrelated = _photo(tmp_path / "b.jpg", seed=2)
+    # Same photo, re-encoded smaller by another agency
+    repost = _photo(tmp_path / "c.jpg", seed=1, size=(160, 120), quality=60)
+
+    assert index.check_listing(1, [original, unrelated]) == {"duplicate_listings": [], "stock_photos": 0}
+    result = index.check_listing(2, [repost])
+    assert result["duplicate_listings"] == [{"listing_id": 1, "photos": 1}]
+
+    # Re-auditing listing 1 must not report itself
+    assert index.check_listing(1, [original])["duplicate_listings"] == [{"listing_id": 2, "photos": 1}]
+
+def test_reaudit_indexes_newly_added_photos(tmp_path):
+    index = PerceptualIndex(storage_dir=str(tmp_path))
+    first = _photo(tmp_path / "a.jpg", seed=1)
+    added = _photo(tmp_path / "b.jpg", seed=2)
+
+    index.check_listing(1, [first])
+    # Re-audit after the owner uploaded another photo: only the new one is appended
+    index.check_listing(1, [first, added])
+    index.check_listing(1, [first, added])
+    assert sorted(index._records["hash"].tolist()) == sorted([dhash(first), dhash(added)])
+
+    assert index.check_listing(2, [added])["duplicate_listings"] == [{"listing_id": 1, "photos": 1}]
+
+def test_hamming_matches_python_popcount():
+    hashes = np.array([0, 2**64 - 1, 0x0F0F, 12345678901234567], dtype=np.uint64)
+    query = 0xFFFF
+    assert hamming(hashes, query).tolist() == [bin(int(h) ^ query).count("1") for h in hashes]
+
+def test_photo_reuse_raises_risk_flag():
+    data = {"images": {"duplicate_listings": [{"listing_id": 7, "photos": 3}], "stock_photos": 0}}
+    result = RiskEngine().calculate_score_v2(data)
+    assert result["score"] == 20
+    assert any("Photos reused" in flag for flag in result["flags"])
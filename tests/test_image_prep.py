@@ -0,0 +1,33 @@
+import numpy as np
+from PIL import Image
+from src.services.image_prep import GalleryPreprocessor
+
+def _photo(path, seed, size=(2000, 1500), flat=False):
+    if flat:
+        img = Image.new("RGB", size, (200, 200, 200))
+    else:
+        pixels = np.random.default_rng(seed).integers(0, 255, (30, 40, 3), dtype=np.uint8)
+        img = Image.fromarray(pixels).resize(size, Image.Resampling.BILINEAR)
+    exif = Image.Exif()
+    exif[0x010F] = "CameraMaker"
+    img.save(path, quality=95, exif=exif)
+    return str(path)
+
+def test_gallery_is_resized_stripped_deduplicated_and_capped(tmp_path):
+    gallery = [
+        _photo(tmp_path / "wall.jpg", 0, flat=True),
+        _photo(tmp_path / "room.jpg", 1),
+        _photo(tmp_path / "room_again.jpg", 1, size=(1800, 1350)),
+        _photo(tmp_path / "kitchen.jpg", 2),
+    ]
+    prep = GalleryPreprocessor(output_dir=str(tmp_path / "out"), max_edge=512, max_images=2)
+
+    prepared = prep.prepare(gallery)
+
+    # One shot of the duplicated room survives, the blank wall is dropped; gallery order is kept
+    names = [p.split("/")[-1].split("_512")[0] for p in prepared]
+    assert names[0] in ("room", "room_again") and names[1] == "kitchen"
+    for path in prepared:
+        with Image.open(path) as img:
+            assert max(img.size) == 512
+            assert not img.getexif()
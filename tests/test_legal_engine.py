@@ -0,0 +1,100 @@
+import os
+from src.services.legal_engine import LegalKnowledgeBase
+from src.services.law_index import LawIndex, MappedLawIndex, build_law_index, write_atomic
+
+LAW_TEXT = (
+    "SOURCE: https://lex.bg/mobile/ldoc/2135476546\n"
+    "------------------------------\n\n"
+    "Чл. 2. Общи положения за жилищата.\n\n"
+    "Чл. 2а. Застроена площ е площта, ограничена от външните очертания на сградата.\n\n"
+    "Чл. 110. Ателие е самостоятелен обект за творческа дейност.\n"
+)
+
+def _make_kb(tmp_path, text=LAW_TEXT):
+    (tmp_path / "naredba_7.txt").write_text(text, encoding="utf-8")
+    return LegalKnowledgeBase(laws_path=str(tmp_path))
+
+def test_get_article_uses_article_index(tmp_path):
+    kb = _make_kb(tmp_path)
+    assert kb.get_article("naredba_7", 110) == "Чл. 110. Ателие е самостоятелен обект за творческа дейност."
+    assert kb.get_article("naredba_7", 2) == "Чл. 2. Общи положения за жилищата."
+    assert kb.get_article("naredba_7", 999) is None
+    assert kb.get_article("missing_law", 1) is None
+
+def test_search_context_matches_phrases(tmp_path):
+    kb = _make_kb(tmp_path)
+    refs = kb.search_context("Застроена площ")
+    assert refs == ["Застроена площ е площта, ограничена от външните очертания на сградата (Ref: naredba_7.txt)"]
+    assert kb.search_context("площ ограничена") == []
+
+def test_index_is_rebuilt_when_file_changes(tmp_path):
+    kb = _make_kb(tmp_path)
+    assert kb.get_article("naredba_7", 111) is None
+
+    path = tmp_path / "naredba_7.txt"
+    path.write_text(LAW_TEXT + "\nЧл. 111. Нов текст.\n", encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 5))
+
+    assert kb.get_article("naredba_7", 111) == "Чл. 111. Нов текст."
+
+def test_prebuilt_index_is_memory_mapped(tmp_path):
+    kb = _make_kb(tmp_path)
+    build_law_index(str(tmp_path / "naredba_7.txt"))
+
+    assert kb.get_article("naredba_7", 110) == "Чл. 110. Ателие е самостоятелен обект за творческа дейност."
+    assert isinstance(kb._indexes["naredba_7.txt"], MappedLawIndex)
+    assert kb.search_context("застроена") == kb.search_context("Застроена площ")
+
+def test_stale_prebuilt_index_is_ignored(tmp_path):
+    kb = _make_kb(tmp_path)
+    build_law_index(str(tmp_path / "naredba_7.txt"))
+    (tmp_path / "naredba_7.txt").write_text(LAW_TEXT + "\nЧл. 111. Нов текст.\n", encoding="utf-8")
+
+    assert kb.get_article("naredba_7", 111) == "Чл. 111. Нов текст."
+    assert not isinstance(kb._indexes["naredba_7.txt"], MappedLawIndex)
+
+def test_swapped_out_mapping_stays_readable(tmp_path):
+    kb = _make_kb(tmp_path)
+    path = tmp_path / "naredba_7.txt"
+    build_law_index(str(path))
+    assert kb.get_article("naredba_7", 2)
+    old = kb._indexes["naredba_7.txt"]
+    # Mid-search reader holding the old mapping
+    sids = old.candidates(["застроена"])
+
+    write_atomic(str(path), (LAW_TEXT + "\nЧл. 111. Нов текст.\n").encode("utf-8"))
+    build_law_index(str(path))
+    assert kb.get_article("naredba_7", 111) == "Чл. 111. Нов текст."
+    assert isinstance(kb._indexes["naredba_7.txt"], MappedLawIndex) and kb._indexes["naredba_7.txt"] is not old
+
+    # The swap does not pull the pages from under the reader
+    assert old.sentence(sids[0]).strip().startswith("Застроена площ")
+
+def test_search_context_matches_inside_words(tmp_path):
+    kb = _make_kb(tmp_path)
+    expected = ["Застроена площ е площта, ограничена от външните очертания на сградата (Ref: naredba_7.txt)"]
+    # Mid-word and inflected fragments, as the plain substring search matched them
+    queries = ["строена", "строена площ", "площ е пло", "ъншните очертани"]
+    parsed = [kb.search_context(q) for q in queries]
+    assert parsed == [expected] * len(queries)
+
+    build_law_index(str(tmp_path / "naredba_7.txt"))
+    mapped = LegalKnowledgeBase(laws_path=str(tmp_path))
+    assert [mapped.search_context(q) for q in queries] == parsed
+    assert isinstance(mapped._indexes["naredba_7.txt"], MappedLawIndex)
+
+def test_suffix_table_lookups_match_a_term_scan(tmp_path):
+    kb = _make_kb(tmp_path)
+    build_law_index(str(tmp_path / "naredba_7.txt"))
+    parsed = LawIndex("naredba_7.txt", LAW_TEXT, (0, 0))
+    mapped = MappedLawIndex.open("naredba_7.txt", str(tmp_path / "naredba_7.txt"))
+    for token in ["а", "ощ", "троен", "площта", "дейност", "ата", "xyz", "2а"]:
+        for mode, test in (("infix", str.__contains__), ("suffix", str.endswith)):
+            expected = {sid for term in parsed.terms if test(term, token) for sid in parsed.postings[term]}
+            assert parsed._matching(token, mode) == mapped._matching(token, mode) == expected, (token, mode)
+    mapped.close()
+
+    # No word characters: nothing to look up, every sentence is scanned like the plain search did
+    assert kb.search_context(", ") == kb.search_context("площта, ")
+    assert kb.search_context(", ") == ["Застроена площ е площта, ограничена от външните очертания на сградата (Ref: naredba_7.txt)"]
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from src.core.config import settings
+from src.services import neighborhood_index
+from src.services.neighborhood_index import NeighborhoodIndex
+
+def _square(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+FEATURES = [
+    # A район with a park-shaped hole, and a квартал nested inside it
+    {"properties": {"name": "Младост", "name:en": "Mladost", "admin_level": "9"},
+     "geometry": {"type": "Polygon", "coordinates": [_square(23.30, 42.60, 23.40, 42.70), _square(23.36, 42.66, 23.38, 42.68)]}},
+    {"properties": {"name": "ж.к. Младост 1"},
+     "geometry": {"type": "Polygon", "coordinates": [_square(23.31, 42.61, 23.33, 42.63)]}},
+    {"properties": {"name": "Лозенец"},
+     "geometry": {"type": "MultiPolygon", "coordinates": [[_square(23.40, 42.60, 23.45, 42.65)]]}},
+]
+
+def test_most_specific_area_and_holes():
+    index = NeighborhoodIndex(FEATURES)
+    assert index.locate(42.62, 23.32) == "ж.к. Младост 1"
+    assert index.locate_all(42.62, 23.32) == ["ж.к. Младост 1", "Младост"]
+    assert index.locate(42.65, 23.35) == "Младост"
+    assert index.locate(42.67, 23.37) is None  # inside the hole
+    assert index.locate(42.62, 23.42) == "Лозенец"
+
+def test_claimed_neighborhood_matching():
+    index = NeighborhoodIndex(FEATURES)
+    assert index.matches("кв. Младост-1", 42.62, 23.32)
+    assert index.matches("Лозенец", 42.62, 23.32) is False
+    assert index.matches("Лозенец", 10.0, 10.0) is None
+    # A wrong квартал inside the right район does not pass, nor does the bare район name
+    assert index.matches("Младост 2", 42.62, 23.32) is False
+    assert index.matches("Mladost", 42.62, 23.32) is False
+    # The район is a separate, weaker signal
+    assert index.rayon_matches("Mladost", 42.62, 23.32)
+    assert index.rayon_matches("Младост 2", 42.62, 23.32) is False
+    assert index.matches("Младост", 42.65, 23.35) is None  # no квартал polygon there
+
+def test_bulk_mode_agrees_with_single_lookups():
+    index = NeighborhoodIndex(FEATURES)
+    rng = np.random.default_rng(7)
+    lats, lngs = rng.uniform(42.58, 42.72, 5000), rng.uniform(23.28, 23.47, 5000)
+    assert index.locate_many(lats, lngs) == [index.locate(lat, lng) for lat, lng in zip(lats, lngs)]
+
+def test_area_ranking_ignores_ring_winding():
+    clockwise = lambda ring: ring[::-1]
+    features = [
+        # Two-part район whose outer rings wind in opposite directions, and a hole wound like its outer ring
+        {"properties": {"name": "Витоша", "admin_level": "9"},
+         "geometry": {"type": "MultiPolygon", "coordinates": [
+             [_square(23.20, 42.60, 23.30, 42.70), _square(23.26, 42.66, 23.28, 42.68)],
+             [clockwise(_square(23.30, 42.60, 23.40, 42.70))]]}},
+        {"properties": {"name": "Бояна"}, "geometry": {"type": "Polygon", "coordinates": [_square(23.21, 42.61, 23.25, 42.65)]}},
+    ]
+    index = NeighborhoodIndex(features)
+    assert [a.name for a in index.areas] == ["Бояна", "Витоша"]
+    assert index.areas[1].size == pytest.approx(0.01 + 0.01 - 0.0004)
+    assert index.locate(42.62, 23.22) == "Бояна"
+    assert index.locate_many([42.62, 42.65], [23.22, 23.35]) == ["Бояна", "Витоша"]
+
+def test_missing_polygon_file_is_reported(monkeypatch, tmp_path):
+    monkeypatch.setattr(neighborhood_index, "_index", None)
+    monkeypatch.setattr(neighborhood_index, "_index_missing", False)
+    monkeypatch.setattr(settings, "NEIGHBORHOODS_GEOJSON", str(tmp_path / "missing.geojson"))
+    monkeypatch.setattr(settings, "NEIGHBORHOODS_REQUIRED", True)
+    with pytest.raises(FileNotFoundError):
+        neighborhood_index.get_neighborhood_index()
@@ -0,0 +1,44 @@
+import random
+import re
+from src.core.patterns import ForensicPatterns, PatternSet
+from src.services.risk_engine import RiskEngine
+
+TEXTS = [
+    "Продава собственик! Преустроена гарсониера, висок партер, ТЕЦ. Цената е без ДДС.",
+    "Статут на ателие, бивша кухня към коридор, 20% сега и 80% при акт 16. Без брокери, директно от строител.",
+    "ателие ателие студио партер",  # overlapping matches of several rules at one position
+    "Светъл апартамент с гледка.",
+    "",
+]
+
+def _independent(text):
+    normalized = ForensicPatterns.normalize_text(text)
+    found = {}
+    for name, source in ForensicPatterns.RULES.items():
+        m = re.search(source, normalized, re.IGNORECASE)
+        if m: found[name] = m.span()
+    return found
+
+def test_single_pass_equals_independent_searches():
+    words = " ".join(TEXTS).split()
+    rng = random.Random(3)
+    samples = TEXTS + [" ".join(rng.choices(words, k=30)) for _ in range(200)]
+    for text in samples:
+        assert ForensicPatterns.scan(text) == _independent(text), text
+
+def test_overlapping_members_are_not_shadowed():
+    matcher = PatternSet({"LONG": r"abcd", "SHORT": r"ab", "LATE": r"cd"})
+    assert matcher.scan("xxabcd") == {"LONG": (2, 6), "SHORT": (2, 4), "LATE": (4, 6)}
+
+def test_consumers_reuse_scraped_hits():
+    text = "Собственик продава апартамент на висок партер, ТЕЦ."
+    hits = ForensicPatterns.scan(text)
+    assert ForensicPatterns.extract_flags(hits=hits) == ["GROUND_FLOOR_RISK", "DIRECT_OWNER_LISTING"]
+    assert ForensicPatterns.extract_flags(text) == ["GROUND_FLOOR_RISK", "DIRECT_OWNER_LISTING"]
+
+    # Stored hits win over raw_text; listings without hits are scanned on the fly
+    stored = RiskEngine().calculate_score_v2({"scraped": {"raw_text": "", "pattern_hits": hits}})
+    rescanned = RiskEngine().calculate_score_v2({"scraped": {"raw_text": text}})
+    assert stored == rescanned
+    assert any("Ground floor" in f for f in stored["flags"])
+    assert any("Central Heating" in f for f in stored["flags"])
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.db.models import AuditStageResult
+from src.core.pipeline import Codec, Pipeline, Stage, StageTimeout
+from src.services.stage_store import AuditStageStore
+
+def _sleeper(seconds, value):
+    async def fn(**inputs):
+        await asyncio.sleep(seconds)
+        return value
+    return fn
+
+def test_independent_stages_overlap():
+    async def join(a, b):
+        return a + b
+
+    pipeline = Pipeline("t", [
+        Stage("a", _sleeper(0.2, 1)),
+        Stage("b", _sleeper(0.2, 2)),
+        Stage("sum", join, after=["a", "b"]),
+    ])
+    run = asyncio.run(pipeline.run())
+
+    assert run.results["sum"] == 3
+    assert run.elapsed < 0.35
+    assert run.timings["sum"]["start"] >= 0.2
+
+def test_timeout_uses_fallback_or_fails():
+    slow = Stage("slow", _sleeper(1, "late"), timeout=0.05, fallback=lambda: "default")
+    run = asyncio.run(Pipeline("t", [slow]).run())
+    assert run.results["slow"] == "default"
+    assert run.timings["slow"]["status"] == "fallback"
+
+    with pytest.raises(StageTimeout):
+        asyncio.run(Pipeline("t", [Stage("slow", _sleeper(1, "late"), timeout=0.05)]).run())
+
+def test_failure_cancels_running_stages():
+    cancelled = []
+
+    async def boom():
+        raise RuntimeError("upstream down")
+
+    async def long():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(Pipeline("t", [Stage("boom", boom), Stage("long", long)]).run())
+    assert cancelled == [True]
+
+def test_graph_is_validated():
+    with pytest.raises(ValueError):
+        Pipeline("t", [Stage("a", _sleeper(0, 1), after=["b"]), Stage("b", _sleeper(0, 1), after=["a"])])
+
+def _incremental(page, calls, salt=""):
+    async def scrape():
+        calls.append("scrape")
+        return page["text"]
+
+    async def analyze(scrape):
+        calls.append("analyze")
+        return {"words": len(scrape.split())}
+
+    async def score(analyze):
+        calls.append("score")
+        return analyze["words"] * 10
+
+    return Pipeline("t", [
+        Stage("scrape", scrape),
+        Stage("analyze", analyze, after=["scrape"], codec=Codec(), salt=salt),
+        Stage("score", score, after=["analyze"]),
+    ])
+
+def test_incremental_run_reuses_unchanged_stages():
+    page, calls = {"text": "two words"}, []
+    first = asyncio.run(_incremental(page, calls).run())
+    assert set(first.records) == {"analyze"}
+
+    # Same source output: the expensive stage is reused, volatile stages still run
+    calls.clear()
+    second = asyncio.run(_incremental(page, calls).run(first.records))
+    assert calls == ["scrape", "score"]
+    assert second.reused == ["analyze"]
+    assert second.results["score"] == 20
+
+    # Changed input or changed salt (e.g. a new prompt version) recomputes
+    calls.clear()
+    page["text"] = "now three words"
+    third = asyncio.run(_incremental(page, calls).run(second.records))
+    assert calls == ["scrape", "analyze", "score"] and third.results["score"] == 30
+
+    calls.clear()
+    asyncio.run(_incremental(page, calls, salt="v2").run(third.records))
+    assert "analyze" in calls
+
+FINGERPRINT_SCRIPT = """
+import asyncio
+from src.core.pipeline import Codec, Pipeline, Stage
+from src.services.scraper_service import ScraperService
+
+page = '<div class="cena">100 000 </div>' + ''.join(
+    f'<img src="https://imot.focus.bg/photosimotbg/1/{i}.jpg">' for i in range(8))
+
+async def scrape():
+    return ScraperService(client=None)._parse_html(page, "https://m.imot.bg/x")
+
+async def archive(scrape):
+    return list(scrape.image_urls)
+
+run = asyncio.run(Pipeline("t", [
+    Stage("scrape", scrape),
+    Stage("archive", archive, after=["scrape"], codec=Codec(), uses={"scrape": lambda s: s.image_urls}),
+]).run())
+print(run.records["archive"]["fingerprint"], run.digests["scrape"])
+"""
+
+def test_fingerprints_are_stable_across_processes():
+    # Re-audits run on another worker process than the first audit, with another hash seed
+    outputs = set()
+    for seed in ("1", "2", "3"):
+        env = {**os.environ, "PYTHONHASHSEED": seed}
+        result = subprocess.run([sys.executable, "-c", FINGERPRINT_SCRIPT], env=env, capture_output=True,
+                                text=True, check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        outputs.add(result.stdout.strip().splitlines()[-1])
+    assert len(outputs) == 1
+
+def test_fingerprint_covers_only_the_inputs_a_stage_uses():
+    async def listing():
+        return {"price": page["price"], "photos": ["a.jpg", "b.jpg"]}
+
+    async def archive(listing):
+        return listing["photos"]
+
+    page = {"price": 100}
+    pipeline = lambda: Pipeline("t", [
+        Stage("listing", listing),
+        Stage("archive", archive, after=["listing"], codec=Codec(), uses={"listing": lambda l: l["photos"]}),
+    ])
+    first = asyncio.run(pipeline().run())
+    page["price"] = 90  # a price drop does not re-archive the gallery
+    assert asyncio.run(pipeline().run(first.records)).reused == ["archive"]
+
+def test_degraded_results_are_not_recorded():
+    async def flaky():
+        return {"status": "OFFLINE"}
+
+    stage = Stage("registry", flaky, codec=Codec(reusable=lambda r: r["status"] == "LIVE"))
+    run = asyncio.run(Pipeline("t", [stage]).run())
+    assert run.records == {}
+
+def test_stage_store_round_trip():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    AuditStageResult.__table__.create(engine)
+    store = AuditStageStore(sessionmaker(bind=engine))
+
+    store.save(1, {"ai": {"fingerprint": "f1", "digest": "d1", "output": {"a": 1}}})
+    store.save(1, {"ai": {"fingerprint": "f2", "digest": "d2", "output": {"a": 2}}})
+    assert store.load(1) == {"ai": {"fingerprint": "f2", "digest": "d2", "output": {"a": 2}}}
+    assert store.load(2) == {}
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from src.core.config import settings
+from src.db.models import Listing, PriceHistory
+from src.schemas import ConditionalFetch, ScrapedListing
+from src.services.price_monitor import due_listing_ids, next_interval
+from src.services.repository import RealEstateRepository
+from src.worker import celery_app
+
+def _changed(price):
+    listing = ScrapedListing(source_url="u", raw_text=f"ad {price}", price_predicted=Decimal(price),
+                             area_sqm=Decimal("60"), neighborhood="Lozenets")
+    return ConditionalFetch(status="CHANGED", etag='"x"', body_hash=f"h{price}", listing=listing)
+
+def test_interval_adapts_to_volatility():
+    day = settings.RECHECK_DEFAULT_INTERVAL
+    assert next_interval(None, True) == day // 2
+    assert next_interval(day, False) == int(day * 1.5)
+    assert next_interval(day, None) == day
+    assert next_interval(settings.RECHECK_MIN_INTERVAL, True) == settings.RECHECK_MIN_INTERVAL
+    assert next_interval(settings.RECHECK_MAX_INTERVAL, False) == settings.RECHECK_MAX_INTERVAL
+
+def test_batch_recheck_bulk_inserts_history_and_reschedules(listing_db):
+    db = listing_db
+    repo = RealEstateRepository(db)
+    ids = [repo.create_listing_initial(f"https://m.imot.bg/pcgi/imot.cgi?act=5&adv={i}").id for i in range(4)]
+    assert repo.apply_rechecks({i: _changed("100000") for i in ids}) == []  # baseline only
+    assert db.query(PriceHistory).count() == 0  # first prices are not history
+    # The baseline keeps the default cadence instead of tightening the whole backlog
+    assert {l.recheck_interval for l in db.query(Listing)} == {settings.RECHECK_DEFAULT_INTERVAL}
+
+    updated = repo.apply_rechecks({
+        ids[0]: _changed("95000"),
+        ids[1]: _changed("100000"),  # same content: no update
+        ids[2]: ConditionalFetch(status="NOT_MODIFIED", etag='"x"', body_hash="h100000"),
+        ids[3]: None,  # fetch failed
+    })
+    assert updated == [ids[0]]
+    assert [(h.listing_id, h.price_bgn) for h in db.query(PriceHistory)] == [(ids[0], Decimal("100000"))]
+
+    intervals = {l.id: l.recheck_interval for l in db.query(Listing)}
+    assert intervals[ids[0]] < intervals[ids[3]] < intervals[ids[1]] == intervals[ids[2]]
+
+    now = datetime.now(timezone.utc)
+    assert due_listing_ids(db, now=now) == []
+    assert due_listing_ids(db, now=now + timedelta(seconds=intervals[ids[0]] + 60)) == [ids[0]]
+
+def test_audit_seeds_the_recheck_baseline(listing_db):
+    db = listing_db
+    repo = RealEstateRepository(db)
+    quiet, moved = (repo.create_listing_initial(f"https://m.imot.bg/pcgi/imot.cgi?act=5&adv=s{i}") for i in range(2))
+    for listing in (quiet, moved):
+        repo.seed_from_audit(listing, _changed("100000"))
+    db.commit()
+    assert quiet.etag == '"x"' and quiet.body_hash == "h100000" and quiet.price_bgn == Decimal("100000")
+    assert quiet.next_check_at is not None
+
+    # The first re-check is a real comparison, not another baseline
+    assert repo.apply_rechecks({quiet.id: _changed("100000"), moved.id: _changed("95000")}) == [moved.id]
+    assert quiet.recheck_interval > settings.RECHECK_DEFAULT_INTERVAL > moved.recheck_interval
+    assert [(h.listing_id, h.price_bgn) for h in db.query(PriceHistory)] == [(moved.id, Decimal("100000"))]
+
+def test_audits_are_routed_away_from_background_work():
+    conf = celery_app.conf
+    assert conf.task_routes["src.tasks.audit_listing"]["queue"] == "interactive"
+    assert conf.task_default_queue == "background"
+    assert {e["task"] for e in conf.beat_schedule.values()} >= {"src.tasks.schedule_rechecks"}
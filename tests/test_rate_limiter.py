@@ -0,0 +1,72 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+import httpx
+from src.core.rate_limiter import MemoryRateLimiter, RateLimitedTransport, limit_for, parse_retry_after
+
+def test_host_limits_match_parent_domains():
+    assert limit_for("m.imot.bg") is limit_for("www.imot.bg")
+    assert limit_for("kais.cadastre.bg").burst == 1
+
+def test_bucket_paces_requests_beyond_burst():
+    limiter = MemoryRateLimiter()
+    host = "nag.sofia.bg"
+    limit = limit_for(host)
+
+    async def run():
+        start = time.monotonic()
+        for _ in range(int(limit.burst) + 2):
+            await limiter.acquire(host)
+        return time.monotonic() - start
+
+    # Two requests past the burst wait roughly 2 / rate seconds
+    assert asyncio.run(run()) >= 1.8 / limit.rate
+
+def test_throttle_halves_rate_and_success_recovers_additively():
+    limiter = MemoryRateLimiter()
+    host = "nag.sofia.bg"
+    limit = limit_for(host)
+
+    async def run():
+        await limiter.on_throttle(host)
+        after_throttle = limiter._bucket(host).rate
+        await limiter.on_success(host)
+        return after_throttle, limiter._bucket(host).rate
+
+    after_throttle, after_success = asyncio.run(run())
+    assert after_throttle == limit.rate * 0.5
+    assert after_success == after_throttle + limit.step
+
+def test_transport_reports_429_as_throttle():
+    limiter = MemoryRateLimiter()
+    inner = httpx.MockTransport(lambda request: httpx.Response(429, headers={"Retry-After": "0"}))
+
+    async def run():
+        async with httpx.AsyncClient(transport=RateLimitedTransport(limiter, inner)) as client:
+            await client.get("https://nag.sofia.bg/RegisterExpropriation/Read")
+
+    asyncio.run(run())
+    assert limiter._bucket("nag.sofia.bg").rate < limit_for("nag.sofia.bg").rate
+
+def test_gemini_host_paces_for_its_fanout_and_leaves_429s_to_the_client():
+    from src.core.config import settings
+    host = "generativelanguage.googleapis.com"
+    assert limit_for(host).burst >= settings.GEMINI_MAX_CONCURRENCY
+    limiter = MemoryRateLimiter()
+    inner = httpx.MockTransport(lambda request: httpx.Response(429, headers={"Retry-After": "5"}))
+
+    async def run():
+        async with httpx.AsyncClient(transport=RateLimitedTransport(limiter, inner, adaptive=False)) as client:
+            await client.post(f"https://{host}/v1beta/models/x:generateContent")
+
+    asyncio.run(run())
+    assert limiter._bucket(host).rate == limit_for(host).rate
+
+def test_retry_after_accepts_http_dates_and_is_clamped():
+    soon = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    assert 25 <= parse_retry_after(soon, 300) <= 30
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", 300) == 0.0  # already past
+    assert parse_retry_after("86400", 300) == 300
+    assert parse_retry_after("-5", 300) == 0.0
+    assert parse_retry_after("soon", 300) is None and parse_retry_after(None, 300) is None
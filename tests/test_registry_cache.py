@@ -0,0 +1,50 @@
+import asyncio
+from src.services.registry_cache import MemoryCacheBackend, RegistryCache
+
+def _counting_fetch(result):
+    calls = []
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return dict(result)
+    return fetch, calls
+
+def test_repeated_building_hits_cache():
+    cache = RegistryCache(MemoryCacheBackend(), ttls={"act16": 60})
+    fetch, calls = _counting_fetch({"has_act16": True})
+
+    async def run():
+        first = await cache.get_or_fetch("act16", "68134.1.1", fetch)
+        second = await cache.get_or_fetch("act16", "68134.1.1", fetch)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"has_act16": True}
+    assert len(calls) == 1
+    assert cache.stats["act16"]["miss"] == 1 and cache.stats["act16"]["hit"] == 1
+
+def test_concurrent_misses_share_one_fetch_and_errors_are_not_cached():
+    cache = RegistryCache(MemoryCacheBackend())
+    fetch, calls = _counting_fetch({"error": "timeout", "is_expropriated": False})
+
+    async def run():
+        await asyncio.gather(*[cache.get_or_fetch("expropriation", "68134.1.1", fetch) for _ in range(5)])
+        await cache.get_or_fetch("expropriation", "68134.1.1", fetch)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+
+def test_stale_entry_is_served_and_revalidated():
+    cache = RegistryCache(MemoryCacheBackend(), ttls={"permits": 0}, stale_seconds=60)
+    fetch, calls = _counting_fetch({"total_permits": 1})
+    revalidate, refreshes = _counting_fetch({"total_permits": 2})
+
+    async def run():
+        await cache.get_or_fetch("permits", "68134.1.1", fetch)
+        stale = await cache.get_or_fetch("permits", "68134.1.1", fetch, revalidate=revalidate)
+        await cache.drain()
+        return stale
+
+    assert asyncio.run(run()) == {"total_permits": 1}
+    assert len(calls) == 1 and len(refreshes) == 1
+    assert cache.stats["permits"]["stale"] == 1
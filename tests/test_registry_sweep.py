@@ -0,0 +1,51 @@
+import asyncio
+import httpx
+import pytest
+from src.services import registry_sweep
+from src.services.forensics_service import SofiaMunicipalForensics
+from src.services.registry_sweep import NagRegisterSweeper, RegisterSchemaError, RegisterSnapshot
+
+CID = "68134.1001.2.1"
+
+def test_snapshot_hits_follow_live_search_semantics():
+    rows = [
+        {"CadNumber": CID, "Obj": "жилищна сграда"},
+        {"CadNumber": f"{CID}.5", "Obj": "самостоятелен обект"},
+        {"CadNumber": "68134.1001.2", "Obj": "поземлен имот"},  # parcel ancestor
+        {"CadNumber": "68134.1001.3", "Obj": f"граничи с {CID}"},  # only mentioned elsewhere
+    ]
+    snapshot = RegisterSnapshot("expropriation", rows, taken_at=0.0)
+    assert snapshot.hits(CID) == rows[:2]
+    assert snapshot.hits("68134.1001.9") == []
+
+    permits = RegisterSnapshot("permits", [{"Identifier": CID}, {"Identifier": f"{CID}.7"}], taken_at=0.0)
+    snapshots = {"expropriation": snapshot, "act16": RegisterSnapshot("act16", [], 0.0), "permits": permits}
+    audit = SofiaMunicipalForensics(client=httpx.AsyncClient()).audit_from_snapshots(CID, snapshots)
+    assert audit["expropriation"]["found_count"] == 2
+    assert audit["building_permits"]["total_permits"] == 2 and not audit["compliance_act16"]["has_act16"]
+
+def test_sweep_fails_when_search_is_rejected(monkeypatch, tmp_path):
+    def handler(request):
+        return httpx.Response(503 if request.url.path.endswith("/Search") else 200, json={"Data": [], "Total": 0})
+
+    monkeypatch.setattr(registry_sweep, "limited_client",
+                        lambda **kwargs: httpx.AsyncClient(transport=httpx.MockTransport(handler), **kwargs))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(NagRegisterSweeper(storage_dir=str(tmp_path)).sweep("expropriation"))
+
+def test_rows_without_the_match_column_fail_the_sweep(monkeypatch, tmp_path):
+    rows = [{"Строеж/Обект": "жилищна сграда", "Кадастрален номер": CID}]
+    with pytest.raises(RegisterSchemaError):
+        RegisterSnapshot("expropriation", rows, taken_at=0.0)
+
+    def handler(request):
+        if request.url.path.endswith("/Read"):
+            return httpx.Response(200, json={"Data": rows, "Total": 1})
+        return httpx.Response(200)
+
+    monkeypatch.setattr(registry_sweep, "limited_client",
+                        lambda **kwargs: httpx.AsyncClient(transport=httpx.MockTransport(handler), **kwargs))
+    sweeper = NagRegisterSweeper(storage_dir=str(tmp_path))
+    with pytest.raises(RegisterSchemaError):
+        asyncio.run(sweeper.sweep("expropriation"))
+    assert list(tmp_path.iterdir()) == []  # nothing stored, so load_all cannot pick it up
@@ -0,0 +1,88 @@
+import datetime
+import random
+import numpy as np
+import pytest
+from src.core.rules import RuleSet, RuleSetError
+from src.services.risk_engine import RiskEngine
+
+YEAR = datetime.datetime.now().year
+
+def _bundle(rng):
+    texts = ["", "Висок партер, ТЕЦ.", "Ателие в центъра.", "Централно отопление, етаж 1 от 6", "Светъл апартамент"]
+    bundle = {
+        "scraped": {
+            "raw_text": rng.choice(texts),
+            "area_sqm": rng.choice([0, 45, "62.50", 80, 120]),
+            "is_vat_excluded": rng.random() < 0.2,
+            "price_correction_note": "VAT Adjusted",
+        },
+        "ai": {
+            "act16_due_date": rng.choice([None, "", "20", f"{YEAR + 1}-06", f"{YEAR + 2}-01-01", "n/a-2030", "2019"]),
+            "heating_inventory": {"radiators": rng.choice([0, 0, 3])},
+            "net_area_sqm": rng.choice([0, 30, 47.9, 70]),
+            "is_atelier": rng.random() < 0.1,
+        },
+        "cadastre": rng.choice([None, {"official_area": 0}, {"official_area": 50}, {"official_area": "64.0"}]),
+        "city_risk": {"is_expropriated": rng.random() < 0.05},
+        "geo": rng.choice([{}, {"match": True}, {"match": False, "warning": "Mismatch"}]),
+        "images": rng.choice([{}, {"duplicate_listings": [{"listing_id": 7, "photos": 2}]}, {"stock_photos": 2}]),
+    }
+    if rng.random() < 0.5:
+        from src.core.patterns import ForensicPatterns
+        bundle["scraped"]["pattern_hits"] = ForensicPatterns.scan(bundle["scraped"]["raw_text"])
+    return bundle
+
+def test_batch_scores_and_masks_match_scalar_path():
+    rng = random.Random(11)
+    bundles = [_bundle(rng) for _ in range(2000)]
+    engine = RiskEngine()
+    scores, masks = engine.score_batch(engine.to_columns(bundles), current_year=YEAR)
+
+    for bundle, score, mask in zip(bundles, scores, masks):
+        result = engine.calculate_score_v2(bundle)
+        assert (result["score"], result["rule_mask"]) == (score, mask), bundle
+    assert len(set(masks.tolist())) > 20  # the sample exercises many rule combinations
+
+def test_batch_accepts_plain_columns():
+    engine = RiskEngine()
+    n = 3
+    columns = {name: np.zeros(n) for name in engine.rule_set.condition_fields}
+    columns["advertised_area"] = [100.0, 100.0, 100.0]
+    columns["official_area"] = [70.0, 80.0, 0.0]
+    columns["net_area"] = [90.0, 50.0, 90.0]
+    columns["is_expropriated"] = [False, False, True]
+    scores, masks = engine.score_batch(columns)
+
+    assert scores.tolist() == [30, 20, 100]
+    assert engine.rule_names(masks[0]) == ["AREA_INFLATION"]
+    assert engine.rule_names(masks[1]) == ["TERRACE_DILUTION"]
+    assert "EXPROPRIATION" in engine.rule_names(masks[2])
+
+def test_rules_ship_as_data():
+    rules = RuleSet({
+        "version": "test-2",
+        "max_score": 50,
+        "fields": {
+            "price": {"path": "scraped.price_predicted", "type": "float"},
+            "area": {"path": "scraped.area_sqm", "type": "float"},
+        },
+        "rules": [{
+            "id": "CHEAP", "bit": 0, "weight": 60,
+            "let": {"per_sqm": {"/": ["price", "area"]}},
+            "when": {"and": [{">": ["area", 0]}, {"<": ["per_sqm", 1000]}]},
+            "message": "PRICE: {per_sqm:.0f} BGN/m2",
+        }],
+    })
+    result = RiskEngine(rules).calculate_score_v2({"scraped": {"price_predicted": "45000", "area_sqm": 60}})
+    assert result == {"score": 50, "flags": ["PRICE: 750 BGN/m2"], "is_fatal": False,
+                      "rule_mask": 1, "rule_set_version": "test-2"}
+
+    scores, masks = rules.evaluate_batch({"price": [45000, 90000, 1], "area": [60, 60, 0]})
+    assert scores.tolist() == [50, 0, 0] and masks.tolist() == [1, 0, 0]
+
+def test_malformed_rules_fail_at_load():
+    base = {"version": "x", "fields": {"a": {"path": "scraped.a", "type": "float"}}}
+    with pytest.raises(RuleSetError):
+        RuleSet({**base, "rules": [{"id": "R", "bit": 0, "when": {">": ["missing", 1]}}]})
+    with pytest.raises(RuleSetError):
+        RuleSet({**base, "rules": [{"id": "R", "bit": 0, "when": {"**": ["a", 2]}}]})
@@ -0,0 +1,80 @@
+import asyncio
+import hashlib
+from decimal import Decimal
+import httpx
+from src.core.patterns import ForensicPatterns
+from src.db.models import PriceHistory
+from src.services.repository import RealEstateRepository
+from src.services.scraper_service import ScraperService
+
+URL = "https://m.imot.bg/pcgi/imot.cgi?act=5&adv=1c1"
+
+def _page(price):
+    return f'<div class="cena">{price} </div>Площ:<br/><strong>65</strong> Собственик продава.'.encode("windows-1251")
+
+class FakeImot:
+    def __init__(self):
+        self.body = _page("150 000")
+        self.requests = []
+
+    def handler(self, request):
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"' and self.body == _page("150 000"):
+            return httpx.Response(304)
+        return httpx.Response(200, content=self.body, headers={"ETag": '"v1"' if self.body == _page("150 000") else '"v2"'})
+
+def _fetch(site, **validators):
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(site.handler)) as client:
+            return await ScraperService(client=client).fetch_if_changed(URL, **validators)
+    return asyncio.run(go())
+
+def test_conditional_fetch_short_circuits():
+    site = FakeImot()
+    first = _fetch(site)
+    assert first.status == "CHANGED" and first.etag == '"v1"'
+    assert first.listing.price_predicted == Decimal("150000") and first.listing.is_direct_owner
+
+    # Server honours the validator: no body, nothing parsed
+    second = _fetch(site, etag=first.etag, body_hash=first.body_hash)
+    assert second.status == "NOT_MODIFIED" and second.listing is None
+    assert site.requests[-1].headers["If-None-Match"] == '"v1"'
+
+    # Server ignores validators but the body is identical
+    third = _fetch(site, body_hash=first.body_hash)
+    assert third.status == "UNCHANGED" and third.listing is None
+
+    site.body = _page("140 000")
+    fourth = _fetch(site, etag=first.etag, body_hash=first.body_hash)
+    assert fourth.status == "CHANGED" and fourth.body_hash == hashlib.sha256(site.body).hexdigest()
+    assert fourth.listing.price_predicted == Decimal("140000")
+
+def test_vat_and_owner_decisions_keep_scraper_semantics():
+    scraper = ScraperService(client=None)
+    page = '<div class="cena">100 000 </div>Площ:<br/><strong>65</strong> Не се начислява ДДС. Директно от строителя.'
+    listing = scraper._parse_html(page, URL)
+    assert listing.price_predicted == Decimal("100000") and not listing.is_vat_excluded
+    assert not listing.is_direct_owner
+    # Stored hits are the scan of the stored text, so the raw_text fallback agrees
+    assert listing.pattern_hits == ForensicPatterns.scan(listing.raw_text)
+
+    listing = scraper._parse_html(page.replace("Не се начислява ДДС", "Цената е без ДДС"), URL)
+    assert listing.price_predicted == Decimal("120000.00") and listing.is_vat_excluded
+
+def test_recheck_updates_listing_only_on_change(listing_db):
+    db = listing_db
+    repo = RealEstateRepository(db)
+    listing = repo.create_listing_initial(URL)
+
+    site = FakeImot()
+    first = _fetch(site)
+    # The first recheck only records the baseline: no update, no reaudit
+    assert repo.apply_recheck(listing.id, first) is False
+    assert listing.price_bgn == Decimal("150000") and listing.etag == '"v1"' and listing.content_hash
+
+    assert repo.apply_recheck(listing.id, _fetch(site, etag=listing.etag, body_hash=listing.body_hash)) is False
+
+    site.body = _page("140 000")
+    assert repo.apply_recheck(listing.id, _fetch(site, etag=listing.etag, body_hash=listing.body_hash)) is True
+    assert listing.price_bgn == Decimal("140000")
+    assert [h.price_bgn for h in db.query(PriceHistory)] == [Decimal("150000")]
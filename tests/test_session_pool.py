@@ -0,0 +1,40 @@
+import asyncio
+import httpx
+from src.services.session_pool import SessionPool
+
+def _fake_client():
+    return httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, json={})))
+
+def test_lease_is_exclusive_per_transaction():
+    pool = SessionPool("nag", size=2, client_factory=_fake_client)
+    active, peak, seen = set(), [0], []
+
+    async def transaction():
+        async with pool.lease() as session:
+            assert session not in active
+            active.add(session)
+            peak[0] = max(peak[0], len(active))
+            await asyncio.sleep(0.01)  # Search ... Read
+            active.discard(session)
+            seen.append(session)
+
+    async def run():
+        await asyncio.gather(*[transaction() for _ in range(6)])
+        await pool.aclose()
+
+    asyncio.run(run())
+    assert peak[0] == 2
+    assert len(set(map(id, seen))) == 2  # Sessions are reused, never more than `size`
+
+def test_invalidated_session_is_replaced():
+    pool = SessionPool("kais", size=1, client_factory=_fake_client)
+
+    async def run():
+        async with pool.lease() as first:
+            first.invalidate()
+        async with pool.lease() as second:
+            return first, second
+
+    first, second = asyncio.run(run())
+    assert first is not second
+    assert first.client.is_closed
@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+from src.db.models import Report
+from src.services.repository import RealEstateRepository
+
+class CapturingSession(Session):
+    """Records the statement instead of executing it (PostGIS is not available in unit tests)."""
+    def execute(self, statement, *args, **kwargs):
+        self.sql = str(statement.compile(dialect=postgresql.dialect()))
+        raise LookupError
+
+def _sql(call):
+    db = CapturingSession()
+    try:
+        call(RealEstateRepository(db))
+    except LookupError:
+        pass
+    return db.sql
+
+def test_radius_query_uses_indexed_geography_column():
+    sql = _sql(lambda repo: repo.buildings_within(42.69, 23.32, 300))
+    assert "ST_DWithin(buildings.location, CAST(ST_SetSRID(ST_MakePoint(" in sql
+    assert "geography(Point, 4326)" in sql
+    assert "ORDER BY distance_m" in sql
+    assert "EXISTS" in sql  # audited buildings only
+
+def test_bbox_and_expropriation_queries():
+    sql = _sql(lambda repo: repo.buildings_in_bbox(42.6, 23.2, 42.7, 23.4))
+    assert "buildings.location && CAST(ST_MakeEnvelope(" in sql
+
+    sql = _sql(lambda repo: repo.expropriation_hits_within(42.69, 23.32, 500))
+    assert "ST_DWithin(buildings.location" in sql
+    assert "reports.discrepancy_details #>>" in sql
+    assert "row_number() OVER (PARTITION BY reports.building_id ORDER BY reports.created_at DESC" in sql
+    assert "rank = " in sql  # latest report per building only
+
+def test_only_latest_report_per_building_counts():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Report.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    then = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    db.add_all([
+        Report(building_id=1, created_at=then, discrepancy_details={"city_risk": {"is_expropriated": True}}),
+        Report(building_id=1, created_at=then + timedelta(days=30), discrepancy_details={"city_risk": {}}),
+        Report(building_id=2, created_at=then, discrepancy_details={"city_risk": {"is_expropriated": True}}),
+        Report(building_id=None, created_at=then),
+    ])
+    db.commit()
+
+    latest = RealEstateRepository(db)._latest_reports()
+    reports = db.query(Report).join(latest, Report.id == latest.c.id).order_by(Report.building_id).all()
+    # The re-audit that cleared building 1 supersedes its earlier expropriation hit
+    assert [(r.building_id, r.created_at.day) for r in reports] == [(1, 31), (2, 1)]
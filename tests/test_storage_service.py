@@ -0,0 +1,38 @@
+import asyncio
+import os
+import httpx
+from src.services.storage_service import StorageService
+
+PHOTO = b"\xff\xd8\xff" + b"p" * 200_000
+
+def _service(tmp_path, requests):
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(str(request.url))
+        if request.url.path.endswith("missing.jpg"):
+            return httpx.Response(404)
+        return httpx.Response(200, content=PHOTO, headers={"content-type": "image/jpeg"})
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return StorageService(upload_dir=str(tmp_path), client=client, concurrency=2)
+
+def test_duplicate_photos_are_stored_once(tmp_path):
+    requests = []
+    service = _service(tmp_path, requests)
+    urls = ["https://cdn.imot.bg/a/1.jpg", "https://cdn.imot.bg/b/1.jpg", "https://cdn.imot.bg/a/1.jpg",
+            "https://cdn.imot.bg/missing.jpg"]
+
+    paths = asyncio.run(service.archive_images(1, urls))
+
+    assert len(paths) == 1 and paths[0].endswith(".jpg")
+    with open(paths[0], "rb") as f:
+        assert f.read() == PHOTO
+    assert len(requests) == 3
+    assert os.listdir(tmp_path / "tmp") == []
+
+def test_known_urls_are_not_downloaded_again(tmp_path):
+    requests = []
+    service = _service(tmp_path, requests)
+    first = asyncio.run(service.archive_images(1, ["https://cdn.imot.bg/a/1.jpg"]))
+    second = asyncio.run(service.archive_images(2, ["https://cdn.imot.bg/a/1.jpg"]))
+
+    assert first == second
+    assert len(requests) == 1
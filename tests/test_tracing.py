@@ -0,0 +1,42 @@
+import asyncio
+import httpx
+import pytest
+from src.core.metrics import MetricsRegistry
+from src.core.rate_limiter import MemoryRateLimiter, RateLimitedTransport
+from src.core.tracing import add_retry, span
+import src.core.tracing as tracing
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(tracing, "metrics", registry)
+    return registry
+
+def test_child_spans_roll_up_into_root(registry):
+    body = b"x" * 1234
+    transport = RateLimitedTransport(MemoryRateLimiter(), httpx.MockTransport(lambda r: httpx.Response(200, content=body)))
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            with span("audit") as root:
+                with span("kais.read") as child:
+                    await client.get("https://kais.cadastre.bg/bg/Map")
+                    add_retry()
+                    child.cost += 0.002
+        return root, child
+
+    root, child = asyncio.run(run())
+    assert child.bytes == root.bytes == len(body)
+    assert root.retries == 1 and root.cost == pytest.approx(0.002)
+    assert child.trace_id == root.trace_id
+
+def test_metrics_render_prometheus_text(registry):
+    with pytest.raises(ValueError):
+        with span("geocode"):
+            raise ValueError("boom")
+
+    text = registry.render()
+    assert "# TYPE glashaus_span_duration_seconds histogram" in text
+    assert 'glashaus_span_duration_seconds_count{span="geocode"} 1' in text
+    assert 'glashaus_span_duration_seconds_bucket{le="+Inf",span="geocode"} 1' in text
+    assert 'glashaus_span_errors_total{span="geocode"} 1' in text